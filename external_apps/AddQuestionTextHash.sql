@@ -0,0 +1,35 @@
+-- =============================================================================
+-- Questions.NormalizedTextHash: indexable hash of the normalized question text
+-- =============================================================================
+-- Questions.Text is NVARCHAR(MAX) and cannot be indexed, so duplicate checks
+-- on (SectionId, Text) scan the section. This adds a persisted SHA-256 of the
+-- text with whitespace runs (space, tab, CR, LF) collapsed to one space,
+-- trimmed and lowercased, plus an index on (SectionId, NormalizedTextHash).
+--
+-- The expression must stay in step with normalize_question_text /
+-- question_text_hash in external_apps/flourish_tools/importer.py. The
+-- importer reads this column when it exists instead of pulling full texts.
+--
+-- The column is computed, so EF Core inserts/updates need no changes.
+-- Sessions that write to Questions need the default ANSI settings
+-- (QUOTED_IDENTIFIER, ANSI_NULLS, ANSI_WARNINGS ON), which SqlClient and
+-- ODBC use already.
+-- =============================================================================
+
+USE [FlourishWellness];
+GO
+
+-- NCHAR(7) is used as a marker to collapse runs of spaces:
+-- ' ' -> ' ' + NCHAR(7), drop NCHAR(7) + ' ', then drop the leftover NCHAR(7).
+ALTER TABLE dbo.Questions ADD NormalizedTextHash AS CAST(HASHBYTES('SHA2_256',
+    LOWER(LTRIM(RTRIM(
+        REPLACE(REPLACE(REPLACE(
+            REPLACE(REPLACE(REPLACE(Text, CHAR(9), N' '), CHAR(10), N' '), CHAR(13), N' '),
+            N' ', N' ' + NCHAR(7)), NCHAR(7) + N' ', N''), NCHAR(7), N'')
+    )))
+) AS BINARY(32)) PERSISTED;
+GO
+
+CREATE INDEX IX_Questions_SectionId_NormalizedTextHash
+    ON dbo.Questions (SectionId, NormalizedTextHash);
+GO
@@ -1,32 +1,183 @@
-""" This is a quick and dirty database browser for FlourishWellness. It is not intended to be a full-featured tool, but rather a simple way to view table contents without needing to use SQL Server Management Studio or other external tools.
-    This shows the tables and column/rows in a simple UI. It is read-only and does not support any editing or filtering. It is intended for quick lookups and debugging purposes only.
-    Added basic delete and update functionality for quick data manipulation, but use with caution as there are no safety checks. Double-click any cell to edit its value, then click "Update Data" to save changes. Use "Delete Data" to remove rows based on a condition.
+""" This is a quick and dirty database browser for FlourishWellness. It is not intended to be a full-featured tool, but rather a simple way to look at and fix table contents without needing SQL Server Management Studio or other external tools.
+    It lists the tables (with approximate row counts and sizes) and shows one page of rows at a time, streamed in the background and cached. Use Prev/Next to page, click a column header to sort, and use the filter bar to narrow the rows. Export writes the table, with its current filters and sort, to CSV or Parquet.
+    Editing: double-click a cell to change it, then click "Update Data" to save every edited row in one transaction. A save fails without writing anything if any of those rows changed since they were read. Leaving a page with unsaved edits asks whether to save or discard them. "Delete Data" removes rows matching a condition; use it with caution.
+    Usage: python browse_db.py [--db-type sqlite --target dev.db] [--cache-mb N] [--change-check checksum|max:COLUMN]
 """
+import argparse
+import queue
+import threading
 import tkinter as tk
-from tkinter import messagebox, ttk, simpledialog
+from tkinter import filedialog, messagebox, ttk, simpledialog
 
-import pyodbc
-
-# --- Configuration ---
-DB_SERVER = "ASISQLDBPROD"
-DB_DATABASE = "FlourishWellness"
-DB_CONN_STR = (
-    f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-    f"SERVER={DB_SERVER};DATABASE={DB_DATABASE};Trusted_Connection=yes;"
+from flourish_tools.browser import (
+    DEFAULT_PAGE_SIZE,
+    PageFetch,
+    delete_data_from_table,
+    fetch_tables,
 )
+from flourish_tools.connections import close_all
+from flourish_tools.db import DB_CONN_STR, DB_TYPES
+from flourish_tools.edits import convert_value, save_row_edits
+from flourish_tools.export import describe_export, export_table
+from flourish_tools.filters import format_filter, parse_filter
+from flourish_tools.pagecache import DEFAULT_CACHE_BYTES, PageCache
+from flourish_tools.tablestats import STATS_TTL, describe_stats, fetch_table_stats
+
+
+PAGE_SIZES = ("100", "1000", "10000", "100000", "1000000")
+
+FILTER_HINT = "Operators: = != > >= < <= ~contains ^starts null !null"
+
+# How often the UI thread polls background work.
+POLL_MS = 50
+
 
+class VirtualGrid(ttk.Frame):
+    """
+    A Treeview that only holds items for the rows in view.
 
-def get_connection():
-    return pyodbc.connect(DB_CONN_STR)
+    Rows are read from a ColumnBuffer (anything with len() and [index]) and
+    turned into display strings only when they scroll into view. The fixed
+    set of Treeview items is reused while scrolling, so memory and redraw
+    cost do not grow with the number of rows.
+    """
 
+    HEADER_HEIGHT = 25
 
-def quote_ident(name: str) -> str:
-    return "[" + name.replace("]", "]]") + "]"
+    def __init__(self, master, on_heading=None):
+        super().__init__(master)
+        self.on_heading = on_heading  # called with the column name on a header click
+        self.sort = ()  # (column, descending) pairs shown as arrows in the headers
+        self.source = None
+        self.overrides = {}  # {(row_index, column_index): display value}, e.g. unsaved edits
+        self.top = 0
+        self._items = []
+
+        self.tree = ttk.Treeview(self, show="headings", height=1, selectmode="browse")
+        self.vsb = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        hsb = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(xscrollcommand=hsb.set)
+
+        self.vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        hsb.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda _e: self.yview("scroll", -3, "units") or "break")
+        self.tree.bind("<Button-5>", lambda _e: self.yview("scroll", 3, "units") or "break")
+        self.tree.bind("<Prior>", lambda _e: self.yview("scroll", -1, "pages") or "break")
+        self.tree.bind("<Next>", lambda _e: self.yview("scroll", 1, "pages") or "break")
+
+    @property
+    def row_count(self):
+        return len(self.source) if self.source is not None else 0
+
+    def row_height(self):
+        try:
+            return int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        except (tk.TclError, ValueError):
+            return 20
+
+    def on_resize(self, event):
+        visible = max(1, (event.height - self.HEADER_HEIGHT) // self.row_height())
+        if visible == len(self._items):
+            return
+        while len(self._items) < visible:
+            self._items.append(self.tree.insert("", tk.END, values=()))
+        while len(self._items) > visible:
+            self.tree.delete(self._items.pop())
+        self.tree.configure(height=visible)
+        self.render()
+
+    def set_source(self, source):
+        """Show a new result set (or nothing, with source=None)."""
+        self.source = source
+        self.overrides.clear()
+        self.top = 0
+        columns = source.columns if source is not None else ()
+        self.tree["columns"] = columns
+        for col in columns:
+            self.tree.column(col, width=170, minwidth=80, anchor=tk.W)
+        self.update_headings()
+        self.render()
+
+    def update_headings(self):
+        arrows = {col: " \u25bc" if descending else " \u25b2" for col, descending in self.sort}
+        for col in self.tree["columns"]:
+            command = (lambda c=col: self.on_heading(c)) if self.on_heading else ""
+            self.tree.heading(col, text=col + arrows.get(col, ""), command=command)
+
+    def display_values(self, row_index):
+        values = ["" if value is None else str(value) for value in self.source[row_index]]
+        for column_index in range(len(values)):
+            override = self.overrides.get((row_index, column_index))
+            if override is not None:
+                values[column_index] = override
+        return values
+
+    def render(self):
+        """Refill the visible items from the source, e.g. after more rows arrived."""
+        count = self.row_count
+        visible = len(self._items)
+        self.top = max(0, min(self.top, count - visible))
+        for offset, item_id in enumerate(self._items):
+            row_index = self.top + offset
+            values = self.display_values(row_index) if row_index < count else ()
+            self.tree.item(item_id, values=values)
+        if count:
+            self.vsb.set(self.top / count, min(1.0, (self.top + visible) / count))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def yview(self, *args):
+        count = self.row_count
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * count)
+        elif args[0] == "scroll":
+            step = len(self._items) if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self.render()
+
+    def on_mouse_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas.
+        if abs(event.delta) >= 120:
+            units = -3 * int(event.delta / 120)
+        else:
+            units = -1 if event.delta > 0 else 1
+        self.yview("scroll", units, "units")
+        return "break"
+
+    def row_at(self, y):
+        """Return the source row index under a y coordinate, or None."""
+        item_id = self.tree.identify_row(y)
+        if item_id not in self._items:
+            return None
+        row_index = self.top + self._items.index(item_id)
+        return row_index if row_index < self.row_count else None
+
+    def column_at(self, x):
+        column_id = self.tree.identify_column(x)
+        if not column_id:
+            return None
+        return int(column_id.replace("#", "")) - 1
 
 
 class DatabaseBrowserApp:
-    def __init__(self, root: tk.Tk):
+    def __init__(
+        self,
+        root: tk.Tk,
+        db_type="sqlserver",
+        db_target=DB_CONN_STR,
+        cache_bytes=DEFAULT_CACHE_BYTES,
+        change_check=None,
+    ):
         self.root = root
+        self.db_type = db_type
+        self.db_target = db_target
+        # Recent pages, invalidated when this window writes to their table
+        self.page_cache = PageCache(cache_bytes) if cache_bytes else None
+        self.change_check = change_check
         self.root.title("FlourishWellness - Database Browser")
         self.root.geometry("1300x760")
 
@@ -34,6 +185,17 @@ class DatabaseBrowserApp:
 
         self.pending_updates = {}
 
+        # Keyset paging state for the table shown in the grid
+        self.current_table = None  # (label, schema_name, table_name)
+        self.key_columns = None
+        self.page = None
+        self.page_number = 0
+        # Server-side sort and filters for the current table
+        self.sort = []  # [(column, descending)]
+        self.filters = {}  # {column: (operator, value)}
+        self.fetch = None  # PageFetch running on a worker thread
+        self._fetch_step = 0
+
         self._build_ui()
         self.load_tables()
 
@@ -41,7 +203,9 @@ class DatabaseBrowserApp:
         top = ttk.Frame(self.root, padding="8 6")
         top.pack(fill=tk.X)
 
-        ttk.Button(top, text="Refresh Tables", command=self.load_tables).pack(
+        ttk.Button(
+            top, text="Refresh Tables", command=lambda: self.load_tables(refresh=True)
+        ).pack(
             side=tk.LEFT, padx=(0, 8)
         )
         ttk.Button(top, text="Load Selected Table", command=self.load_selected_table).pack(
@@ -53,9 +217,16 @@ class DatabaseBrowserApp:
         ttk.Button(top, text="Update Data", command=self.on_update_data).pack(
             side=tk.LEFT, padx=(0, 8)
         )
+        ttk.Button(top, text="Export...", command=self.on_export_data).pack(
+            side=tk.LEFT, padx=(0, 8)
+        )
 
         self.status_var = tk.StringVar(value="Ready")
         ttk.Label(top, textvariable=self.status_var).pack(side=tk.RIGHT)
+        self.cancel_btn = ttk.Button(
+            top, text="Cancel", command=self.on_cancel_fetch, state="disabled"
+        )
+        self.cancel_btn.pack(side=tk.RIGHT, padx=(0, 8))
 
         main = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL)
         main.pack(fill=tk.BOTH, expand=True, padx=8, pady=(0, 8))
@@ -75,55 +246,170 @@ class DatabaseBrowserApp:
         self.table_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.table_list.bind("<<ListboxSelect>>", lambda _e: self.load_selected_table())
 
-        self.row_tree = ttk.Treeview(right_frame, show="headings")
-        row_vsb = ttk.Scrollbar(right_frame, orient=tk.VERTICAL, command=self.row_tree.yview)
-        row_hsb = ttk.Scrollbar(
-            right_frame, orient=tk.HORIZONTAL, command=self.row_tree.xview
+        pager = ttk.Frame(right_frame)
+        pager.pack(side=tk.BOTTOM, fill=tk.X, pady=(6, 0))
+
+        self.prev_btn = ttk.Button(pager, text="< Prev", command=self.on_prev_page)
+        self.prev_btn.pack(side=tk.LEFT)
+        self.next_btn = ttk.Button(pager, text="Next >", command=self.on_next_page)
+        self.next_btn.pack(side=tk.LEFT, padx=(6, 0))
+        self.page_var = tk.StringVar(value="")
+        ttk.Label(pager, textvariable=self.page_var).pack(side=tk.LEFT, padx=(12, 0))
+
+        self.page_size_var = tk.StringVar(value=str(DEFAULT_PAGE_SIZE))
+        page_size_box = ttk.Combobox(
+            pager,
+            textvariable=self.page_size_var,
+            values=PAGE_SIZES,
+            width=6,
+            state="readonly",
         )
-        self.row_tree.configure(yscrollcommand=row_vsb.set, xscrollcommand=row_hsb.set)
+        page_size_box.pack(side=tk.RIGHT)
+        page_size_box.bind(
+            "<<ComboboxSelected>>",
+            lambda _e: self.confirm_leave_page() and self.reload_first_page(),
+        )
+        ttk.Label(pager, text="Rows per page:").pack(side=tk.RIGHT, padx=(0, 6))
+        self.update_pager()
 
-        row_vsb.pack(side=tk.RIGHT, fill=tk.Y)
-        row_hsb.pack(side=tk.BOTTOM, fill=tk.X)
-        self.row_tree.pack(fill=tk.BOTH, expand=True)
+        filter_bar = ttk.Frame(right_frame)
+        filter_bar.pack(side=tk.TOP, fill=tk.X, pady=(0, 6))
 
-        self.row_tree.bind("<Double-1>", self.on_edit_cell)
+        ttk.Label(filter_bar, text="Filter:").pack(side=tk.LEFT)
+        self.filter_column_var = tk.StringVar()
+        self.filter_column_box = ttk.Combobox(
+            filter_bar, textvariable=self.filter_column_var, width=22, state="readonly"
+        )
+        self.filter_column_box.pack(side=tk.LEFT, padx=(6, 6))
+        self.filter_expr_var = tk.StringVar()
+        filter_entry = ttk.Entry(filter_bar, textvariable=self.filter_expr_var, width=28)
+        filter_entry.pack(side=tk.LEFT)
+        filter_entry.bind("<Return>", lambda _e: self.on_apply_filter())
+        ttk.Button(filter_bar, text="Apply", command=self.on_apply_filter).pack(
+            side=tk.LEFT, padx=(6, 0)
+        )
+        ttk.Button(filter_bar, text="Clear Filters", command=self.on_clear_filters).pack(
+            side=tk.LEFT, padx=(6, 0)
+        )
+        self.filters_var = tk.StringVar(value=FILTER_HINT)
+        ttk.Label(filter_bar, textvariable=self.filters_var).pack(side=tk.LEFT, padx=(12, 0))
 
-    def load_tables(self):
-        try:
-            with get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    SELECT TABLE_SCHEMA, TABLE_NAME
-                    FROM INFORMATION_SCHEMA.TABLES
-                    WHERE TABLE_TYPE = 'BASE TABLE'
-                    ORDER BY TABLE_SCHEMA, TABLE_NAME
-                    """
+        self.grid = VirtualGrid(right_frame, on_heading=self.on_sort_column)
+        self.grid.pack(fill=tk.BOTH, expand=True)
+        self.grid.tree.bind("<Double-1>", self.on_edit_cell)
+
+    def run_in_background(self, work, on_done):
+        """Run work() on a worker thread and call on_done(result) back on the UI thread."""
+        result = {}
+
+        def target():
+            try:
+                result["value"] = work()
+            except Exception as exc:
+                result["error"] = exc
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+
+        def poll():
+            if thread.is_alive():
+                self.root.after(POLL_MS, poll)
+            elif "error" in result:
+                self.status_var.set("Ready")
+                messagebox.showerror("Database Error", str(result["error"]))
+            else:
+                on_done(result["value"])
+
+        self.root.after(POLL_MS, poll)
+
+    def load_tables(self, refresh=False):
+        """List the tables with their approximate size; stats are cached for a few minutes."""
+        self.status_var.set("Loading tables...")
+        if refresh and self.page_cache is not None:
+            self.page_cache.clear()
+
+        def work():
+            rows = fetch_tables(self.db_type, self.db_target)
+            try:
+                stats = fetch_table_stats(
+                    self.db_type, self.db_target, max_age=0 if refresh else STATS_TTL
                 )
-                rows = cursor.fetchall()
-        except Exception as exc:
-            messagebox.showerror("Database Error", str(exc))
-            return
+            except Exception:
+                stats = {}  # Sizes are a convenience; list the tables anyway.
+            return rows, stats
+
+        self.run_in_background(work, lambda result: self.show_tables(*result))
 
+    def show_tables(self, rows, stats):
+        self.cancel_fetch()
         self.table_list.delete(0, tk.END)
         self._table_lookup.clear()
 
-        for row in rows:
-            label = f"{row.TABLE_SCHEMA}.{row.TABLE_NAME}"
-            self._table_lookup[label] = (row.TABLE_SCHEMA, row.TABLE_NAME)
+        for schema_name, table_name in rows:
+            label = f"{schema_name}.{table_name}"
+            summary = describe_stats(stats.get((schema_name, table_name)))
+            if summary:
+                label = f"{label}  ({summary})"
+            self._table_lookup[label] = (schema_name, table_name)
             self.table_list.insert(tk.END, label)
 
+        self.current_table = None
+        self.page = None
         self.clear_rows()
+        self.update_pager()
         self.status_var.set(f"Loaded {len(rows)} table(s)")
 
     def clear_rows(self):
-        self.row_tree.delete(*self.row_tree.get_children())
-        self.row_tree["columns"] = ()
+        self.grid.set_source(None)
+
+    def update_pager(self):
+        page = None if self.fetch else self.page
+        self.prev_btn.config(state=("normal" if page and page.has_prev else "disabled"))
+        self.next_btn.config(state=("normal" if page and page.has_next else "disabled"))
+        self.cancel_btn.config(state=("normal" if self.fetch else "disabled"))
+        self.page_var.set(f"Page {self.page_number}" if page else "")
+
+    def confirm_leave_page(self):
+        """
+        Return True when the current page can be replaced. Edits live only on
+        the loaded page, so with unsaved edits the user chooses: save them
+        and stay (the save runs in the background), discard them, or cancel.
+        """
+        if not self.pending_updates:
+            return True
+        answer = messagebox.askyesnocancel(
+            "Unsaved Edits",
+            f"{len(self.pending_updates)} row(s) have unsaved edits.\n\n"
+            "Yes: save them and stay on this page\n"
+            "No: discard them and move on\n"
+            "Cancel: keep them unsaved and stay on this page",
+        )
+        if answer:
+            self.on_update_data()
+            return False
+        if answer is None:
+            return False
+        self.pending_updates.clear()
+        return True
+
+    def select_current_table(self):
+        """Put the list selection back on the loaded table."""
+        if self.current_table is None:
+            return
+        loaded = (self.current_table[1], self.current_table[2])
+        for n in range(self.table_list.size()):
+            if self._table_lookup.get(self.table_list.get(n)) == loaded:
+                self.table_list.selection_clear(0, "end")
+                self.table_list.selection_set(n)
+                break
 
     def load_selected_table(self):
         selected = self.table_list.curselection()
         if not selected:
             return
+        if not self.confirm_leave_page():
+            self.select_current_table()
+            return
 
         table_label = self.table_list.get(selected[0])
         table_info = self._table_lookup.get(table_label)
@@ -132,56 +418,199 @@ class DatabaseBrowserApp:
             return
 
         schema_name, table_name = table_info
-        sql = (
-            f"SELECT * FROM {quote_ident(schema_name)}.{quote_ident(table_name)}"
-        )
+        self.current_table = (f"{schema_name}.{table_name}", schema_name, table_name)
+        self.key_columns = None
+        self.sort = []
+        self.filters = {}
+        self.filter_expr_var.set("")
+        self.update_filter_label()
+        self.reload_first_page()
+
+    def reload_first_page(self):
+        self.page_number = 1
+        self.load_page()
+
+    def on_sort_column(self, column):
+        """Header click: sort ascending, then descending, then back to key order."""
+        if not self.confirm_leave_page():
+            return
+        if self.sort and self.sort[0][0] == column:
+            self.sort = [] if self.sort[0][1] else [(column, True)]
+        else:
+            self.sort = [(column, False)]
+        self.reload_first_page()
+
+    def on_apply_filter(self):
+        column = self.filter_column_var.get()
+        if not column:
+            messagebox.showwarning("Filter", "Pick a column to filter on.")
+            return
+        if not self.confirm_leave_page():
+            return
+        text = self.filter_expr_var.get().strip()
+        if text:
+            try:
+                self.filters[column] = parse_filter(text)
+            except ValueError as exc:
+                messagebox.showerror("Filter", str(exc))
+                return
+        else:
+            self.filters.pop(column, None)
+        self.update_filter_label()
+        self.reload_first_page()
+
+    def on_clear_filters(self):
+        if not self.confirm_leave_page():
+            return
+        self.filters = {}
+        self.filter_expr_var.set("")
+        self.update_filter_label()
+        self.reload_first_page()
+
+    def update_filter_label(self):
+        if self.filters:
+            self.filters_var.set(
+                "; ".join(
+                    format_filter(column, op, value)
+                    for column, (op, value) in self.filters.items()
+                )
+            )
+        else:
+            self.filters_var.set(FILTER_HINT)
 
-        try:
-            with get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(sql)
-                rows = cursor.fetchall()
-                columns = [desc[0] for desc in (cursor.description or [])]
-        except Exception as exc:
-            messagebox.showerror("Database Error", str(exc))
+    def on_next_page(self):
+        if self.page and self.page.has_next and self.confirm_leave_page():
+            self.load_page(after=self.page.last_key, step=1)
+
+    def on_prev_page(self):
+        if self.page and self.page.has_prev and self.confirm_leave_page():
+            self.load_page(before=self.page.first_key, step=-1)
+
+    def load_page(self, after=None, before=None, step=0):
+        """Start streaming one page of the current table, with its sort and filters."""
+        if self.current_table is None:
             return
+        _, schema_name, table_name = self.current_table
 
+        self.cancel_fetch()
+        # Callers go through confirm_leave_page first, so anything left here
+        # was saved or explicitly discarded.
+        self.pending_updates.clear()
         self.clear_rows()
-        self.row_tree["columns"] = columns
-
-        for col in columns:
-            self.row_tree.heading(col, text=col)
-            self.row_tree.column(col, width=170, minwidth=80, anchor=tk.W)
+        self._fetch_step = step
+        self.fetch = PageFetch(
+            table_name,
+            schema_name,
+            key_columns=self.key_columns,
+            page_size=int(self.page_size_var.get()),
+            after=after,
+            before=before,
+            db_type=self.db_type,
+            db_target=self.db_target,
+            sort=list(self.sort),
+            filters=dict(self.filters),
+            cache=self.page_cache,
+            change_check=self.change_check,
+        ).start()
+        self.update_pager()
+        self.root.after(POLL_MS, self.poll_fetch, self.fetch)
+
+    def cancel_fetch(self):
+        if self.fetch is not None:
+            self.fetch.cancel()
+            self.fetch = None
+
+    def on_cancel_fetch(self):
+        fetch = self.fetch
+        if fetch is None:
+            return
+        self.cancel_fetch()
+        # The grid keeps the rows fetched so far but they are not a complete
+        # page, so paging restarts from the first page.
+        self.page = None
+        self.update_pager()
+        self.status_var.set(
+            f"Cancelled after {fetch.rows_fetched} row(s), {fetch.elapsed:.1f}s"
+        )
 
-        for row in rows:
-            values = ["" if value is None else str(value) for value in row]
-            self.row_tree.insert("", tk.END, values=values)
+    def poll_fetch(self, fetch):
+        """Show what the worker has fetched so far."""
+        if fetch is not self.fetch:
+            return  # Cancelled or replaced by a newer fetch.
 
+        while True:
+            try:
+                kind, payload = fetch.messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "columns":
+                self.grid.sort = self.sort
+                self.grid.set_source(payload)
+                self.filter_column_box.config(values=payload.columns)
+            elif kind == "done":
+                self.finish_fetch(fetch, payload)
+                return
+            elif kind == "error":
+                self.fetch = None
+                self.update_pager()
+                self.status_var.set("Ready")
+                messagebox.showerror("Database Error", str(payload))
+                return
+            elif kind == "cancelled":
+                return
+
+        self.grid.render()
+        table_label = self.current_table[0]
+        self.status_var.set(
+            f"{table_label}: fetching... {fetch.rows_fetched} row(s), {fetch.elapsed:.1f}s"
+        )
+        self.root.after(POLL_MS, self.poll_fetch, fetch)
+
+    def finish_fetch(self, fetch, page):
+        self.fetch = None
+        self.key_columns = page.key_columns
+        self.page = page
+        self.page_number += self._fetch_step
+        self.grid.render()
+        self.update_pager()
         self.status_var.set(
-            f"{table_label}: {len(rows)} row(s), {len(columns)} column(s)"
+            f"{self.current_table[0]}: page {self.page_number}, {len(page.rows)} row(s),"
+            f" {len(page.columns)} column(s), ordered by"
+            f" {', '.join(f'{c} DESC' if d else c for c, d in page.order)}"
+            f" ({'cached, ' if fetch.from_cache else ''}{fetch.elapsed:.2f}s,"
+            f" {page.rows.nbytes() / 1e6:.1f} MB)"
         )
 
     def on_edit_cell(self, event):
-        """Enable editing of a cell in the TreeView."""
-        item_id = self.row_tree.identify_row(event.y)
-        column_id = self.row_tree.identify_column(event.x)
-
-        if not item_id or not column_id:
+        """Edit one cell; the change is kept until "Update Data" saves it."""
+        row_index = self.grid.row_at(event.y)
+        column_index = self.grid.column_at(event.x)
+        if row_index is None or column_index is None:
             return
 
-        column_index = int(column_id.replace("#", "")) - 1
-        column_name = self.row_tree["columns"][column_index]
-        old_value = self.row_tree.item(item_id, "values")[column_index]
+        column_name = self.grid.source.columns[column_index]
+        old_value = self.grid.display_values(row_index)[column_index]
 
         new_value = simpledialog.askstring("Edit Cell", f"Enter new value for {column_name}:", initialvalue=old_value)
         if new_value is not None:
-            values = list(self.row_tree.item(item_id, "values"))
-            values[column_index] = new_value
-            self.row_tree.item(item_id, values=values)
+            source = self.grid.source
+            try:
+                value = convert_value(
+                    new_value,
+                    source.types[column_index],
+                    source.value(row_index, column_index),
+                )
+            except ValueError as exc:
+                messagebox.showerror("Edit Cell", f"{column_name}: {exc}")
+                return
+
+            self.grid.overrides[(row_index, column_index)] = "" if value is None else str(value)
+            self.grid.render()
 
-            # Store the changes for later update
-            self.pending_updates[item_id] = self.pending_updates.get(item_id, {})
-            self.pending_updates[item_id][column_name] = new_value
+            # Store the converted value for later update
+            self.pending_updates[row_index] = self.pending_updates.get(row_index, {})
+            self.pending_updates[row_index][column_name] = value
 
     def on_delete_data(self):
         """Prompt user to delete data from the selected table."""
@@ -199,100 +628,156 @@ class DatabaseBrowserApp:
         schema_name, table_name = table_info
         condition = simpledialog.askstring("Delete Data", f"Enter the condition for deletion in {table_name} (e.g., UserId = 123):")
         if condition:
-            try:
-                with get_connection() as conn:
-                    cursor = conn.cursor()
-                    sql = f"DELETE FROM {quote_ident(schema_name)}.{quote_ident(table_name)} WHERE {condition}"
-                    cursor.execute(sql)
-                    conn.commit()
-                    messagebox.showinfo("Success", f"Data deleted from {table_name} where {condition}")
-            except Exception as exc:
-                messagebox.showerror("Database Error", str(exc))
+            self.status_var.set(f"Deleting from {table_name}...")
+            self.run_in_background(
+                lambda: delete_data_from_table(
+                    table_name, condition, schema_name, self.db_type, self.db_target
+                ),
+                lambda deleted: self.on_write_done(
+                    f"{deleted} row(s) deleted from {table_name} where {condition}",
+                    (schema_name, table_name),
+                ),
+            )
 
 
     def on_update_data(self):
         """Write pending changes to the database."""
-        selected = self.table_list.curselection()
-        if not selected:
+        # The edits belong to the loaded table, which is not necessarily the
+        # one selected in the list (see confirm_leave_page).
+        if self.current_table is None:
             messagebox.showwarning("Warning", "Please select a table first.")
             return
 
-        table_label = self.table_list.get(selected[0])
-        table_info = self._table_lookup.get(table_label)
-        if table_info is None:
-            messagebox.showerror("Selection Error", "Unknown table selection.")
+        _, schema_name, table_name = self.current_table
+        source = self.grid.source
+        saving = {
+            row_index: dict(changes) for row_index, changes in self.pending_updates.items()
+        }
+        if not saving:
+            messagebox.showinfo("Update Data", "There are no edited cells to save.")
             return
+        edits = [
+            (dict(zip(source.columns, source[row_index])), changes)
+            for row_index, changes in saving.items()
+        ]
+
+        def saved(updated):
+            # Keep the saved values in the buffer instead of re-reading the page.
+            if self.grid.source is source:
+                for row_index, changes in saving.items():
+                    for column_name, value in changes.items():
+                        column_index = source.columns.index(column_name)
+                        source.set_value(row_index, column_index, value)
+                        self.grid.overrides.pop((row_index, column_index), None)
+                    if self.pending_updates.get(row_index) == changes:
+                        del self.pending_updates[row_index]
+                self.grid.render()
+            self.on_write_done(f"{updated} row(s) saved.", (schema_name, table_name))
+
+        self.status_var.set(f"Saving {len(edits)} row(s)...")
+        self.run_in_background(
+            lambda: save_row_edits(
+                table_name, edits, schema_name, self.db_type, self.db_target
+            ),
+            saved,
+        )
 
-        schema_name, table_name = table_info
-        try:
-            with get_connection() as conn:
-                cursor = conn.cursor()
-                for item_id, updates in self.pending_updates.items():
-                    set_clause = ", ".join([f"{col} = ?" for col in updates.keys()])
-                    sql = f"UPDATE {quote_ident(schema_name)}.{quote_ident(table_name)} SET {set_clause} WHERE Id = ?"
-                    params = list(updates.values()) + [self.row_tree.item(item_id, "values")[0]]
-                    cursor.execute(sql, params)
-                conn.commit()
-
-            self.pending_updates.clear()
-            messagebox.showinfo("Success", "All changes have been saved.")
-        except Exception as exc:
-            messagebox.showerror("Database Error", str(exc))
-
-
-def fetch_tables():
-    """Fetch the list of tables from the database."""
-    try:
-        with pyodbc.connect(DB_CONN_STR) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE = 'BASE TABLE'")
-            return [row[0] for row in cursor.fetchall()]
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to fetch tables: {e}")
-        return []
+    def on_export_data(self):
+        """Stream the loaded table, with its current filters and sort, to CSV or Parquet."""
+        if self.current_table is None:
+            messagebox.showwarning("Warning", "Please load a table first.")
+            return
+
+        label, schema_name, table_name = self.current_table
+        path = filedialog.asksaveasfilename(
+            title=f"Export {label}",
+            initialfile=f"{table_name}.csv",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet"), ("All files", "*.*")],
+        )
+        if not path:
+            return
 
+        sort, filters = list(self.sort), dict(self.filters)
+        progress = {"rows": 0}
+        exporting = threading.Event()
+        exporting.set()
 
-def fetch_table_data(table_name):
-    """Fetch data from the selected table."""
-    try:
-        with pyodbc.connect(DB_CONN_STR) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT * FROM {table_name}")
-            columns = [column[0] for column in cursor.description]
-            rows = cursor.fetchall()
-            return columns, rows
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to fetch data: {e}")
-        return [], []
-
-
-def delete_data_from_table(table_name, condition):
-    """Delete data from the specified table based on a condition."""
-    try:
-        with pyodbc.connect(DB_CONN_STR) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"DELETE FROM {table_name} WHERE {condition}")
-            conn.commit()
-            messagebox.showinfo("Success", f"Data deleted from {table_name} where {condition}")
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to delete data: {e}")
+        def show_progress():
+            # The worker only updates the dict; the UI thread reads it.
+            if exporting.is_set():
+                self.status_var.set(f"Exporting {label}: {progress['rows']} row(s)...")
+                self.root.after(POLL_MS * 10, show_progress)
+
+        def work():
+            try:
+                return export_table(
+                    table_name,
+                    path,
+                    schema_name,
+                    sort,
+                    filters,
+                    db_type=self.db_type,
+                    db_target=self.db_target,
+                    progress=lambda stats: progress.update(rows=stats["rows"]),
+                )
+            finally:
+                exporting.clear()
+
+        show_progress()
+        self.run_in_background(
+            work,
+            lambda stats: self.on_write_done(f"Exported {describe_export(stats)} to {path}"),
+        )
 
+    def on_write_done(self, message, written_table=None):
+        if written_table is not None and self.page_cache is not None:
+            self.page_cache.invalidate(self.db_type, self.db_target, *written_table)
+        self.status_var.set("Ready")
+        messagebox.showinfo("Success", message)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FlourishWellness database browser.")
+    parser.add_argument("--db-type", choices=DB_TYPES, default="sqlserver")
+    parser.add_argument(
+        "--target",
+        default=None,
+        help="SQLite file path or SQL Server connection string (default: ASISQLDBPROD).",
+    )
+    parser.add_argument(
+        "--cache-mb",
+        type=int,
+        default=DEFAULT_CACHE_BYTES // (1024 * 1024),
+        help="Memory for cached pages; 0 disables the cache (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--change-check",
+        metavar="checksum|max:COLUMN",
+        help="Query run before reusing a cached page to notice changes made by"
+        " others, e.g. checksum or max:Modified (default: none).",
+    )
+    args = parser.parse_args(argv)
+    if args.db_type == "sqlite" and not args.target:
+        parser.error("--target is required for --db-type sqlite")
+    if args.change_check and not (
+        args.change_check == "checksum" or args.change_check.startswith("max:")
+    ):
+        parser.error("--change-check must be checksum or max:COLUMN")
 
-def update_data_in_table(table_name, column_values, condition):
-    """Update data in the specified table based on a condition."""
+    root = tk.Tk()
+    app = DatabaseBrowserApp(
+        root,
+        args.db_type,
+        args.target or DB_CONN_STR,
+        cache_bytes=args.cache_mb * 1024 * 1024,
+        change_check=args.change_check,
+    )
     try:
-        with pyodbc.connect(DB_CONN_STR) as conn:
-            cursor = conn.cursor()
-            set_clause = ", ".join([f"{col} = ?" for col in column_values.keys()])
-            sql = f"UPDATE {table_name} SET {set_clause} WHERE {condition}"
-            cursor.execute(sql, list(column_values.values()))
-            conn.commit()
-            messagebox.showinfo("Success", f"Data updated in {table_name} where {condition}")
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to update data: {e}")
+        root.mainloop()
+    finally:
+        close_all()
 
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = DatabaseBrowserApp(root)
-    root.mainloop()
+    main()
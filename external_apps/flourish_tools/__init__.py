@@ -0,0 +1,34 @@
+"""Headless, importable core of the FlourishWellness external_apps tools.
+
+The tkinter front ends (import_csv.py, modcolumns.py, browse_db.py) are thin
+wrappers over this package, and `python -m flourish_tools` exposes the same
+functions as a command-line tool for scheduled jobs.
+"""
+from .browser import (
+    delete_data_from_table,
+    fetch_table_data,
+    fetch_tables,
+    update_data_in_table,
+)
+from .columns import add_column_to_db
+from .db import get_connection
+from .fanout import import_csv_to_targets
+from .importer import import_csv_to_db
+from .plan import apply_import_plan, build_import_plan
+from .streaming import import_csv_streaming
+from .synthetic import generate_dataset
+
+__all__ = [
+    "add_column_to_db",
+    "apply_import_plan",
+    "build_import_plan",
+    "delete_data_from_table",
+    "fetch_table_data",
+    "fetch_tables",
+    "generate_dataset",
+    "get_connection",
+    "import_csv_streaming",
+    "import_csv_to_db",
+    "import_csv_to_targets",
+    "update_data_in_table",
+]
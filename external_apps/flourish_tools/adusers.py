@@ -0,0 +1,297 @@
+"""Pluggable sources of AD users for populate_surveys.py.
+
+Each source returns a list of user dicts shaped like the PowerShell output:
+{"SamAccountName", "DisplayName", "Enabled", "whenChanged"}, where whenChanged
+is an ISO-8601 UTC string (or None when the source does not know it).
+
+    PowerShellUserSource  Get-ADUser through powershell.exe; Windows on the domain only.
+    FileUserSource        A JSON export (the PowerShell output format) or an LDIF file,
+                          so the tools can run on Linux against a stand-in.
+    CachedUserSource      Wraps another source with an on-disk cache.
+
+Starting PowerShell and importing the ActiveDirectory module takes seconds on
+every run. CachedUserSource keeps the last result in
+~/.cache/flourish_tools/ and serves it until ttl runs out. After that it asks
+the wrapped source only for users whose whenChanged is newer than the newest
+one it has seen, merges them in, and drops users that came back disabled. A
+delta query cannot see deleted accounts, so a full query still runs once the
+cache is older than full_refresh_after.
+"""
+import base64
+import hashlib
+import json
+import os
+import subprocess
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .schema import default_cache_path as default_schema_cache_path
+
+CACHE_TTL = 3600.0
+FULL_REFRESH_AFTER = 7 * 24 * 3600.0
+# whenChanged is not replicated; each domain controller stamps its own. Ask
+# for a little more than strictly needed so a lagging DC does not hide changes.
+DELTA_OVERLAP = timedelta(minutes=15)
+
+# userAccountControl flag for a disabled account.
+ACCOUNTDISABLE = 0x2
+
+
+def _iso_utc(value):
+    """Normalize a datetime or timestamp string to ISO-8601 UTC, or return None."""
+    if value in (None, ""):
+        return None
+    if isinstance(value, str):
+        text = value.strip()
+        digits = text.rstrip("Z").split(".")[0]
+        if text.endswith("Z") and len(digits) == 14 and digits.isdigit():
+            # LDAP generalized time, e.g. 20260105143000.0Z
+            value = datetime.strptime(digits, "%Y%m%d%H%M%S")
+        else:
+            value = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    # Fixed width, so the strings compare in time order.
+    return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _normalize_user(item):
+    """Return a user dict from a PowerShell/JSON item, or None without a SamAccountName."""
+    username = item.get("SamAccountName")
+    if not username:
+        return None
+    return {
+        "SamAccountName": username,
+        "DisplayName": item.get("DisplayName") or username,
+        "Enabled": item.get("Enabled", True) is not False,
+        "whenChanged": _iso_utc(item.get("whenChanged")),
+    }
+
+
+def _changed_after(users, changed_since):
+    if changed_since is None:
+        return users
+    changed_since = _iso_utc(changed_since)
+    return [u for u in users if u["whenChanged"] is None or u["whenChanged"] > changed_since]
+
+
+class PowerShellUserSource:
+    """Enabled users under an OU, read with Get-ADUser."""
+
+    supports_delta = True
+
+    def __init__(self, search_base):
+        self.search_base = search_base
+        self.cache_key = f"powershell:{search_base}"
+
+    def _script(self, changed_since):
+        if changed_since is None:
+            select = "$filter = 'Enabled -eq $true'"
+        else:
+            # Disabled users are returned too, so the cache can drop them.
+            select = (
+                f"$since = [DateTime]::Parse('{changed_since}', $null, 'RoundtripKind')\n"
+                "$filter = 'whenChanged -gt $since'"
+            )
+        return rf"""
+Import-Module ActiveDirectory
+$base = '{self.search_base}'
+{select}
+$users = Get-ADUser -SearchBase $base -Filter $filter -Properties DisplayName, whenChanged |
+    Select-Object SamAccountName, DisplayName, Enabled,
+        @{{n='whenChanged'; e={{$_.whenChanged.ToUniversalTime().ToString('o')}}}}
+$users | ConvertTo-Json -Depth 3 -Compress
+"""
+
+    def fetch(self, changed_since=None):
+        result = subprocess.run(
+            [
+                "powershell",
+                "-NoProfile",
+                "-ExecutionPolicy",
+                "Bypass",
+                "-Command",
+                self._script(changed_since),
+            ],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"Failed to query AD.\nSTDOUT: {result.stdout.strip()}\nSTDERR: {result.stderr.strip()}"
+            )
+
+        raw = result.stdout.strip()
+        if not raw:
+            return []
+
+        parsed = json.loads(raw)
+        if isinstance(parsed, dict):
+            parsed = [parsed]
+        return [user for user in map(_normalize_user, parsed) if user]
+
+
+def parse_ldif(text):
+    """Parse LDIF text into a list of {lowercased attribute: first value} dicts."""
+    entries = []
+    entry = {}
+    lines = []
+    for raw_line in text.splitlines():
+        if raw_line.startswith(" ") and lines:
+            lines[-1] += raw_line[1:]  # folded continuation line
+        else:
+            lines.append(raw_line)
+
+    for line in lines + [""]:
+        if not line.strip():
+            if entry:
+                entries.append(entry)
+                entry = {}
+            continue
+        if line.startswith("#") or ":" not in line:
+            continue
+        name, _, value = line.partition(":")
+        if value.startswith(":"):
+            value = base64.b64decode(value[1:].strip()).decode("utf-8")
+        else:
+            value = value.strip()
+        entry.setdefault(name.strip().lower(), value)
+    return entries
+
+
+class FileUserSource:
+    """Users from a JSON export (PowerShell format) or an LDIF file."""
+
+    supports_delta = True
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.cache_key = f"file:{self.path.resolve()}"
+
+    def _read_users(self):
+        text = self.path.read_text(encoding="utf-8-sig")
+        if self.path.suffix.lower() in (".ldif", ".ldf"):
+            users = []
+            for entry in parse_ldif(text):
+                control = int(entry.get("useraccountcontrol") or 0)
+                user = _normalize_user(
+                    {
+                        "SamAccountName": entry.get("samaccountname"),
+                        "DisplayName": entry.get("displayname"),
+                        "Enabled": not control & ACCOUNTDISABLE,
+                        "whenChanged": entry.get("whenchanged"),
+                    }
+                )
+                if user:
+                    users.append(user)
+            return users
+
+        parsed = json.loads(text) if text.strip() else []
+        if isinstance(parsed, dict):
+            parsed = [parsed]
+        return [user for user in map(_normalize_user, parsed) if user]
+
+    def fetch(self, changed_since=None):
+        users = _changed_after(self._read_users(), changed_since)
+        if changed_since is None:
+            users = [u for u in users if u["Enabled"]]
+        return users
+
+
+def default_cache_path(source):
+    digest = hashlib.sha256(source.cache_key.encode("utf-8")).hexdigest()[:16]
+    return default_schema_cache_path().parent / f"ad_users_{digest}.json"
+
+
+class CachedUserSource:
+    """Serve another source's users from disk, refreshing by whenChanged delta."""
+
+    def __init__(
+        self,
+        source,
+        cache_path=None,
+        ttl=CACHE_TTL,
+        full_refresh_after=FULL_REFRESH_AFTER,
+        refresh=False,
+    ):
+        self.source = source
+        self.cache_key = source.cache_key
+        self.cache_path = Path(cache_path) if cache_path else default_cache_path(source)
+        self.ttl = ttl
+        self.full_refresh_after = full_refresh_after
+        self.refresh = refresh  # ignore the cache and run a full query
+        # "cache", "delta" or "full": how the last fetch was answered
+        self.last_fetch = None
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cache if cache.get("key") == self.cache_key else None
+
+    def _write_cache(self, cache):
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(cache), encoding="utf-8")
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass  # The cache is an optimization only.
+
+    def fetch(self):
+        """Return the enabled users, from the cache when it is fresh enough."""
+        now = time.time()
+        cache = None if self.refresh else self._read_cache()
+
+        if cache and now - cache["fetched_at"] < self.ttl:
+            self.last_fetch = "cache"
+            return list(cache["users"].values())
+
+        if (
+            cache
+            and getattr(self.source, "supports_delta", False)
+            and cache.get("high_water")
+            and now - cache["full_at"] < self.full_refresh_after
+        ):
+            since = datetime.fromisoformat(cache["high_water"]) - DELTA_OVERLAP
+            users = cache["users"]
+            for user in self.source.fetch(changed_since=_iso_utc(since)):
+                if user["Enabled"]:
+                    users[user["SamAccountName"]] = user
+                else:
+                    users.pop(user["SamAccountName"], None)
+            full_at = cache["full_at"]
+            self.last_fetch = "delta"
+        else:
+            users = {u["SamAccountName"]: u for u in self.source.fetch()}
+            full_at = now
+            self.last_fetch = "full"
+
+        stamps = [u["whenChanged"] for u in users.values() if u["whenChanged"]]
+        if cache and cache.get("high_water"):
+            stamps.append(cache["high_water"])
+        self._write_cache(
+            {
+                "key": self.cache_key,
+                "fetched_at": now,
+                "full_at": full_at,
+                "high_water": max(stamps) if stamps else None,
+                "users": users,
+            }
+        )
+        return list(users.values())
+
+
+def get_user_source(
+    search_base, users_file=None, cache_ttl=CACHE_TTL, cache_path=None, refresh=False
+):
+    """Build the source populate_surveys uses: a file or PowerShell, cached unless cache_ttl is 0."""
+    source = FileUserSource(users_file) if users_file else PowerShellUserSource(search_base)
+    if not cache_ttl:
+        return source
+    return CachedUserSource(source, cache_path=cache_path, ttl=cache_ttl, refresh=refresh)
@@ -0,0 +1,230 @@
+"""Vectorized, profile-driven answer generation for test data.
+
+Picking every answer with random.choice is slow at scale and gives every
+question the same flat 1/3-1/3-1/3 split, so the results pages never show the
+skew real facilities have. generate_answer_matrix builds the whole
+user x question matrix with NumPy in one pass instead:
+
+    profile = AnswerProfile.load("profile.json")
+    codes = generate_answer_matrix(
+        profile, community_keys, section_names, answered, seed=7
+    )
+    rows = answer_rows(codes, user_ids, question_ids)  # ready for executemany
+
+codes[u, q] is an index into ANSWER_CHOICES, or -1 where the user did not
+answer. The same seed and inputs always give the same matrix.
+
+A profile is JSON like:
+
+    {
+        "default": {"Fully Implemented": 5, "Partially Implemented": 3,
+                    "Not a Current Practice": 2},
+        "communities": {"10003": {"Fully Implemented": 0.5}},
+        "sections": {"Mental Health": {"Not a Current Practice": 2}},
+        "user_correlation": 0.2,
+        "section_correlation": 0.4
+    }
+
+"default" gives the relative weight of each answer. Community and section
+entries multiply those weights (missing answers count as 1), so a facility
+that is weak everywhere and a section everyone struggles with combine.
+
+Answers are correlated the way real surveys are. Each answer is drawn from a
+latent normal score made of a per-user factor (user_correlation), a
+per-user-per-section factor (section_correlation) and noise. The score is
+then cut at the normal quantiles of that cell's probabilities. The marginal
+answer mix still matches the profile exactly, but a user who fully
+implements one practice in a section tends to do the same for the rest of it.
+
+NumPy is imported only when a matrix is generated.
+"""
+import importlib
+import json
+from statistics import NormalDist
+
+ANSWER_CHOICES = ["Fully Implemented", "Partially Implemented", "Not a Current Practice"]
+UNANSWERED = -1
+
+DEFAULT_USER_CORRELATION = 0.2
+DEFAULT_SECTION_CORRELATION = 0.4
+
+
+def _import_numpy():
+    try:
+        return importlib.import_module("numpy")
+    except ImportError:
+        raise RuntimeError("numpy is not installed. Run: pip install numpy")
+
+
+class AnswerProfile:
+    """Answer weights with per-community and per-section biases."""
+
+    def __init__(
+        self,
+        default=None,
+        communities=None,
+        sections=None,
+        user_correlation=DEFAULT_USER_CORRELATION,
+        section_correlation=DEFAULT_SECTION_CORRELATION,
+    ):
+        self.default = self._weights(default or {answer: 1 for answer in ANSWER_CHOICES})
+        self.communities = {
+            str(key): self._weights(value, fill=1) for key, value in (communities or {}).items()
+        }
+        self.sections = {
+            str(key): self._weights(value, fill=1) for key, value in (sections or {}).items()
+        }
+        if user_correlation < 0 or section_correlation < 0 or (
+            user_correlation + section_correlation >= 1
+        ):
+            raise ValueError("Correlations must be non-negative and sum to less than 1.")
+        self.user_correlation = user_correlation
+        self.section_correlation = section_correlation
+
+    @staticmethod
+    def _weights(mapping, fill=0):
+        unknown = set(mapping) - set(ANSWER_CHOICES)
+        if unknown:
+            raise ValueError(f"Unknown answer(s) in profile: {', '.join(sorted(unknown))}")
+        weights = [float(mapping.get(answer, fill)) for answer in ANSWER_CHOICES]
+        if any(weight < 0 for weight in weights) or not any(weights):
+            raise ValueError("Answer weights must be non-negative and not all zero.")
+        return weights
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            default=data.get("default"),
+            communities=data.get("communities"),
+            sections=data.get("sections"),
+            user_correlation=data.get("user_correlation", DEFAULT_USER_CORRELATION),
+            section_correlation=data.get("section_correlation", DEFAULT_SECTION_CORRELATION),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def probabilities(self, community_key, section_name):
+        """Return the answer probabilities for one community and section."""
+        weights = list(self.default)
+        for bias in (
+            self.communities.get(str(community_key)),
+            self.sections.get(str(section_name)),
+        ):
+            if bias:
+                weights = [w * b for w, b in zip(weights, bias)]
+        total = sum(weights)
+        if not total:
+            raise ValueError(
+                f"Profile leaves no possible answer for community {community_key},"
+                f" section {section_name!r}."
+            )
+        return [w / total for w in weights]
+
+    def cut_points(self, community_key, section_name):
+        """Return the two latent-score cut points for one community and section.
+
+        Scores at or below the first are "Not a Current Practice", at or below
+        the second "Partially Implemented", and above it "Fully Implemented".
+        """
+        fully, partially, not_current = self.probabilities(community_key, section_name)
+        normal = NormalDist()
+
+        def quantile(p):
+            if p <= 0:
+                return float("-inf")
+            if p >= 1:
+                return float("inf")
+            return normal.inv_cdf(p)
+
+        return quantile(not_current), quantile(not_current + partially)
+
+
+def answered_mask(n_users, n_questions, completion_rate, partial_rate, seed=0):
+    """
+    Return a (n_users, n_questions) bool matrix of which questions are answered.
+
+    completion_rate of the rows are all True, partial_rate answer a random
+    share of the questions (at least one, never all), and the rest are empty.
+    With a single question nobody can be partial, so those users count as
+    not started, as in synthetic.generate_year_rows.
+    """
+    np = _import_numpy()
+    rng = np.random.default_rng([seed, 1])
+    draw = rng.random(n_users)
+    complete = draw < completion_rate
+    partial = ~complete & (draw < completion_rate + partial_rate)
+    if n_questions < 2:
+        partial[:] = False
+
+    share = rng.uniform(0.1, 0.9, n_users)[:, None]
+    mask = rng.random((n_users, n_questions)) < share
+    if n_questions > 1:
+        # Keep partial users partial: at least one answer, at least one gap.
+        columns = rng.integers(0, n_questions, size=(n_users, 2))
+        rows = np.arange(n_users)
+        mask[rows, columns[:, 0]] = True
+        columns[:, 1] = (columns[:, 0] + 1 + columns[:, 1] % (n_questions - 1)) % n_questions
+        mask[rows, columns[:, 1]] = False
+    mask &= partial[:, None]
+    mask |= complete[:, None]
+    return mask
+
+
+def generate_answer_matrix(profile, community_keys, section_names, answered=None, seed=0):
+    """
+    Return an int8 (users x questions) matrix of ANSWER_CHOICES indexes.
+
+    community_keys has one entry per user and section_names one per question
+    (the name of the top-level section it belongs to). answered is an optional
+    bool matrix from answered_mask; cells it leaves False are UNANSWERED.
+    """
+    np = _import_numpy()
+    rng = np.random.default_rng([seed, 2])
+    n_users, n_questions = len(community_keys), len(section_names)
+
+    communities, community_index = np.unique(
+        np.asarray([str(key) for key in community_keys], dtype=object), return_inverse=True
+    )
+    sections, section_index = np.unique(
+        np.asarray([str(name) for name in section_names], dtype=object), return_inverse=True
+    )
+
+    rho_user = profile.user_correlation
+    rho_section = profile.section_correlation
+    scores = np.sqrt(rho_user) * rng.standard_normal((n_users, 1), dtype=np.float32)
+    scores = scores + np.sqrt(rho_section) * rng.standard_normal(
+        (n_users, len(sections)), dtype=np.float32
+    )[:, section_index]
+    scores += np.sqrt(1 - rho_user - rho_section) * rng.standard_normal(
+        (n_users, n_questions), dtype=np.float32
+    )
+
+    # cuts[c, s] holds the two cut points for community c and section s.
+    cuts = np.array(
+        [[profile.cut_points(c, s) for s in sections] for c in communities],
+        dtype=np.float32,
+    ).reshape(len(communities), len(sections), 2)
+    cell_cuts = cuts[community_index[:, None], section_index[None, :]]
+    level = (scores > cell_cuts[..., 0]).astype(np.int8) + (scores > cell_cuts[..., 1])
+    codes = (2 - level).astype(np.int8)  # level 2 is "Fully Implemented", index 0
+
+    if answered is not None:
+        codes[~np.asarray(answered, dtype=bool)] = UNANSWERED
+    return codes
+
+
+def answer_rows(codes, user_ids, question_ids):
+    """Return (answer, question_id, user_id) tuples for every answered cell."""
+    np = _import_numpy()
+    users, questions = np.nonzero(codes != UNANSWERED)
+    texts = np.asarray(ANSWER_CHOICES, dtype=object)[codes[users, questions]]
+    return list(
+        zip(
+            texts.tolist(),
+            np.asarray(question_ids)[questions].tolist(),
+            np.asarray(user_ids)[users].tolist(),
+        )
+    )
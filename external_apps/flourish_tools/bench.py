@@ -0,0 +1,273 @@
+"""Benchmark the CSV import strategies on a SQLite stand-in.
+
+Every run gets a fresh SQLite database built from schema.sql and a synthetic
+questions CSV of the requested size. Each strategy is timed and its round
+trips are counted; its peak Python memory is tracked with tracemalloc in a
+second, untimed run, since tracing slows every allocation. A round
+trip is one execute or executemany call, which is what each call costs
+against SQL Server with fast_executemany. Results are plain JSON, so a run can
+be saved as a baseline and later runs compared against it with
+compare_results.
+
+SQLite has no network latency, so rows/sec here shows client-side cost.
+Round trips are the number that carries over to ASISQLDBPROD.
+"""
+import csv
+import json
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from . import db
+from .schema import create_sqlite_database
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+STRATEGIES = ("row", "bulk", "stream", "plan")
+
+
+class CountingCursor:
+    """Cursor proxy that counts execute/executemany calls."""
+
+    def __init__(self, cursor, counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def execute(self, *args, **kwargs):
+        self._counter["round_trips"] += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._counter["round_trips"] += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+
+class CountingConnection:
+    """Connection proxy whose cursors count round trips into a shared counter."""
+
+    def __init__(self, conn, counter):
+        self._conn = conn
+        self._counter = counter
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._conn.cursor(*args, **kwargs), self._counter)
+
+    def commit(self):
+        self._counter["round_trips"] += 1
+        return self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def generate_questions_csv(
+    csv_path,
+    rows,
+    sections=10,
+    subsections_per_section=3,
+    duplicate_ratio=0.05,
+    seed=0,
+):
+    """
+    Write a synthetic questions CSV with a header row.
+
+    Each row lands in one of `sections` sections and, two times out of three,
+    in one of its `subsections_per_section` subsections. About duplicate_ratio
+    of the rows repeat an earlier question with different case and spacing, so
+    they exercise the normalized duplicate check.
+    """
+    rng = random.Random(seed)
+    written = []
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Section", "Subsection", "Question"])
+        for n in range(rows):
+            if written and rng.random() < duplicate_ratio:
+                section_name, subsection_name, text = rng.choice(written)
+                text = "  " + text.upper().replace(" ", "  ")
+            else:
+                section_name = f"Section {rng.randrange(sections)}"
+                subsection_name = ""
+                if subsections_per_section and rng.random() < 2 / 3:
+                    subsection_name = (
+                        f"{section_name} / Sub {rng.randrange(subsections_per_section)}"
+                    )
+                text = f"Synthetic question {n}: is practice {rng.randrange(10**6)} in place?"
+                written.append((section_name, subsection_name, text))
+            writer.writerow([section_name, subsection_name, text])
+    return csv_path
+
+
+def create_bench_database(db_path):
+    """Create a schema.sql SQLite copy with one active survey year."""
+    create_sqlite_database(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            "INSERT INTO SurveyYear (Year, Status, CreatedAt) VALUES (?, 2, ?)",
+            (datetime.now().year, datetime.now(timezone.utc).isoformat()),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return db_path
+
+
+def _run_strategy(strategy, csv_path, db_path, chunk_size):
+    if strategy == "row":
+        from .importer import import_csv_to_db
+
+        return import_csv_to_db(csv_path, "sqlite", db_path)
+    if strategy == "bulk":
+        from .importer import import_csv_to_db
+
+        return import_csv_to_db(csv_path, "sqlite", db_path, bulk=True)
+    if strategy == "stream":
+        from .streaming import import_csv_streaming
+
+        return import_csv_streaming(
+            csv_path,
+            "sqlite",
+            db_path,
+            chunk_size=chunk_size,
+            checkpoint_path=f"{db_path}.checkpoint.json",
+        )
+    if strategy == "plan":
+        from .plan import apply_import_plan, build_import_plan
+
+        plan = build_import_plan(csv_path, "sqlite", db_path)
+        return apply_import_plan(plan, "sqlite", db_path)
+    raise ValueError(f"Unknown strategy: {strategy}")
+
+
+def run_benchmark(
+    sizes=DEFAULT_SIZES,
+    strategies=STRATEGIES,
+    sections=10,
+    subsections_per_section=3,
+    duplicate_ratio=0.05,
+    chunk_size=1000,
+    seed=0,
+    work_dir=None,
+):
+    """Run every strategy at every size and return a JSON-serializable result dict."""
+    results = []
+    counter = {"round_trips": 0}
+
+    def count_round_trips(db_type, conn):
+        return CountingConnection(conn, counter)
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        for size in sizes:
+            csv_path = os.path.join(tmp, f"questions_{size}.csv")
+            generate_questions_csv(
+                csv_path,
+                size,
+                sections=sections,
+                subsections_per_section=subsections_per_section,
+                duplicate_ratio=duplicate_ratio,
+                seed=seed,
+            )
+
+            for strategy in strategies:
+                db_path = os.path.join(tmp, f"bench_{size}_{strategy}.db")
+                create_bench_database(db_path)
+
+                counter["round_trips"] = 0
+                db.CONNECTION_HOOKS.append(count_round_trips)
+                started = time.perf_counter()
+                try:
+                    stats = _run_strategy(strategy, csv_path, db_path, chunk_size)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    db.CONNECTION_HOOKS.remove(count_round_trips)
+                os.remove(db_path)
+
+                # tracemalloc slows every allocation, so peak memory comes from
+                # a second, untimed run on a fresh database.
+                memory_db_path = os.path.join(tmp, f"bench_{size}_{strategy}_memory.db")
+                create_bench_database(memory_db_path)
+                tracemalloc.start()
+                try:
+                    _run_strategy(strategy, csv_path, memory_db_path, chunk_size)
+                    _, peak = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+                os.remove(memory_db_path)
+
+                results.append(
+                    {
+                        "strategy": strategy,
+                        "rows": size,
+                        "seconds": round(elapsed, 4),
+                        "rows_per_sec": round(size / elapsed, 1) if elapsed else None,
+                        "round_trips": counter["round_trips"],
+                        "peak_memory_bytes": peak,
+                        "stats": stats,
+                    }
+                )
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "params": {
+            "sections": sections,
+            "subsections_per_section": subsections_per_section,
+            "duplicate_ratio": duplicate_ratio,
+            "chunk_size": chunk_size,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare_results(baseline, current, tolerance=0.2):
+    """
+    Return a list of regression messages for runs present in both result sets.
+
+    A run regresses when rows/sec drops, or round trips or peak memory grow,
+    by more than tolerance (a fraction) against the baseline.
+    """
+    base_runs = {(r["strategy"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for run in current["results"]:
+        base = base_runs.get((run["strategy"], run["rows"]))
+        if not base:
+            continue
+        label = f"{run['strategy']} @ {run['rows']} rows"
+        if base["rows_per_sec"] and run["rows_per_sec"] < base["rows_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: rows/sec {run['rows_per_sec']} < baseline {base['rows_per_sec']}"
+            )
+        if run["round_trips"] > base["round_trips"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: round trips {run['round_trips']} > baseline {base['round_trips']}"
+            )
+        if run["peak_memory_bytes"] > base["peak_memory_bytes"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: peak memory {run['peak_memory_bytes']}"
+                f" > baseline {base['peak_memory_bytes']}"
+            )
+    return regressions
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,522 @@
+"""Read/write helpers behind the database browser, usable without a display.
+
+Every helper takes an optional db_type/db_target pair and defaults to the
+production SQL Server connection string. Helpers share one long-lived
+connection per target through connections.get_manager instead of opening
+their own. Errors are raised to the caller.
+"""
+import queue
+import threading
+import time
+from contextlib import closing, contextmanager
+
+from .columnar import ColumnBuffer
+from .connections import get_manager
+from .db import DB_CONN_STR, qualified_name, quote_ident
+from .filters import compile_filters, page_order
+from .pagecache import page_cache_key, table_version
+
+DEFAULT_PAGE_SIZE = 100
+FETCH_BATCH_SIZE = 200
+
+
+@contextmanager
+def _connect(db_type, db_target):
+    """Yield (conn, cursor) on the shared connection for the target."""
+    if db_target is None:
+        db_target = DB_CONN_STR if db_type == "sqlserver" else None
+    if db_target is None:
+        raise ValueError("A database path is required for SQLite.")
+    manager = get_manager(db_type, db_target)
+    with manager.connection() as conn:
+        yield conn, manager.cursor()
+
+
+def fetch_tables(db_type="sqlserver", db_target=None):
+    """Fetch (schema, table) pairs for every base table in the database."""
+    with _connect(db_type, db_target) as (conn, cursor):
+        if db_type == "sqlite":
+            cursor.execute(
+                "SELECT 'main', name FROM sqlite_master"
+                " WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )
+        else:
+            cursor.execute(
+                """
+                SELECT TABLE_SCHEMA, TABLE_NAME
+                FROM INFORMATION_SCHEMA.TABLES
+                WHERE TABLE_TYPE = 'BASE TABLE'
+                ORDER BY TABLE_SCHEMA, TABLE_NAME
+                """
+            )
+        return [(row[0], row[1]) for row in cursor.fetchall()]
+
+
+def fetch_table_data(table_name, schema_name=None, db_type="sqlserver", db_target=None):
+    """Fetch (columns, rows) for every row of a table."""
+    with _connect(db_type, db_target) as (conn, cursor):
+        cursor.execute(f"SELECT * FROM {qualified_name(schema_name, table_name)}")
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        return columns, rows
+
+
+def delete_data_from_table(
+    table_name, condition, schema_name=None, db_type="sqlserver", db_target=None
+):
+    """Delete rows matching a raw SQL condition. Returns the number of rows deleted."""
+    with _connect(db_type, db_target) as (conn, cursor):
+        cursor.execute(
+            f"DELETE FROM {qualified_name(schema_name, table_name)} WHERE {condition}"
+        )
+        conn.commit()
+        return cursor.rowcount
+
+
+def update_data_in_table(
+    table_name,
+    column_values,
+    condition,
+    condition_params=(),
+    schema_name=None,
+    db_type="sqlserver",
+    db_target=None,
+):
+    """Update rows matching a raw SQL condition. Returns the number of rows updated."""
+    with _connect(db_type, db_target) as (conn, cursor):
+        set_clause = ", ".join([f"{col} = ?" for col in column_values.keys()])
+        sql = f"UPDATE {qualified_name(schema_name, table_name)} SET {set_clause} WHERE {condition}"
+        cursor.execute(sql, list(column_values.values()) + list(condition_params))
+        conn.commit()
+        return cursor.rowcount
+
+
+def fetch_primary_key(cursor, db_type, schema_name, table_name):
+    """Return the primary key column names of a table, in key order ([] if none)."""
+    if db_type == "sqlite":
+        cursor.execute(
+            "SELECT name FROM pragma_table_info(?, ?) WHERE pk > 0 ORDER BY pk",
+            (table_name, schema_name or "main"),
+        )
+    else:
+        cursor.execute(
+            """
+            SELECT kcu.COLUMN_NAME
+            FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
+            INNER JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
+                ON kcu.CONSTRAINT_NAME = tc.CONSTRAINT_NAME
+                AND kcu.TABLE_SCHEMA = tc.TABLE_SCHEMA
+                AND kcu.TABLE_NAME = tc.TABLE_NAME
+            WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
+                AND tc.TABLE_SCHEMA = ? AND tc.TABLE_NAME = ?
+            ORDER BY kcu.ORDINAL_POSITION
+            """,
+            (schema_name or "dbo", table_name),
+        )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def keyset_predicate(order, key_values):
+    """
+    Build a WHERE fragment matching rows that sort after key_values.
+
+    order is a list of (column, descending) pairs. NULL sorts lowest, which
+    is what both SQL Server and SQLite do, so a NULL key value is handled with
+    IS NULL / IS NOT NULL instead of a comparison.
+
+    Returns (sql, params); sql is "1 = 0" when no row can follow.
+    """
+    terms = []
+    params = []
+    for i, (column, descending) in enumerate(order):
+        parts = []
+        part_params = []
+        for prev_column, _ in order[:i]:
+            prev_value = key_values[prev_column]
+            if prev_value is None:
+                parts.append(f"{quote_ident(prev_column)} IS NULL")
+            else:
+                parts.append(f"{quote_ident(prev_column)} = ?")
+                part_params.append(prev_value)
+
+        value = key_values[column]
+        ident = quote_ident(column)
+        if not descending:
+            if value is None:
+                parts.append(f"{ident} IS NOT NULL")
+            else:
+                parts.append(f"{ident} > ?")
+                part_params.append(value)
+        else:
+            if value is None:
+                continue  # Nothing sorts below NULL.
+            parts.append(f"({ident} < ? OR {ident} IS NULL)")
+            part_params.append(value)
+
+        terms.append("(" + " AND ".join(parts) + ")")
+        params.extend(part_params)
+
+    if not terms:
+        return "1 = 0", []
+    return "(" + " OR ".join(terms) + ")", params
+
+
+def build_page_query(
+    db_type,
+    schema_name,
+    table_name,
+    order,
+    limit,
+    after=None,
+    before=None,
+    filters=None,
+):
+    """
+    Build a keyset-paginated SELECT.
+
+    after/before are {column: value} dicts taken from the last/first row of
+    the current page. A "before" query runs in reverse order, so the caller
+    must reverse the rows it returns. filters is an optional
+    {column: (operator, value)} dict (see filters.py).
+    """
+    if before is not None:
+        order = [(column, not descending) for column, descending in order]
+        bound = before
+    else:
+        bound = after
+
+    conditions, params = [], []
+    if filters:
+        filter_sql, filter_params = compile_filters(filters, db_type)
+        conditions.append(filter_sql)
+        params.extend(filter_params)
+    if bound is not None:
+        keyset_sql, keyset_params = keyset_predicate(order, bound)
+        conditions.append(keyset_sql)
+        params.extend(keyset_params)
+    where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    order_sql = ", ".join(
+        f"{quote_ident(column)} {'DESC' if descending else 'ASC'}"
+        for column, descending in order
+    )
+    table_sql = qualified_name(schema_name, table_name)
+
+    if db_type == "sqlserver":
+        sql = f"SELECT TOP ({int(limit)}) * FROM {table_sql}{where_sql} ORDER BY {order_sql}"
+    else:
+        sql = f"SELECT * FROM {table_sql}{where_sql} ORDER BY {order_sql} LIMIT {int(limit)}"
+    return sql, params
+
+
+class TablePage:
+    """One page of rows plus what is needed to fetch its neighbours."""
+
+    def __init__(self, columns, rows, key_columns, has_next, has_prev, order=None):
+        self.columns = columns
+        self.rows = rows
+        self.key_columns = key_columns
+        self.has_next = has_next
+        self.has_prev = has_prev
+        # (column, descending) pairs the page is sorted by; the key columns
+        # come last as a tie-breaker.
+        self.order = order or [(column, False) for column in key_columns]
+
+    def key_of(self, row):
+        """Return the row's values for every ORDER BY column, for keyset paging."""
+        return {column: row[self.columns.index(column)] for column, _ in self.order}
+
+    @property
+    def first_key(self):
+        return self.key_of(self.rows[0]) if self.rows else None
+
+    @property
+    def last_key(self):
+        return self.key_of(self.rows[-1]) if self.rows else None
+
+
+def _make_page(columns, rows, key_columns, order, more, after, before):
+    # rows are in display order; more is True when the query returned the
+    # extra page_size + 1th row.
+    if before is not None:
+        return TablePage(columns, rows, key_columns, True, more, order)
+    return TablePage(columns, rows, key_columns, more, after is not None, order)
+
+
+def read_page(
+    cursor,
+    db_type,
+    schema_name,
+    table_name,
+    key_columns,
+    page_size=DEFAULT_PAGE_SIZE,
+    after=None,
+    before=None,
+    sort=(),
+    filters=None,
+):
+    """Run one keyset page query on an open cursor and return a TablePage."""
+    order = page_order(key_columns, sort)
+    sql, params = build_page_query(
+        db_type, schema_name, table_name, order, page_size + 1, after, before, filters
+    )
+    cursor.execute(sql, params)
+    columns = [desc[0] for desc in cursor.description]
+    rows = cursor.fetchall()
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if before is not None:
+        rows.reverse()
+    return _make_page(columns, rows, key_columns, order, more, after, before)
+
+
+def resolve_key_columns(cursor, db_type, schema_name, table_name):
+    """Primary key columns of a table, or all of its columns when it has none."""
+    key_columns = fetch_primary_key(cursor, db_type, schema_name, table_name)
+    if not key_columns:
+        cursor.execute(
+            f"SELECT * FROM {qualified_name(schema_name, table_name)} WHERE 1 = 0"
+        )
+        key_columns = [desc[0] for desc in cursor.description]
+        cursor.fetchall()
+    return key_columns
+
+
+def fetch_table_page(
+    table_name,
+    schema_name=None,
+    key_columns=None,
+    page_size=DEFAULT_PAGE_SIZE,
+    after=None,
+    before=None,
+    db_type="sqlserver",
+    db_target=None,
+    sort=(),
+    filters=None,
+):
+    """
+    Fetch one page of a table ordered by sort, then by its primary key.
+
+    Tables without a primary key are ordered by all of their columns.
+    sort is a list of (column, descending) pairs and filters a
+    {column: (operator, value)} dict; both run on the server.
+    """
+    with _connect(db_type, db_target) as (conn, cursor):
+        if not key_columns:
+            key_columns = resolve_key_columns(cursor, db_type, schema_name, table_name)
+        return read_page(
+            cursor,
+            db_type,
+            schema_name,
+            table_name,
+            key_columns,
+            page_size,
+            after,
+            before,
+            sort,
+            filters,
+        )
+
+
+class PageFetch:
+    """
+    Fetch one keyset page on a worker thread, streaming rows in batches.
+
+    The worker reads with cursor.fetchmany(batch_size) into a ColumnBuffer
+    and puts messages on self.messages for the UI thread to drain:
+
+        ("columns", ColumnBuffer)  once, before any rows
+        ("rows", row count)        after each batch; rows below the count
+                                   can be read from the buffer
+        ("done", TablePage)        the finished page; its rows are the buffer
+        ("cancelled", None)
+        ("error", exception)
+
+    With a PageCache, a cached page is posted as "columns" then "done"
+    without running the page query. With change_check (see pagecache.py)
+    the table's version is checked first, and a page cached under an older
+    version is fetched again.
+
+    A "before" page arrives last row first; its buffer is created with
+    reverse=True, so it always reads in display order.
+
+    cancel() stops the worker between batches and interrupts a statement
+    that is still running on the server.
+    """
+
+    def __init__(
+        self,
+        table_name,
+        schema_name=None,
+        key_columns=None,
+        page_size=DEFAULT_PAGE_SIZE,
+        after=None,
+        before=None,
+        db_type="sqlserver",
+        db_target=None,
+        batch_size=FETCH_BATCH_SIZE,
+        sort=(),
+        filters=None,
+        cache=None,
+        change_check=None,
+    ):
+        self.table_name = table_name
+        self.schema_name = schema_name
+        self.key_columns = key_columns
+        self.page_size = page_size
+        self.after = after
+        self.before = before
+        self.db_type = db_type
+        self.db_target = db_target
+        self.batch_size = batch_size
+        self.sort = sort
+        self.filters = filters
+        self.cache = cache
+        self.change_check = change_check
+        self.from_cache = False
+
+        self.messages = queue.Queue()
+        self.rows_fetched = 0
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._interrupt_lock = threading.Lock()
+        self._conn = None
+        self._cursor = None
+        self._thread = None
+
+    @property
+    def reverse(self):
+        """True when rows arrive in reverse display order (a "before" page)."""
+        return self.before is not None
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+        with self._interrupt_lock:
+            conn, cursor = self._conn, self._cursor
+            try:
+                if hasattr(conn, "interrupt"):
+                    conn.interrupt()  # sqlite3
+                elif cursor is not None:
+                    cursor.cancel()  # pyodbc: SQLCancel on the running statement
+            except Exception:
+                pass  # The worker also checks the flag between batches.
+
+    def _run(self):
+        try:
+            page = self._fetch()
+        except Exception as exc:
+            self.finished_at = time.perf_counter()
+            self.messages.put(("cancelled", None) if self.cancelled else ("error", exc))
+            return
+        self.finished_at = time.perf_counter()
+        if page is None:
+            self.messages.put(("cancelled", None))
+        else:
+            self.messages.put(("done", page))
+
+    def _fetch(self):
+        with _connect(self.db_type, self.db_target) as (conn, cached_cursor):
+            version = None
+            if self.change_check:
+                version = table_version(
+                    cached_cursor,
+                    self.db_type,
+                    self.schema_name,
+                    self.table_name,
+                    self.change_check,
+                )
+            if self.cache is not None:
+                cache_key = page_cache_key(
+                    self.db_type,
+                    self.db_target,
+                    self.schema_name,
+                    self.table_name,
+                    self.sort,
+                    self.filters,
+                    self.page_size,
+                    self.after,
+                    self.before,
+                )
+                page = self.cache.get(cache_key, version)
+                if page is not None:
+                    self.from_cache = True
+                    self.rows_fetched = len(page.rows)
+                    self.messages.put(("columns", page.rows))
+                    return page
+
+            key_columns = self.key_columns or resolve_key_columns(
+                cached_cursor, self.db_type, self.schema_name, self.table_name
+            )
+            order = page_order(key_columns, self.sort)
+            sql, params = build_page_query(
+                self.db_type,
+                self.schema_name,
+                self.table_name,
+                order,
+                self.page_size + 1,
+                self.after,
+                self.before,
+                self.filters,
+            )
+
+            # The page query gets its own cursor, so a cancelled, half-read
+            # result never stays behind in the shared statement cache.
+            with closing(conn.cursor()) as cursor:
+                with self._interrupt_lock:
+                    if self.cancelled:
+                        return None
+                    self._conn, self._cursor = conn, cursor
+                try:
+                    page = self._read(cursor, sql, params, key_columns, order)
+                finally:
+                    # The shared connection is about to serve other callers.
+                    with self._interrupt_lock:
+                        self._conn = self._cursor = None
+            if page is not None and self.cache is not None:
+                self.cache.put(cache_key, page, version)
+            return page
+
+    def _read(self, cursor, sql, params, key_columns, order):
+        cursor.execute(sql, params)
+        columns = [desc[0] for desc in cursor.description]
+        # pyodbc reports a Python type per column; sqlite3 reports None.
+        types = [desc[1] if isinstance(desc[1], type) else None for desc in cursor.description]
+        buffer = ColumnBuffer(columns, reverse=self.reverse, types=types)
+        self.messages.put(("columns", buffer))
+
+        more = False
+        while not self.cancelled and not more:
+            batch = cursor.fetchmany(self.batch_size)
+            if not batch:
+                break
+            # The extra page_size + 1th row only tells us another page
+            # exists; it is never shown.
+            room = self.page_size - len(buffer)
+            if len(batch) > room:
+                more = True
+                batch = batch[:room]
+            buffer.append_rows(batch)
+            self.rows_fetched = len(buffer)
+            self.messages.put(("rows", len(buffer)))
+        if self.cancelled:
+            return None
+        return _make_page(
+            columns, buffer, key_columns, order, more, self.after, self.before
+        )
@@ -0,0 +1,674 @@
+"""Command-line entry point for the external_apps tools.
+
+Usage examples:
+    python -m flourish_tools import-csv questions.csv --db-type sqlite --target dev.db --bulk
+    python -m flourish_tools import-csv big.csv --chunk-size 1000
+    python -m flourish_tools plan questions.csv --apply
+    python -m flourish_tools import-csv questions.csv --to sqlite:dev.db --to sqlite:copy.db
+    python -m flourish_tools bench --sizes 1000,100000 --output bench.json
+    python -m flourish_tools generate --db-type sqlite --target big.db --facilities 500
+    python -m flourish_tools loadsim --db-type sqlite --target big.db --users 2000 --concurrency 32
+    python -m flourish_tools migrate changes.json --db-type sqlite --target dev.db --apply
+    python -m flourish_tools advise-indexes --db-type sqlite --target big.db --changes-out idx.json
+    python -m flourish_tools add-column dev.db Users Nickname TEXT
+    python -m flourish_tools tables
+    python -m flourish_tools rows Sections --schema dbo > sections.csv
+    python -m flourish_tools export Responses --schema dbo -o responses.parquet
+    python -m flourish_tools export Responses --filter UserId:=42 --sort Id:desc -o user42.csv
+
+Subcommand modules are imported only when their command runs, so the CLI starts
+in milliseconds and never loads tkinter.
+"""
+import argparse
+import sys
+
+from .db import DB_TYPES, default_target
+
+
+def add_target_args(parser, default_db_type="sqlserver"):
+    parser.add_argument(
+        "--db-type",
+        choices=DB_TYPES,
+        default=default_db_type,
+        help="Target database type (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--target",
+        help="SQLite file path or SQL Server connection string."
+        " SQL Server defaults to appsettings.json, then the built-in ASISQLDBPROD string.",
+    )
+
+
+def resolve_target(parser, args):
+    target = args.target or default_target(args.db_type)
+    if not target:
+        parser.error(f"--target is required for --db-type {args.db_type}")
+    return target
+
+
+def print_import_stats(stats):
+    print(f"Sections created: {stats['sections']}")
+    print(f"Subsections created: {stats['subsections']}")
+    print(f"Questions created: {stats['questions']}")
+    print(f"Duplicate questions skipped: {stats['duplicate_questions']}")
+    print(f"Rows skipped: {stats['skipped']}")
+
+
+def cmd_import_many(parser, args):
+    from .fanout import import_csv_to_targets, parse_target_spec
+
+    try:
+        targets = [parse_target_spec(spec) for spec in args.to]
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = import_csv_to_targets(args.csv_path, targets, max_workers=args.workers)
+    failed = 0
+    for result in results:
+        print(f"== {result['target']} ({result['seconds']:.2f}s)")
+        if result["error"]:
+            failed += 1
+            print(f"Import failed: {result['error']}")
+        else:
+            print_import_stats(result["stats"])
+    return 1 if failed else 0
+
+
+def cmd_import_csv(parser, args):
+    if args.chunk_size is not None and args.chunk_size <= 0:
+        parser.error("--chunk-size must be a positive number of rows")
+    if args.to:
+        if args.chunk_size is not None:
+            parser.error("--chunk-size cannot be combined with --to (--to always bulk-imports)")
+        return cmd_import_many(parser, args)
+
+    db_target = resolve_target(parser, args)
+    if args.chunk_size is not None:
+        from .streaming import import_csv_streaming
+
+        stats = import_csv_streaming(
+            args.csv_path,
+            args.db_type,
+            db_target,
+            chunk_size=args.chunk_size,
+            checkpoint_path=args.checkpoint,
+            progress=lambda s: print(
+                f"Committed: {s['questions']} question(s) created so far", file=sys.stderr
+            ),
+        )
+    else:
+        from .importer import import_csv_to_db
+
+        stats = import_csv_to_db(args.csv_path, args.db_type, db_target, bulk=args.bulk)
+    print_import_stats(stats)
+    return 0
+
+
+def cmd_plan(parser, args):
+    from .plan import apply_import_plan, build_import_plan
+
+    db_target = resolve_target(parser, args)
+    plan = build_import_plan(args.csv_path, args.db_type, db_target)
+    print(plan.format())
+    if not args.apply:
+        return 0
+    if not plan.has_writes():
+        print("Nothing to apply.")
+        return 0
+
+    stats = apply_import_plan(plan, args.db_type, db_target, apply_renames=args.apply_renames)
+    print(
+        f"Applied: {stats['sections']} section(s), {stats['subsections']} subsection(s),"
+        f" {stats['questions']} question(s), {stats['renamed_questions']} rename(s)."
+    )
+    return 0
+
+
+def cmd_bench(parser, args):
+    import json
+
+    from .bench import compare_results, load_results, run_benchmark
+
+    try:
+        sizes = [int(size) for size in args.sizes.split(",")]
+    except ValueError:
+        parser.error("--sizes must be a comma-separated list of row counts")
+
+    results = run_benchmark(
+        sizes=sizes,
+        strategies=args.strategies.split(","),
+        sections=args.sections,
+        subsections_per_section=args.subsections,
+        duplicate_ratio=args.duplicate_ratio,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+    )
+
+    for run in results["results"]:
+        print(
+            f"{run['strategy']:>6} {run['rows']:>9} rows  {run['rows_per_sec']:>10} rows/s"
+            f"  {run['round_trips']:>8} round trips  {run['peak_memory_bytes'] / 2**20:8.1f} MiB",
+            file=sys.stderr,
+        )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        regressions = compare_results(
+            load_results(args.baseline), results, tolerance=args.tolerance
+        )
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+def cmd_generate(parser, args):
+    from .synthetic import generate_dataset
+
+    years = None
+    if args.years:
+        try:
+            years = [int(year) for year in args.years.split(",")]
+        except ValueError:
+            parser.error("--years must be a comma-separated list of years")
+
+    def progress(stats):
+        print(
+            f"Year {stats['years']} written: {stats['responses']} responses so far"
+            f" ({stats['seconds']:.1f}s)",
+            file=sys.stderr,
+        )
+
+    answer_profile = None
+    if args.answer_profile:
+        from .answers import AnswerProfile
+
+        answer_profile = AnswerProfile.load(args.answer_profile)
+
+    stats = generate_dataset(
+        args.db_type,
+        resolve_target(parser, args),
+        facilities=args.facilities,
+        users_per_facility=args.users_per_facility,
+        years=years,
+        sections=args.sections,
+        subsections_per_section=args.subsections,
+        questions_per_section=args.questions,
+        completion_rate=args.completion_rate,
+        partial_rate=args.partial_rate,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        progress=progress,
+        answer_profile=answer_profile,
+    )
+    print(f"Facilities: {stats['facilities']} | Users: {stats['users']} | Years: {stats['years']}")
+    print(f"Sections: {stats['sections']} | Questions: {stats['questions']}")
+    print(
+        f"Responses: {stats['responses']} | Statuses: {stats['statuses']}"
+        f" ({stats['completed']} completed) in {stats['seconds']:.2f}s"
+    )
+    return 0
+
+
+def cmd_loadsim(parser, args):
+    import json
+
+    from .loadsim import run_load_simulation
+
+    results = run_load_simulation(
+        args.db_type,
+        resolve_target(parser, args),
+        users=args.users,
+        concurrency=args.concurrency,
+        saves_per_user=args.saves_per_user,
+        autosave_ratio=args.autosave_ratio,
+        complete_rate=args.complete_rate,
+        think_time=args.think_time,
+        seed=args.seed,
+        progress=lambda done, total: print(f"{done}/{total} users finished", file=sys.stderr),
+    )
+
+    print(
+        f"{results['params']['users']} users, concurrency {results['params']['concurrency']},"
+        f" {results['seconds']:.2f}s",
+        file=sys.stderr,
+    )
+    for operation, run in results["operations"].items():
+        print(
+            f"{operation:>8} {run['count']:>7} ops  p50 {run['p50_ms']:>8.1f}  p95 {run['p95_ms']:>8.1f}"
+            f"  p99 {run['p99_ms']:>8.1f} ms  {run['deadlocks']:>4} deadlocks"
+            f"  {run['lock_waits']:>6} lock waits ({run['lock_wait_ms']:.0f} ms)",
+            file=sys.stderr,
+        )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+def cmd_migrate(parser, args):
+    import json
+
+    from .migrate import apply_migration_plan, build_migration_plan, load_changes
+
+    db_target = resolve_target(parser, args)
+    try:
+        changes = load_changes(args.changes)
+        plan = build_migration_plan(
+            changes, args.db_type, db_target, online=False if args.offline else None
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(plan.format())
+    if not args.apply or not plan.has_writes():
+        return 0
+
+    def report(result):
+        lock = "-" if result["lock_seconds"] is None else f"{result['lock_seconds']:.3f}s"
+        wait = "-" if result["lock_wait_ms"] is None else f"{result['lock_wait_ms']:.0f} ms"
+        print(
+            f"{result['step']}: {result['seconds']:.3f}s, locks held {lock}, waited {wait}",
+            file=sys.stderr,
+        )
+
+    results = apply_migration_plan(
+        plan, args.db_type, db_target, lock_timeout_ms=args.lock_timeout, progress=report
+    )
+    failed = results and results[-1]["error"]
+    if failed:
+        print(f"{results[-1]['step']} failed and was rolled back: {failed}", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps(results, indent=2) + "\n")
+    return 1 if failed else 0
+
+
+def cmd_advise_indexes(parser, args):
+    import json
+
+    from .indexadvisor import QUERY_CATALOG, advise_indexes
+
+    shapes = QUERY_CATALOG
+    if args.shapes:
+        wanted = set(args.shapes.split(","))
+        shapes = [shape for shape in QUERY_CATALOG if shape.name in wanted]
+        unknown = wanted - {shape.name for shape in shapes}
+        if unknown:
+            parser.error(f"Unknown query shape(s): {', '.join(sorted(unknown))}")
+    try:
+        report = advise_indexes(
+            args.db_type,
+            resolve_target(parser, args),
+            shapes=shapes,
+            runs=args.runs,
+            min_speedup=args.min_speedup,
+            seed=args.seed,
+            progress=lambda message: print(message, file=sys.stderr),
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    for name, run in report["baseline"].items():
+        flags = ", ".join(run["flags"]) or "ok"
+        print(f"{name:>22} p50 {run['p50_ms']:>9.3f} ms  [{flags}]  {run['plan']}", file=sys.stderr)
+    for candidate in report["candidates"]:
+        mark = "+" if candidate["recommended"] else " "
+        print(
+            f"{mark} {candidate['change']['name']}: best {candidate['best_speedup']:.2f}x,"
+            f" built in {candidate['build_seconds']:.2f}s",
+            file=sys.stderr,
+        )
+
+    if args.changes_out:
+        with open(args.changes_out, "w", encoding="utf-8") as f:
+            f.write(json.dumps(report["recommended"], indent=2) + "\n")
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+def cmd_add_column(parser, args):
+    from .columns import add_column_to_db
+
+    success, message = add_column_to_db(
+        args.db_path, args.table_name, args.column_name, args.column_type
+    )
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+
+def cmd_tables(parser, args):
+    from .browser import fetch_tables
+    from .tablestats import describe_stats, fetch_table_stats
+
+    db_target = resolve_target(parser, args)
+    stats = fetch_table_stats(args.db_type, db_target) if args.stats else {}
+    for schema_name, table_name in fetch_tables(args.db_type, db_target):
+        summary = describe_stats(stats.get((schema_name, table_name)))
+        print(f"{schema_name}.{table_name}" + (f"\t{summary}" if summary else ""))
+    return 0
+
+
+def cmd_rows(parser, args):
+    import csv
+
+    from .browser import fetch_table_data
+
+    columns, rows = fetch_table_data(
+        args.table_name, args.schema, args.db_type, resolve_target(parser, args)
+    )
+    writer = csv.writer(sys.stdout)
+    writer.writerow(columns)
+    writer.writerows(rows)
+    return 0
+
+
+def cmd_export(parser, args):
+    from .export import describe_export, export_query, export_table
+    from .filters import parse_filter
+
+    filters = {}
+    for expression in args.filter or ():
+        column, sep, text = expression.partition(":")
+        if not sep:
+            parser.error(f"--filter expects COLUMN:EXPRESSION, got {expression!r}")
+        filters[column] = parse_filter(text)
+    sort = []
+    for expression in args.sort or ():
+        column, _, direction = expression.partition(":")
+        if direction.lower() not in ("", "asc", "desc"):
+            parser.error(f"--sort expects COLUMN or COLUMN:desc, got {expression!r}")
+        sort.append((column, direction.lower() == "desc"))
+
+    def progress(stats):
+        print(f"Exported {stats['rows']} rows so far ({stats['seconds']:.1f}s)", file=sys.stderr)
+
+    common = dict(
+        export_format=args.format,
+        db_type=args.db_type,
+        db_target=resolve_target(parser, args),
+        batch_size=args.batch_size,
+        progress=progress if args.verbose else None,
+    )
+    if args.query:
+        if filters or sort:
+            parser.error("--filter and --sort only apply to table exports.")
+        stats = export_query(args.query, args.output, **common)
+    else:
+        stats = export_table(
+            args.table_name, args.output, args.schema, sort, filters, **common
+        )
+    print(f"Exported {describe_export(stats)} to {args.output}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="flourish_tools",
+        description="Headless FlourishWellness database tools.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser(
+        "import-csv", help="Import sections, subsections, and questions from a CSV."
+    )
+    p.add_argument("csv_path")
+    add_target_args(p)
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Load existing rows once and insert with batched executemany.",
+    )
+    mode.add_argument(
+        "--chunk-size",
+        type=int,
+        help="Stream the CSV, committing and checkpointing every N rows. Reruns resume.",
+    )
+    p.add_argument(
+        "--checkpoint",
+        help="Checkpoint file for --chunk-size (default: <csv>.checkpoint.json).",
+    )
+    p.add_argument(
+        "--to",
+        action="append",
+        metavar="TYPE:TARGET",
+        help="Bulk-import into several databases at once, e.g. --to sqlite:dev.db"
+        " --to 'sqlserver:Driver=...'. Repeatable; overrides --db-type/--target.",
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        help="Maximum concurrent targets for --to (default: one per target).",
+    )
+    p.set_defaults(handler=cmd_import_csv)
+
+    p = subparsers.add_parser(
+        "plan", help="Show the delta between a CSV and the active survey year."
+    )
+    p.add_argument("csv_path")
+    add_target_args(p)
+    p.add_argument(
+        "--apply",
+        action="store_true",
+        help="Write the new sections and questions after printing the plan.",
+    )
+    p.add_argument(
+        "--apply-renames",
+        action="store_true",
+        help="With --apply, update possible renames in place (keeping their Responses)"
+        " instead of adding the new text as a new question.",
+    )
+    p.set_defaults(handler=cmd_plan)
+
+    p = subparsers.add_parser(
+        "bench", help="Benchmark the import strategies on a SQLite copy of schema.sql."
+    )
+    p.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated CSV row counts.")
+    p.add_argument(
+        "--strategies", default="row,bulk,stream,plan", help="Comma-separated import strategies."
+    )
+    p.add_argument("--sections", type=int, default=10)
+    p.add_argument("--subsections", type=int, default=3, help="Subsections per section.")
+    p.add_argument("--duplicate-ratio", type=float, default=0.05)
+    p.add_argument("--chunk-size", type=int, default=1000, help="Chunk size for the stream strategy.")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--output", help="Write JSON results here instead of stdout.")
+    p.add_argument("--baseline", help="Earlier JSON results; exit 1 on regressions.")
+    p.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed fractional slowdown/growth against --baseline (default: %(default)s).",
+    )
+    p.set_defaults(handler=cmd_bench)
+
+    p = subparsers.add_parser(
+        "generate",
+        help="Write a reproducible synthetic dataset (no Active Directory needed).",
+    )
+    p.add_argument("--facilities", type=int, default=50)
+    p.add_argument("--users-per-facility", type=int, default=40)
+    p.add_argument(
+        "--years", help="Comma-separated survey years (default: the last three years)."
+    )
+    p.add_argument("--sections", type=int, default=8)
+    p.add_argument("--subsections", type=int, default=2, help="Subsections per section.")
+    p.add_argument(
+        "--questions", type=int, default=6, help="Questions per section and per subsection."
+    )
+    p.add_argument(
+        "--completion-rate",
+        type=float,
+        default=0.7,
+        help="Fraction of users who complete each year (default: %(default)s).",
+    )
+    p.add_argument(
+        "--partial-rate",
+        type=float,
+        default=0.2,
+        help="Fraction of users who answer some questions (default: %(default)s).",
+    )
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--batch-size", type=int, default=10_000, help="Responses per executemany.")
+    p.add_argument(
+        "--answer-profile",
+        help="JSON answer profile with per-community and per-section bias (needs numpy).",
+    )
+    add_target_args(p, default_db_type="sqlite")
+    p.set_defaults(handler=cmd_generate)
+
+    p = subparsers.add_parser(
+        "loadsim",
+        help="Simulate many users saving and submitting surveys at once; report latency and locking.",
+    )
+    p.add_argument("--users", type=int, default=1000, help="Virtual users to replay.")
+    p.add_argument("--concurrency", type=int, default=16, help="Users running at the same time.")
+    p.add_argument("--saves-per-user", type=int, default=3, help="Average saves before submitting.")
+    p.add_argument(
+        "--autosave-ratio",
+        type=float,
+        default=0.5,
+        help="Fraction of saves that are small autosaves (default: %(default)s).",
+    )
+    p.add_argument(
+        "--complete-rate",
+        type=float,
+        default=0.8,
+        help="Fraction of users who submit at the end (default: %(default)s).",
+    )
+    p.add_argument(
+        "--think-time",
+        type=float,
+        default=0.0,
+        help="Mean seconds between a user's operations; 0 runs flat out.",
+    )
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--output", help="Write JSON results here instead of stdout.")
+    add_target_args(p, default_db_type="sqlite")
+    p.set_defaults(handler=cmd_loadsim)
+
+    p = subparsers.add_parser(
+        "migrate", help="Plan (and with --apply, run) a JSON file of schema changes."
+    )
+    p.add_argument("changes", help="JSON list of column, default and index changes.")
+    p.add_argument("--apply", action="store_true", help="Run the plan instead of only printing it.")
+    p.add_argument(
+        "--offline",
+        action="store_true",
+        help="Do not use ONLINE = ON on SQL Server even when the edition supports it.",
+    )
+    p.add_argument(
+        "--lock-timeout",
+        type=int,
+        default=10_000,
+        help="Milliseconds a step may wait for a lock before failing (default: %(default)s).",
+    )
+    p.add_argument("--output", help="Write per-step timings here as JSON.")
+    add_target_args(p)
+    p.set_defaults(handler=cmd_migrate)
+
+    p = subparsers.add_parser(
+        "advise-indexes",
+        help="Benchmark the app's query shapes with and without candidate indexes.",
+    )
+    p.add_argument(
+        "--shapes", help="Comma-separated query shape names to test (default: all)."
+    )
+    p.add_argument(
+        "--runs",
+        type=int,
+        default=25,
+        help="Timed executions per query shape (default: %(default)s).",
+    )
+    p.add_argument(
+        "--min-speedup",
+        type=float,
+        default=1.2,
+        help="p50 speedup a candidate needs to be recommended (default: %(default)s).",
+    )
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--changes-out", help="Write recommended indexes here as a migrate file.")
+    p.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    add_target_args(p, default_db_type="sqlite")
+    p.set_defaults(handler=cmd_advise_indexes)
+
+    p = subparsers.add_parser("add-column", help="Add a column to a SQLite table.")
+    p.add_argument("db_path")
+    p.add_argument("table_name")
+    p.add_argument("column_name")
+    p.add_argument("column_type")
+    p.set_defaults(handler=cmd_add_column)
+
+    p = subparsers.add_parser("tables", help="List base tables.")
+    p.add_argument(
+        "--stats",
+        action="store_true",
+        help="Show approximate row counts, sizes and index counts from the catalog.",
+    )
+    add_target_args(p)
+    p.set_defaults(handler=cmd_tables)
+
+    p = subparsers.add_parser("rows", help="Write every row of a table to stdout as CSV.")
+    p.add_argument("table_name")
+    p.add_argument("--schema", help="Schema name, e.g. dbo.")
+    add_target_args(p)
+    p.set_defaults(handler=cmd_rows)
+
+    p = subparsers.add_parser(
+        "export",
+        help="Stream a table or query result to CSV or Parquet without loading it into memory.",
+    )
+    source = p.add_mutually_exclusive_group(required=True)
+    source.add_argument("table_name", nargs="?")
+    source.add_argument("--query", help="Export the result of this SELECT instead of a table.")
+    p.add_argument("-o", "--output", required=True, help="Output file (.csv or .parquet).")
+    p.add_argument("--schema", help="Schema name, e.g. dbo.")
+    p.add_argument(
+        "--format",
+        choices=("csv", "parquet"),
+        help="Output format (default: from the output file extension).",
+    )
+    p.add_argument(
+        "--filter",
+        action="append",
+        metavar="COLUMN:EXPR",
+        help="Filter like the browser's, e.g. UserId:=42 or Answer:~stress. Repeatable.",
+    )
+    p.add_argument(
+        "--sort",
+        action="append",
+        metavar="COLUMN[:desc]",
+        help="Sort by a column, e.g. Id:desc. Repeatable.",
+    )
+    p.add_argument("--batch-size", type=int, default=5000, help="Rows per fetchmany.")
+    p.add_argument("-v", "--verbose", action="store_true", help="Print progress to stderr.")
+    add_target_args(p)
+    p.set_defaults(handler=cmd_export)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(parser, args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
@@ -0,0 +1,155 @@
+"""Compact column-by-column storage for result sets shown in the browser.
+
+A list of row tuples costs a tuple plus a boxed Python object per value.
+ColumnBuffer stores each column on its own instead: columns that hold only
+ints or only floats are packed into array('q') / array('d') (8 bytes per
+value, NULLs tracked in a bytearray), everything else stays in a plain list.
+Rows are rebuilt on demand, so a display only pays for the rows it shows.
+"""
+import sys
+from array import array
+
+
+def _typecode(values):
+    """Return 'q' or 'd' when every non-NULL value is an int / a float, else None."""
+    kinds = {type(value) for value in values if value is not None}
+    if kinds == {int}:
+        return "q"
+    if kinds == {float}:
+        return "d"
+    return None
+
+
+class ColumnBuffer:
+    """
+    Append-only rows stored column by column.
+
+    With reverse=True the rows read back in the opposite order from how they
+    were appended, so a "before" page, which the server returns last row
+    first, can be shown while it streams in without being reordered.
+    """
+
+    def __init__(self, columns, reverse=False, types=None):
+        self.columns = list(columns)
+        self.reverse = reverse
+        # Python type per column as reported by the driver, None if unknown
+        self.types = list(types) if types else [None] * len(self.columns)
+        self._data = [None] * len(self.columns)  # array, list, or None until typed
+        self._nulls = [None] * len(self.columns)  # bytearray for array columns with NULLs
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        for index, values in enumerate(zip(*rows)):
+            self._extend(index, values)
+        self._len += len(rows)
+
+    def _extend(self, index, values):
+        data = self._data[index]
+        if data is None:
+            # None means every value so far was NULL.
+            if all(value is None for value in values):
+                return
+            code = _typecode(values)
+            data = self._data[index] = array(code) if code else []
+            if self._len:
+                self._extend(index, [None] * self._len)
+
+        if isinstance(data, array):
+            if _typecode(values) == data.typecode or all(v is None for v in values):
+                start = len(data)
+                try:
+                    data.extend(0 if value is None else value for value in values)
+                except OverflowError:
+                    del data[start:]  # Wider than 64 bits; keep as Python ints.
+                else:
+                    self._mark_nulls(index, values, start)
+                    return
+            data = self._to_list(index)
+
+        data.extend(values)
+
+    def _mark_nulls(self, index, values, offset):
+        nulls = self._nulls[index]
+        if nulls is None:
+            if all(value is not None for value in values):
+                return
+            nulls = self._nulls[index] = bytearray(offset)
+        nulls.extend(value is None for value in values)
+
+    def _to_list(self, index):
+        data = self._data[index]
+        nulls = self._nulls[index]
+        values = data.tolist()
+        if nulls is not None:
+            values = [None if nulls[i] else value for i, value in enumerate(values)]
+        self._data[index] = values
+        self._nulls[index] = None
+        return values
+
+    def _physical(self, row_index):
+        if row_index < 0:
+            row_index += self._len
+        if not 0 <= row_index < self._len:
+            raise IndexError("row index out of range")
+        return self._len - 1 - row_index if self.reverse else row_index
+
+    def _get(self, column_index, position):
+        data = self._data[column_index]
+        if data is None:
+            return None
+        nulls = self._nulls[column_index]
+        if nulls is not None and nulls[position]:
+            return None
+        return data[position]
+
+    def value(self, row_index, column_index):
+        return self._get(column_index, self._physical(row_index))
+
+    def __getitem__(self, row_index):
+        position = self._physical(row_index)
+        return tuple(self._get(c, position) for c in range(len(self.columns)))
+
+    def __iter__(self):
+        for row_index in range(self._len):
+            yield self[row_index]
+
+    def set_value(self, row_index, column_index, value):
+        """Overwrite one value, e.g. after an edit has been saved."""
+        position = self._physical(row_index)
+        data = self._data[column_index]
+        if data is None:
+            data = self._data[column_index] = [None] * self._len
+        elif isinstance(data, array):
+            if value is None:
+                if self._nulls[column_index] is None:
+                    self._nulls[column_index] = bytearray(self._len)
+                self._nulls[column_index][position] = 1
+                return
+            if _typecode([value]) != data.typecode:
+                data = self._to_list(column_index)
+            elif self._nulls[column_index] is not None:
+                self._nulls[column_index][position] = 0
+        data[position] = value
+
+    def nbytes(self):
+        """
+        Approximate bytes held by the buffer, including the values in list
+        columns (strings and bytes dominate pages of Questions.Text or
+        Responses.Answer). Shared small ints and None are counted too, so
+        this errs on the high side.
+        """
+        total = 0
+        for data, nulls in zip(self._data, self._nulls):
+            if isinstance(data, array):
+                total += data.itemsize * len(data)
+            elif data is not None:
+                total += 8 * len(data)
+                total += sum(sys.getsizeof(value) for value in data if value is not None)
+            if nulls is not None:
+                total += len(nulls)
+        return total
@@ -0,0 +1,16 @@
+"""Add a column to an existing SQLite table."""
+import sqlite3
+
+
+def add_column_to_db(db_path, table_name, column_name, column_type):
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        alter_query = f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type};"
+        cursor.execute(alter_query)
+        conn.commit()
+        conn.close()
+        return True, "Column added successfully."
+    except sqlite3.Error as e:
+        return False, str(e)
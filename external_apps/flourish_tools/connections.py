@@ -0,0 +1,190 @@
+"""Long-lived, health-checked connections shared by the browser and its helpers.
+
+Opening a Trusted_Connection to ASISQLDBPROD costs a full Kerberos/TDS
+handshake. get_manager hands out one ConnectionManager per (db_type,
+db_target), and every caller reuses its single connection:
+
+    manager = get_manager("sqlserver", DB_CONN_STR)
+    with manager.connection():
+        cursor = manager.cursor()
+        cursor.execute("SELECT ...", params)
+        rows = cursor.fetchall()
+
+The connection is held under a lock for the duration of the with block, so
+worker threads take turns on it. A connection that has been idle longer than
+health_check_interval, or whose last use raised an error, is pinged with
+SELECT 1 before it is handed out and reopened if the ping fails.
+
+manager.cursor() runs every SQL text on its own cached cursor (an LRU of
+statement_cache_size). pyodbc only re-prepares a statement when a cursor's SQL
+text changes, so repeated queries skip the prepare round trip. Callers must
+read all rows of a query before the block ends.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .db import get_connection
+
+HEALTH_CHECK_INTERVAL = 30.0
+HEALTH_CHECK_SQL = "SELECT 1"
+STATEMENT_CACHE_SIZE = 32
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+class ConnectionManager:
+    """One shared connection to a database, reopened when it goes bad."""
+
+    def __init__(
+        self,
+        db_type,
+        db_target,
+        health_check_interval=HEALTH_CHECK_INTERVAL,
+        statement_cache_size=STATEMENT_CACHE_SIZE,
+    ):
+        self.db_type = db_type
+        self.db_target = db_target
+        self.health_check_interval = health_check_interval
+        self.statement_cache_size = statement_cache_size
+        self.stats = {
+            "connects": 0,
+            "reconnects": 0,
+            "health_checks": 0,
+            "statement_hits": 0,
+            "statement_misses": 0,
+        }
+        self._lock = threading.RLock()
+        self._conn = None
+        self._statements = OrderedDict()  # {sql: cursor}
+        self._last_used = 0.0
+        self._suspect = False  # the last use raised; ping before reusing
+
+    def _open(self):
+        self._conn = get_connection(self.db_type, self.db_target, shared=True)
+        self.stats["connects"] += 1
+        self._suspect = False
+
+    def _discard(self):
+        conn, self._conn = self._conn, None
+        self._statements.clear()
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _ensure_connection(self):
+        if self._conn is None:
+            self._open()
+            return self._conn
+
+        idle = time.monotonic() - self._last_used
+        if self._suspect or idle > self.health_check_interval:
+            self.stats["health_checks"] += 1
+            try:
+                cursor = self._conn.cursor()
+                cursor.execute(HEALTH_CHECK_SQL)
+                cursor.fetchall()
+                cursor.close()
+                self._suspect = False
+            except Exception:
+                self._discard()
+                self._open()
+                self.stats["reconnects"] += 1
+        return self._conn
+
+    @contextmanager
+    def connection(self):
+        """Hold the shared connection for the with block and yield it.
+
+        An exception inside the block rolls back the open transaction and
+        marks the connection for a health check on its next use.
+        """
+        with self._lock:
+            conn = self._ensure_connection()
+            try:
+                yield conn
+            except BaseException:
+                self._suspect = True
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+            finally:
+                self._last_used = time.monotonic()
+
+    def _statement(self, sql):
+        """Return the cached cursor for sql, creating it on first use."""
+        cursor = self._statements.get(sql)
+        if cursor is not None:
+            self._statements.move_to_end(sql)
+            self.stats["statement_hits"] += 1
+            return cursor
+
+        self.stats["statement_misses"] += 1
+        cursor = self._conn.cursor()
+        self._statements[sql] = cursor
+        if len(self._statements) > self.statement_cache_size:
+            _, oldest = self._statements.popitem(last=False)
+            oldest.close()
+        return cursor
+
+    def cursor(self):
+        """Return a cursor that uses the statement cache. Use inside connection()."""
+        if self._conn is None:
+            raise RuntimeError("cursor() must be called inside connection().")
+        return StatementCursor(self)
+
+    def close(self):
+        with self._lock:
+            self._discard()
+
+
+class StatementCursor:
+    """Cursor-like proxy that runs each SQL text on that text's cached cursor."""
+
+    def __init__(self, manager):
+        self._manager = manager
+        self._current = None
+
+    def execute(self, sql, params=()):
+        self._current = self._manager._statement(sql)
+        self._current.execute(sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._current = self._manager._statement(sql)
+        self._current.executemany(sql, seq_of_params)
+        return self
+
+    def __iter__(self):
+        return iter(self._current)
+
+    def __getattr__(self, name):
+        # fetchone/fetchall/fetchmany/description/rowcount of the last query
+        if self._current is None:
+            raise AttributeError(name)
+        return getattr(self._current, name)
+
+
+def get_manager(db_type, db_target):
+    """Return the shared ConnectionManager for a target, creating it on first use."""
+    key = (db_type, db_target)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = ConnectionManager(db_type, db_target)
+        return manager
+
+
+def close_all():
+    """Close every shared connection, e.g. when the browser window closes."""
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        manager.close()
@@ -0,0 +1,166 @@
+"""Connection and schema helpers shared by the external_apps tools.
+
+pyodbc is imported only when a SQL Server connection is opened, so this module
+(and everything built on it) can be imported on machines without an ODBC driver.
+"""
+import importlib
+import json
+import sqlite3
+from pathlib import Path
+
+# --- Configuration ---
+DB_SERVER = "ASISQLDBPROD"
+DB_DATABASE = "FlourishWellness"
+DB_CONN_STR = (
+    f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+    f"SERVER={DB_SERVER};DATABASE={DB_DATABASE};Trusted_Connection=yes;"
+)
+# The CSV importer GUI's default, unchanged from before the split: it also
+# sets TrustServerCertificate and MultipleActiveResultSets.
+IMPORT_CONN_STR = (
+    f"Driver={{ODBC Driver 17 for SQL Server}};Server={DB_SERVER};Database={DB_DATABASE};"
+    "Trusted_Connection=yes;TrustServerCertificate=yes;MultipleActiveResultSets=yes;"
+)
+DB_TYPES = ("sqlite", "sqlserver")
+
+
+def table_exists(cur, db_type, table_name):
+    if db_type == "sqlite":
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table_name,),
+        )
+    elif db_type == "sqlserver":
+        cur.execute(
+            "SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = 'dbo' AND TABLE_NAME = ?",
+            (table_name,),
+        )
+    else:
+        raise ValueError(f"Unsupported database type: {db_type}")
+
+    return cur.fetchone() is not None
+
+
+def column_exists(cur, db_type, table_name, column_name):
+    if db_type == "sqlite":
+        cur.execute(f"PRAGMA table_info({table_name})")
+        return any(row[1] == column_name for row in cur.fetchall())
+
+    if db_type == "sqlserver":
+        cur.execute(
+            "SELECT 1 FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = 'dbo' AND TABLE_NAME = ? AND COLUMN_NAME = ?",
+            (table_name, column_name),
+        )
+        return cur.fetchone() is not None
+
+    raise ValueError(f"Unsupported database type: {db_type}")
+
+
+def get_active_survey_entity_id(cur, db_type, schema=None):
+    """Return the active (or latest) survey Year.
+
+    Sections.SurveyYear, Questions.SurveyYear and the response tables hold
+    SurveyYear.Year, not SurveyYear.Id, so that is what every tool keys on.
+    schema is an optional SchemaSnapshot; without one the existence checks
+    each run their own query.
+    """
+    if schema is not None:
+        has_survey_year = schema.table_exists("SurveyYear")
+        has_status = has_survey_year and schema.column_exists("SurveyYear", "Status")
+    else:
+        has_survey_year = table_exists(cur, db_type, "SurveyYear")
+        has_status = has_survey_year and column_exists(cur, db_type, "SurveyYear", "Status")
+
+    if has_survey_year:
+        if has_status:
+            cur.execute(
+                (
+                    "SELECT TOP 1 Year FROM SurveyYear WHERE Status = ? ORDER BY Year DESC"
+                    if db_type == "sqlserver"
+                    else "SELECT Year FROM SurveyYear WHERE Status = ? ORDER BY Year DESC LIMIT 1"
+                ),
+                (2,),
+            )
+            active = cur.fetchone()
+            if active:
+                return active[0]
+
+        cur.execute(
+            "SELECT TOP 1 Year FROM SurveyYear ORDER BY Year DESC"
+            if db_type == "sqlserver"
+            else "SELECT Year FROM SurveyYear ORDER BY Year DESC LIMIT 1"
+        )
+        latest = cur.fetchone()
+        if latest:
+            return latest[0]
+
+    return None
+
+
+# Callables (db_type, conn) -> conn applied to every new connection, e.g. the
+# round-trip counter used by flourish_tools.bench.
+CONNECTION_HOOKS = []
+
+
+def get_connection(db_type, db_target, shared=False):
+    """Open a connection. shared=True lets SQLite connections be used from
+    several threads; callers must serialize access (see connections.py)."""
+    if db_type == "sqlite":
+        conn = sqlite3.connect(db_target, check_same_thread=not shared)
+    elif db_type == "sqlserver":
+        try:
+            pyodbc = importlib.import_module("pyodbc")
+        except ImportError as exc:
+            raise RuntimeError("pyodbc is not installed. Run: pip install pyodbc")
+        conn = pyodbc.connect(db_target)
+    else:
+        raise ValueError(f"Unsupported database type: {db_type}")
+
+    for hook in CONNECTION_HOOKS:
+        conn = hook(db_type, conn)
+    return conn
+
+
+def quote_ident(name: str) -> str:
+    return "[" + name.replace("]", "]]") + "]"
+
+
+def qualified_name(schema_name, table_name):
+    """Return a bracket-quoted [schema].[table] name (SQLite accepts brackets too)."""
+    if not schema_name:
+        return quote_ident(table_name)
+    return f"{quote_ident(schema_name)}.{quote_ident(table_name)}"
+
+
+def find_appsettings_connection_string():
+    """Search for appsettings.Development.json then appsettings.json under the FlourishWellness project folder
+    (one level up). Return ConnectionStrings.DefaultConnection if found, otherwise None."""
+    # Common locations relative to external_apps (this package lives one level below it)
+    candidates = [
+        Path(__file__).resolve().parents[2] / "FlourishWellness" / "appsettings.Development.json",
+        Path(__file__).resolve().parents[2] / "FlourishWellness" / "appsettings.json",
+        Path(__file__).resolve().parents[3] / "FlourishWellness" / "appsettings.Development.json",
+        Path(__file__).resolve().parents[3] / "FlourishWellness" / "appsettings.json",
+    ]
+
+    merged = {}
+    for p in candidates:
+        if p.exists():
+            try:
+                data = json.loads(p.read_text(encoding="utf-8"))
+                # Merge shallowly: later files overwrite earlier keys
+                merged.update(data)
+            except Exception:
+                continue
+
+    # ConnectionStrings may be present
+    cs = merged.get("ConnectionStrings") or {}
+    default = cs.get("DefaultConnection") if isinstance(cs, dict) else None
+    return default
+
+
+def default_target(db_type):
+    """Return the connection target to use when none is given on the command line."""
+    if db_type == "sqlserver":
+        return find_appsettings_connection_string() or DB_CONN_STR
+    return None
@@ -0,0 +1,336 @@
+"""Save cell edits from the browser in one transaction.
+
+save_row_edits groups edited rows by the shape of the UPDATE they need. On
+SQL Server each group is sent as one UPDATE joined to a VALUES list (chunked
+to stay under the 2100-parameter limit) that also returns @@ROWCOUNT; on
+SQLite it is one executemany. Saving hundreds of edits costs one round trip
+per group instead of one per row.
+
+Each UPDATE carries an optimistic check: besides the primary key it requires
+the row to still hold every value that was read, or, when the table has a
+rowversion column, the same rowversion. A row somebody else changed in the
+meantime matches nothing, the affected row count comes up short, and the
+whole save is rolled back; the error names the rows that changed. pyodbc
+reports -1 as the rowcount of an executemany with fast_executemany, which is
+why SQL Server does not use one here.
+
+Two kinds of column are not compared on SQL Server: the legacy LOB, xml and
+CLR types, which "=" does not accept, and datetime/time values, which are
+compared to within NEAR_MS because DATETIME's 1/300 s ticks do not survive
+the round trip through the driver exactly.
+"""
+import datetime
+import decimal
+from contextlib import closing
+
+from .browser import _connect, fetch_primary_key
+from .db import qualified_name, quote_ident
+
+# SQL Server types that cannot be compared with "=" to a parameter.
+UNCOMPARABLE_TYPES = (
+    "text", "ntext", "image", "xml", "geography", "geometry", "hierarchyid", "sql_variant",
+)
+# Values of these types are compared within NEAR_MS on SQL Server.
+NEAR_TYPES = (datetime.datetime, datetime.time)
+NEAR_MS = 2
+
+# SQL Server allows 2100 parameters per statement and 1000 rows per VALUES list.
+MAX_PARAMS = 2000
+MAX_VALUES_ROWS = 1000
+# Changed rows named in a conflict error; the rest are only counted.
+MAX_REPORTED_CONFLICTS = 10
+
+TRUE_WORDS = {"1", "true", "yes", "y"}
+FALSE_WORDS = {"0", "false", "no", "n"}
+
+
+def convert_value(text, column_type=None, original=None):
+    """
+    Convert an edited display string back to the column's Python type.
+
+    column_type is the type reported by the driver (pyodbc puts it in
+    cursor.description); without one the type of the original value is used.
+    An empty string becomes NULL for every type except text. Raises
+    ValueError when the text does not parse.
+    """
+    if column_type is None and original is not None:
+        column_type = type(original)
+    if column_type in (None, str):
+        return text
+    if text == "":
+        return None
+
+    text = text.strip()
+    if column_type is bool:
+        if text.lower() in TRUE_WORDS:
+            return True
+        if text.lower() in FALSE_WORDS:
+            return False
+        raise ValueError(f"{text!r} is not a boolean (use 1/0 or true/false).")
+    if column_type is int:
+        return int(text)
+    if column_type is float:
+        return float(text)
+    if column_type is decimal.Decimal:
+        try:
+            return decimal.Decimal(text)
+        except decimal.InvalidOperation:
+            raise ValueError(f"{text!r} is not a number.")
+    if column_type is datetime.datetime:
+        return datetime.datetime.fromisoformat(text)
+    if column_type is datetime.date:
+        return datetime.date.fromisoformat(text)
+    if column_type is datetime.time:
+        return datetime.time.fromisoformat(text)
+    if column_type in (bytes, bytearray):
+        return bytes.fromhex(text.removeprefix("0x"))
+    return text
+
+
+def fetch_check_columns(cursor, db_type, schema_name, table_name):
+    """
+    Return (rowversion column or None, {columns the optimistic check skips}).
+    SQLite compares every value as read, so it returns (None, set()).
+    """
+    if db_type == "sqlite":
+        return None, set()
+    cursor.execute(
+        "SELECT COLUMN_NAME, DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS"
+        " WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ? ORDER BY ORDINAL_POSITION",
+        (schema_name or "dbo", table_name),
+    )
+    rowversion, skipped = None, set()
+    for column, data_type in cursor.fetchall():
+        if data_type == "timestamp":  # rowversion
+            rowversion = rowversion or column
+        elif data_type in UNCOMPARABLE_TYPES:
+            skipped.add(column)
+    return rowversion, skipped
+
+
+def _group_edits(edits, key_columns, rowversion, skipped, near):
+    """Group (original, changes) pairs by the SQL text their UPDATE needs."""
+    groups = {}
+    for original, changes in edits:
+        columns = tuple(sorted(changes))
+        if rowversion:
+            compared = [rowversion]
+        else:
+            compared = [
+                column for column in original if column not in key_columns and column not in skipped
+            ]
+        # NULL originals need IS NULL instead of "= ?", and near values a
+        # range, which both change the SQL.
+        checked = tuple(
+            (
+                column,
+                original[column] is None,
+                near and isinstance(original[column], NEAR_TYPES),
+            )
+            for column in compared
+        )
+        params = [changes[column] for column in columns]
+        params += [original[column] for column in key_columns]
+        params += [original[column] for column, is_null, _ in checked if not is_null]
+        groups.setdefault((columns, checked), []).append(params)
+    return groups
+
+
+def _where_sql(key_columns, checked):
+    """WHERE terms for one row, with "?" parameters (SQLite; no near values)."""
+    where = [f"{quote_ident(column)} = ?" for column in key_columns]
+    where += [
+        f"{quote_ident(column)} IS NULL" if is_null else f"{quote_ident(column)} = ?"
+        for column, is_null, _ in checked
+    ]
+    return " AND ".join(where)
+
+
+def build_update_sql(schema_name, table_name, columns, key_columns, checked):
+    set_sql = ", ".join(f"{quote_ident(column)} = ?" for column in columns)
+    return (
+        f"UPDATE {qualified_name(schema_name, table_name)} SET {set_sql}"
+        f" WHERE {_where_sql(key_columns, checked)}"
+    )
+
+
+def _match_sql(key_columns, checked, values):
+    """Join terms matching table t to VALUES columns values (keys, then compared)."""
+    on = [f"t.{quote_ident(column)} = v.{value}" for column, value in zip(key_columns, values)]
+    checked_values = iter(values[len(key_columns) :])
+    for column, is_null, near in checked:
+        column = f"t.{quote_ident(column)}"
+        if is_null:
+            on.append(f"{column} IS NULL")
+            continue
+        value = f"v.{next(checked_values)}"
+        if near:
+            on.append(
+                f"{column} BETWEEN DATEADD(millisecond, -{NEAR_MS}, {value})"
+                f" AND DATEADD(millisecond, {NEAR_MS}, {value})"
+            )
+        else:
+            on.append(f"{column} = {value}")
+    return " AND ".join(on)
+
+
+def _values_sql(width, row_count):
+    row_sql = "(" + ", ".join("?" * width) + ")"
+    return ", ".join([row_sql] * row_count)
+
+
+def build_batch_update_sql(schema_name, table_name, columns, key_columns, checked, row_count):
+    """
+    Return a SQL Server batch that applies row_count edits of one group and
+    selects how many rows it changed. Each VALUES row holds the same
+    parameters, in the same order, as one row of build_update_sql.
+    """
+    compared = sum(1 for _, is_null, _ in checked if not is_null)
+    values = [f"v{n}" for n in range(len(columns) + len(key_columns) + compared)]
+    set_sql = ", ".join(
+        f"{quote_ident(column)} = v.{value}" for column, value in zip(columns, values)
+    )
+    return (
+        "SET NOCOUNT ON;"
+        f" UPDATE t SET {set_sql}"
+        f" FROM {qualified_name(schema_name, table_name)} AS t"
+        f" INNER JOIN (VALUES {_values_sql(len(values), row_count)}) AS v ({', '.join(values)})"
+        f" ON {_match_sql(key_columns, checked, values[len(columns) :])};"
+        " SELECT @@ROWCOUNT;"
+    )
+
+
+def build_conflict_sql(schema_name, table_name, key_columns, checked, row_count):
+    """
+    Return a SQL Server query selecting the keys of the rows, among row_count
+    VALUES rows of (keys, compared values), that no longer match.
+    """
+    compared = sum(1 for _, is_null, _ in checked if not is_null)
+    values = [f"v{n}" for n in range(len(key_columns) + compared)]
+    return (
+        f"SELECT {', '.join(f'v.{value}' for value in values[: len(key_columns)])}"
+        f" FROM (VALUES {_values_sql(len(values), row_count)}) AS v ({', '.join(values)})"
+        f" WHERE NOT EXISTS (SELECT 1 FROM {qualified_name(schema_name, table_name)} AS t"
+        f" WHERE {_match_sql(key_columns, checked, values)})"
+    )
+
+
+def _chunks(params):
+    """Split parameter rows into VALUES lists SQL Server accepts."""
+    chunk_size = max(1, min(MAX_VALUES_ROWS, MAX_PARAMS // len(params[0])))
+    for start in range(0, len(params), chunk_size):
+        yield params[start : start + chunk_size]
+
+
+def _update_group_sqlserver(cursor, schema_name, table_name, columns, key_columns, checked, params):
+    """Apply one group of edits in chunked VALUES-join batches; return rows changed."""
+    changed = 0
+    for chunk in _chunks(params):
+        sql = build_batch_update_sql(
+            schema_name, table_name, columns, key_columns, checked, len(chunk)
+        )
+        cursor.execute(sql, [value for row in chunk for value in row])
+        # fetchall, not fetchone, so no result set is left open on the connection.
+        changed += cursor.fetchall()[0][0]
+    return changed
+
+
+def find_conflicts(cursor, db_type, schema_name, table_name, columns, key_columns, checked, params):
+    """Return the key tuples of the group's rows that no longer match their check."""
+    checks = [row[len(columns) :] for row in params]
+    conflicts = []
+    if db_type == "sqlserver":
+        for chunk in _chunks(checks):
+            cursor.execute(
+                build_conflict_sql(schema_name, table_name, key_columns, checked, len(chunk)),
+                [value for row in chunk for value in row],
+            )
+            conflicts.extend(tuple(row) for row in cursor.fetchall())
+    else:
+        sql = (
+            f"SELECT 1 FROM {qualified_name(schema_name, table_name)}"
+            f" WHERE {_where_sql(key_columns, checked)}"
+        )
+        for row in checks:
+            cursor.execute(sql, row)
+            if cursor.fetchone() is None:
+                conflicts.append(tuple(row[: len(key_columns)]))
+    return conflicts
+
+
+def _format_key(key_columns, key):
+    return ", ".join(f"{column}={value!r}" for column, value in zip(key_columns, key))
+
+
+def save_row_edits(
+    table_name, edits, schema_name=None, db_type="sqlserver", db_target=None
+):
+    """
+    Write edited rows in one transaction and return the number of rows updated.
+
+    edits is a list of (original, changes) pairs: original maps every column
+    of the row as read to its value, changes maps edited columns to their new,
+    already converted values. Raises RuntimeError, with nothing written and
+    the changed rows named, when any row was changed or deleted since it was
+    read.
+    """
+    edits = [(original, changes) for original, changes in edits if changes]
+    if not edits:
+        return 0
+
+    with _connect(db_type, db_target) as (conn, cached_cursor):
+        key_columns = fetch_primary_key(cached_cursor, db_type, schema_name, table_name)
+        if not key_columns:
+            raise ValueError(
+                f"{table_name} has no primary key, so edited rows cannot be matched safely."
+            )
+        for _, changes in edits:
+            edited_keys = set(changes) & set(key_columns)
+            if edited_keys:
+                raise ValueError(
+                    f"Primary key column {sorted(edited_keys)[0]} cannot be edited here."
+                )
+        rowversion, skipped = fetch_check_columns(cached_cursor, db_type, schema_name, table_name)
+        groups = _group_edits(edits, key_columns, rowversion, skipped, db_type == "sqlserver")
+
+        updated = 0
+        with closing(conn.cursor()) as cursor:
+            for (columns, checked), params in groups.items():
+                if db_type == "sqlserver":
+                    changed = _update_group_sqlserver(
+                        cursor, schema_name, table_name, columns, key_columns, checked, params
+                    )
+                else:
+                    sql = build_update_sql(schema_name, table_name, columns, key_columns, checked)
+                    cursor.executemany(sql, params)
+                    changed = cursor.rowcount  # sqlite3 sums executemany counts
+                if changed < len(params):
+                    # Undo the earlier groups first, so every row is checked
+                    # against the data as it was before this save.
+                    conn.rollback()
+                    conflicts = []
+                    for (group_columns, group_checked), group_params in groups.items():
+                        conflicts += find_conflicts(
+                            cursor,
+                            db_type,
+                            schema_name,
+                            table_name,
+                            group_columns,
+                            key_columns,
+                            group_checked,
+                            group_params,
+                        )
+                    named = "; ".join(
+                        _format_key(key_columns, key)
+                        for key in conflicts[:MAX_REPORTED_CONFLICTS]
+                    )
+                    if len(conflicts) > MAX_REPORTED_CONFLICTS:
+                        named += f"; and {len(conflicts) - MAX_REPORTED_CONFLICTS} more"
+                    raise RuntimeError(
+                        f"{len(conflicts) or len(params) - changed} of the edited rows changed"
+                        f" or were deleted since they were read{': ' + named if named else ''}."
+                        " Nothing was saved; reload the page and edit again."
+                    )
+                updated += len(params)
+        conn.commit()
+    return updated
@@ -0,0 +1,252 @@
+"""Stream a table, a filtered view of one, or a query result to CSV or Parquet.
+
+export_table and export_query read with fetchmany(batch_size) and write each
+batch before reading the next, so memory stays flat however many rows there
+are: a full Responses export never holds more than one batch (plus, for
+Parquet, one row group) in Python.
+
+Parquet needs pyarrow, which is imported only when a Parquet export starts.
+String columns are dictionary-encoded; survey data repeats the same answer
+and question texts over and over, so this keeps files small.
+
+Exports open their own connection instead of using the shared browser
+connection, so a long export does not block paging in the browser.
+"""
+import csv
+import datetime
+import decimal
+import importlib
+import os
+import time
+from contextlib import closing
+
+from .db import DB_CONN_STR, get_connection, qualified_name, quote_ident
+from .filters import compile_filters
+
+EXPORT_FORMATS = ("csv", "parquet")
+EXPORT_BATCH_SIZE = 5000
+PARQUET_ROW_GROUP_SIZE = 100_000
+
+
+def export_format_for(path):
+    """Guess the export format from a file extension, defaulting to CSV."""
+    return "parquet" if path.lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def build_export_query(db_type, schema_name, table_name, sort=(), filters=None):
+    """Build SELECT * for a table with optional filters and (column, descending) sort."""
+    sql = f"SELECT * FROM {qualified_name(schema_name, table_name)}"
+    params = []
+    if filters:
+        where_sql, params = compile_filters(filters, db_type)
+        sql += f" WHERE {where_sql}"
+    if sort:
+        sql += " ORDER BY " + ", ".join(
+            f"{quote_ident(column)} {'DESC' if descending else 'ASC'}"
+            for column, descending in sort
+        )
+    return sql, params
+
+
+class CsvSink:
+    def __init__(self, path, columns, description):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+def _import_pyarrow():
+    try:
+        pa = importlib.import_module("pyarrow")
+        pq = importlib.import_module("pyarrow.parquet")
+    except ImportError:
+        raise RuntimeError("pyarrow is not installed. Run: pip install pyarrow")
+    return pa, pq
+
+
+def _arrow_type(pa, column_type, description):
+    """Map a driver-reported Python type to an Arrow type, or None if unknown."""
+    if column_type is bool:
+        return pa.bool_()
+    if column_type is int:
+        return pa.int64()
+    if column_type is float:
+        return pa.float64()
+    if column_type is decimal.Decimal:
+        precision, scale = description[4], description[5]
+        if precision and scale is not None:
+            return pa.decimal128(precision, scale)
+        return pa.string()
+    if column_type is str:
+        return pa.string()
+    if column_type in (bytes, bytearray):
+        return pa.binary()
+    if column_type is datetime.datetime:
+        return pa.timestamp("us")
+    if column_type is datetime.date:
+        return pa.date32()
+    if column_type is datetime.time:
+        return pa.time64("us")
+    return None
+
+
+class ParquetSink:
+    """
+    Parquet writer that buffers rows up to one row group.
+
+    Column types come from the driver's cursor.description. SQLite reports
+    none, so those are inferred from the first batch; a column that is
+    entirely NULL there, or holds mixed types, is written as text.
+    """
+
+    def __init__(self, path, columns, description, row_group_size=PARQUET_ROW_GROUP_SIZE):
+        self._pa, self._pq = _import_pyarrow()
+        self._path = path
+        self._columns = columns
+        self._types = description
+        self._row_group_size = row_group_size
+        self._schema = None
+        self._as_text = set()  # column indexes written with str()
+        self._writer = None
+        self._pending = []
+
+    def _build_schema(self, rows):
+        pa = self._pa
+        fields = []
+        for index, (name, description) in enumerate(zip(self._columns, self._types)):
+            arrow_type = _arrow_type(pa, description[1], description)
+            if arrow_type is None:
+                kinds = {type(row[index]) for row in rows if row[index] is not None}
+                arrow_type = _arrow_type(pa, kinds.pop(), description) if len(kinds) == 1 else None
+            if arrow_type is None:
+                arrow_type = pa.string()
+                self._as_text.add(index)
+            fields.append(pa.field(name, arrow_type))
+        self._schema = pa.schema(fields)
+        string_columns = [field.name for field in fields if field.type == pa.string()]
+        self._writer = self._pq.ParquetWriter(
+            self._path, self._schema, use_dictionary=string_columns or False
+        )
+
+    def _flush(self):
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+        pa = self._pa
+        arrays = []
+        for index, values in enumerate(zip(*rows)):
+            if index in self._as_text:
+                values = [None if value is None else str(value) for value in values]
+            arrays.append(pa.array(values, type=self._schema.field(index).type))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def write(self, rows):
+        if self._schema is None:
+            self._build_schema(rows)
+        self._pending.extend(rows)
+        if len(self._pending) >= self._row_group_size:
+            self._flush()
+
+    def close(self):
+        if self._schema is None:
+            self._build_schema([])
+        self._flush()
+        self._writer.close()
+
+
+def export_query(
+    sql,
+    output_path,
+    params=(),
+    export_format=None,
+    db_type="sqlserver",
+    db_target=None,
+    batch_size=EXPORT_BATCH_SIZE,
+    progress=None,
+):
+    """
+    Run a query and stream its rows to output_path as CSV or Parquet.
+
+    export_format defaults to the one matching output_path's extension.
+    progress, if given, is called with the stats dict after each batch.
+    Returns {"rows", "bytes", "seconds", "rows_per_sec"}.
+    """
+    export_format = export_format or export_format_for(output_path)
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    if db_target is None:
+        db_target = DB_CONN_STR if db_type == "sqlserver" else None
+    if db_target is None:
+        raise ValueError("A database path is required for SQLite.")
+
+    sink_class = ParquetSink if export_format == "parquet" else CsvSink
+    stats = {"rows": 0, "bytes": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+    started = time.perf_counter()
+
+    with closing(get_connection(db_type, db_target)) as conn:
+        with closing(conn.cursor()) as cursor:
+            if db_type == "sqlserver":
+                cursor.arraysize = batch_size
+            cursor.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            sink = sink_class(output_path, columns, cursor.description)
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    sink.write(rows)
+                    stats["rows"] += len(rows)
+                    stats["seconds"] = time.perf_counter() - started
+                    if progress:
+                        progress(stats)
+            finally:
+                sink.close()
+
+    stats["seconds"] = time.perf_counter() - started
+    stats["bytes"] = os.path.getsize(output_path)
+    if stats["seconds"] > 0:
+        stats["rows_per_sec"] = stats["rows"] / stats["seconds"]
+    return stats
+
+
+def export_table(
+    table_name,
+    output_path,
+    schema_name=None,
+    sort=(),
+    filters=None,
+    export_format=None,
+    db_type="sqlserver",
+    db_target=None,
+    batch_size=EXPORT_BATCH_SIZE,
+    progress=None,
+):
+    """Stream a table, optionally filtered and sorted like the browser view, to a file."""
+    sql, params = build_export_query(db_type, schema_name, table_name, sort, filters)
+    return export_query(
+        sql,
+        output_path,
+        params,
+        export_format=export_format,
+        db_type=db_type,
+        db_target=db_target,
+        batch_size=batch_size,
+        progress=progress,
+    )
+
+
+def describe_export(stats):
+    """One-line summary like "120000 rows, 4.2 MB in 1.3s (92,000 rows/s)"."""
+    return (
+        f"{stats['rows']} rows, {stats['bytes'] / (1024 * 1024):.1f} MB"
+        f" in {stats['seconds']:.1f}s ({stats['rows_per_sec']:,.0f} rows/s)"
+    )
@@ -0,0 +1,103 @@
+"""Import one CSV into several databases at the same time.
+
+The CSV is parsed once into a list of (section, subsection, question) entries.
+That list is then bulk-imported into every target on its own thread and
+connection. Each target commits or rolls back on its own, so a failure on one
+target does not affect the others. Total wall time is about the slowest target
+instead of the sum of all of them.
+"""
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from .db import DB_TYPES, get_connection
+from .importer import (
+    bulk_import_entries,
+    get_import_context,
+    new_import_stats,
+    read_csv_entries,
+)
+
+
+def parse_target_spec(spec):
+    """Split a "sqlite:path" or "sqlserver:connection string" spec into (db_type, db_target)."""
+    db_type, sep, db_target = spec.partition(":")
+    if not sep or db_type not in DB_TYPES or not db_target:
+        raise ValueError(
+            f"Invalid target {spec!r}; expected sqlite:<path> or sqlserver:<connection string>."
+        )
+    return db_type, db_target
+
+
+def describe_target(db_type, db_target):
+    """Return a short label for a target without echoing credentials."""
+    if db_type == "sqlite":
+        return f"sqlite:{db_target}"
+
+    parts = {}
+    for key in ("server", "database"):
+        match = re.search(rf"(?:^|;)\s*{key}\s*=\s*([^;]*)", db_target, re.IGNORECASE)
+        if match:
+            parts[key] = match.group(1).strip()
+    return f"sqlserver:{parts.get('server', '?')}/{parts.get('database', '?')}"
+
+
+def import_entries_to_target(entries, parse_stats, db_type, db_target):
+    """Bulk-import parsed entries into a single target and commit."""
+    stats = dict(parse_stats)
+    with closing(get_connection(db_type, db_target)) as conn:
+        cur = conn.cursor()
+        (
+            survey_entity_id,
+            sections_have_survey_entity,
+            questions_have_survey_entity,
+            questions_have_text_hash,
+        ) = get_import_context(cur, db_type, db_target)
+        bulk_import_entries(
+            cur,
+            entries,
+            stats,
+            db_type,
+            survey_entity_id,
+            sections_have_survey_entity,
+            questions_have_survey_entity,
+            questions_have_text_hash,
+        )
+        conn.commit()
+    return stats
+
+
+def import_csv_to_targets(csv_path, targets, max_workers=None):
+    """
+    Import a CSV into every (db_type, db_target) in targets concurrently.
+
+    Returns one result dict per target, in the same order:
+    {"target": label, "stats": stats or None, "error": message or None, "seconds": elapsed}
+    """
+    targets = list(targets)
+    if not targets:
+        raise ValueError("At least one target is required.")
+
+    parse_stats = new_import_stats()
+    entries = read_csv_entries(csv_path, parse_stats)
+
+    def run(target):
+        db_type, db_target = target
+        started = time.perf_counter()
+        result = {
+            "target": describe_target(db_type, db_target),
+            "stats": None,
+            "error": None,
+        }
+        try:
+            result["stats"] = import_entries_to_target(
+                entries, parse_stats, db_type, db_target
+            )
+        except Exception as e:
+            result["error"] = str(e)
+        result["seconds"] = time.perf_counter() - started
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(targets)) as pool:
+        return list(pool.map(run, targets))
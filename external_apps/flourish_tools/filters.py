@@ -0,0 +1,103 @@
+"""Per-column filter and sort expressions for the browser, compiled to SQL.
+
+A filter is typed as an operator followed by a value:
+
+    = 42        equal (the default when no operator is given)
+    != 42       not equal
+    > 5  >= 5   greater than (or equal)
+    < 5  <= 5   less than (or equal)
+    ~stress     contains
+    ^Str        starts with
+    null        IS NULL
+    !null       IS NOT NULL
+
+Filters compile to a parameterized WHERE clause that runs on the server, so
+equality and range filters can use indexes such as IX_Responses_UserId.
+Values are sent as strings; both SQL Server and SQLite convert them to the
+column's type for the comparison.
+"""
+from .db import quote_ident
+
+# Longest first, so ">=" is not read as ">" followed by "=5".
+FILTER_OPERATORS = ("!=", ">=", "<=", "=", ">", "<", "~", "^")
+NULL_WORDS = {
+    "null": "null",
+    "is null": "null",
+    "!null": "not null",
+    "not null": "not null",
+    "is not null": "not null",
+}
+
+_COMPARISONS = {"=": "=", "!=": "<>", ">": ">", ">=": ">=", "<": "<", "<=": "<="}
+
+
+def parse_filter(text):
+    """Parse a filter expression into (operator, value); value is None for NULL checks."""
+    text = text.strip()
+    if not text:
+        raise ValueError("Empty filter.")
+    null_check = NULL_WORDS.get(text.lower())
+    if null_check:
+        return null_check, None
+
+    for op in FILTER_OPERATORS:
+        if text.startswith(op):
+            value = text[len(op):].strip()
+            if not value:
+                raise ValueError(f"Filter {text!r} needs a value after {op!r}.")
+            return op, value
+    return "=", text
+
+
+def format_filter(column, op, value):
+    if value is None:
+        return f"{column} {op}"
+    return f"{column} {op} {value}"
+
+
+def _like_pattern(value, db_type):
+    value = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    if db_type == "sqlserver":
+        value = value.replace("[", "\\[")  # [ starts a character class in T-SQL LIKE
+    return value
+
+
+def compile_filters(filters, db_type):
+    """
+    Compile {column: (operator, value)} into (where_sql, params).
+
+    where_sql is "" when there are no filters; otherwise the terms are
+    joined with AND.
+    """
+    terms = []
+    params = []
+    for column, (op, value) in filters.items():
+        ident = quote_ident(column)
+        if op == "null":
+            terms.append(f"{ident} IS NULL")
+        elif op == "not null":
+            terms.append(f"{ident} IS NOT NULL")
+        elif op in _COMPARISONS:
+            terms.append(f"{ident} {_COMPARISONS[op]} ?")
+            params.append(value)
+        elif op in ("~", "^"):
+            pattern = _like_pattern(value, db_type)
+            terms.append(f"{ident} LIKE ? ESCAPE '\\'")
+            params.append(f"%{pattern}%" if op == "~" else f"{pattern}%")
+        else:
+            raise ValueError(f"Unknown filter operator: {op}")
+    return " AND ".join(terms), params
+
+
+def page_order(key_columns, sort=()):
+    """
+    Return the full ORDER BY list for a sorted page: the sort columns, then
+    the key columns not already in it, so every row has a unique position
+    for keyset paging.
+
+    sort is a list of (column, descending) pairs.
+    """
+    order = list(sort)
+    sorted_columns = {column for column, _ in order}
+    order.extend((column, False) for column in key_columns if column not in sorted_columns)
+    return order
@@ -0,0 +1,566 @@
+"""Import sections, subsections, and questions from a CSV file into the db."""
+import csv
+import hashlib
+import itertools
+import re
+
+from .db import get_active_survey_entity_id, get_connection
+from .schema import get_schema_snapshot
+
+
+def import_csv_to_db(csv_path, db_type, db_target, bulk=False):
+    """
+    Import sections, subsections, and questions from CSV to database.
+
+    With bulk=True the active year's sections and questions are loaded into
+    memory once and all new rows are written with batched executemany calls,
+    so the number of round trips does not grow with the size of the CSV.
+
+    CSV Format:
+    Column A: Section Name (parent section)
+    Column B: Subsection Name (leave empty if no subsection)
+    Column C: Question Text
+
+    Examples:
+    "Mental Health","","Does your org have a mental health policy?"
+    "Mental Health","Employee Support","Are EAP services available?"
+    "Physical Wellness","","Is there a gym on site?"
+    """
+    conn = get_connection(db_type, db_target)
+    cur = conn.cursor()
+
+    (
+        survey_entity_id,
+        sections_have_survey_entity,
+        questions_have_survey_entity,
+        questions_have_text_hash,
+    ) = get_import_context(cur, db_type, db_target)
+
+    section_cache = {}  # Cache section IDs to avoid duplicate lookups
+    question_hashes = {}  # {section_id: set of normalized text hashes}
+    stats = new_import_stats()
+
+    with open(csv_path, newline="", encoding="utf-8-sig") as csvfile:
+        rows = iter_csv_rows(csvfile)
+        if bulk:
+            bulk_import_rows(
+                cur,
+                rows,
+                stats,
+                db_type,
+                survey_entity_id,
+                sections_have_survey_entity,
+                questions_have_survey_entity,
+                questions_have_text_hash,
+            )
+        else:
+            for row in rows:
+                process_row(
+                    cur,
+                    row,
+                    section_cache,
+                    stats,
+                    db_type,
+                    survey_entity_id,
+                    sections_have_survey_entity,
+                    questions_have_survey_entity,
+                    question_hashes,
+                    questions_have_text_hash,
+                )
+
+    conn.commit()
+    conn.close()
+
+    return stats
+
+
+def iter_csv_rows(csvfile):
+    """Yield raw CSV rows, leaving out a leading header row."""
+    reader = csv.reader(csvfile)
+    first_row = next(reader, None)
+    # Always skip the first row if it matches the known headers (case-insensitive, strip whitespace)
+    header_values = ["section", "subsection", "question"]
+    is_header = False
+    if first_row:
+        normalized = [col.strip().lower() for col in first_row]
+        if normalized == header_values:
+            is_header = True
+    if first_row is None:
+        return iter(())  # empty file
+    if is_header:
+        return reader  # skip header, process rest
+    return itertools.chain([first_row], reader)  # process first row, then rest
+
+
+def read_csv_entries(csv_path, stats):
+    """Parse a whole CSV into a list of (section, subsection, question) tuples."""
+    with open(csv_path, newline="", encoding="utf-8-sig") as csvfile:
+        entries = []
+        for row in iter_csv_rows(csvfile):
+            values = parse_row(row, stats)
+            if values is not None:
+                entries.append(values)
+        return entries
+
+
+def new_import_stats():
+    return {
+        "sections": 0,
+        "subsections": 0,
+        "questions": 0,
+        "skipped": 0,
+        "duplicate_questions": 0,
+    }
+
+
+def get_import_context(cur, db_type, db_target=None):
+    """Check the target schema and return (survey_entity_id,
+    sections_have_survey_entity, questions_have_survey_entity,
+    questions_have_text_hash).
+
+    All existence checks come from one SchemaSnapshot, cached per db_target.
+    """
+    schema = get_schema_snapshot(cur, db_type, db_target)
+    if not schema.table_exists("Sections"):
+        raise RuntimeError("Target database is missing required table: Sections")
+    if not schema.table_exists("Questions"):
+        raise RuntimeError("Target database is missing required table: Questions")
+
+    survey_entity_id = get_active_survey_entity_id(cur, db_type, schema)
+    sections_have_survey_entity = schema.column_exists("Sections", "SurveyYear")
+    questions_have_survey_entity = schema.column_exists("Questions", "SurveyYear")
+
+    if sections_have_survey_entity and survey_entity_id is None:
+        raise RuntimeError(
+            "Sections requires SurveyYear, but no SurveyYear row was found."
+        )
+    if questions_have_survey_entity and survey_entity_id is None:
+        raise RuntimeError(
+            "Questions requires SurveyYear, but no SurveyYear row was found."
+        )
+
+    # Added by AddQuestionTextHash.sql; only SQL Server computes it.
+    questions_have_text_hash = db_type == "sqlserver" and schema.column_exists(
+        "Questions", "NormalizedTextHash"
+    )
+
+    return (
+        survey_entity_id,
+        sections_have_survey_entity,
+        questions_have_survey_entity,
+        questions_have_text_hash,
+    )
+
+
+def insert_section_and_get_id(
+    cur,
+    db_type,
+    section_name,
+    parent_section_id,
+    survey_entity_id,
+    sections_have_survey_entity,
+):
+    if db_type == "sqlserver":
+        if sections_have_survey_entity:
+            cur.execute(
+                "INSERT INTO Sections (Name, ParentSectionId, SurveyYear) OUTPUT INSERTED.Id VALUES (?, ?, ?)",
+                (section_name, parent_section_id, survey_entity_id),
+            )
+        else:
+            cur.execute(
+                "INSERT INTO Sections (Name, ParentSectionId) OUTPUT INSERTED.Id VALUES (?, ?)",
+                (section_name, parent_section_id),
+            )
+
+        inserted = cur.fetchone()
+        if not inserted or inserted[0] is None:
+            raise RuntimeError(
+                "Failed to retrieve inserted section id from SQL Server."
+            )
+        return inserted[0]
+
+    if db_type == "sqlite":
+        if sections_have_survey_entity:
+            cur.execute(
+                "INSERT INTO Sections (Name, ParentSectionId, SurveyYear) VALUES (?, ?, ?)",
+                (section_name, parent_section_id, survey_entity_id),
+            )
+        else:
+            cur.execute(
+                "INSERT INTO Sections (Name, ParentSectionId) VALUES (?, ?)",
+                (section_name, parent_section_id),
+            )
+        return cur.lastrowid
+
+    raise ValueError(f"Unsupported database type: {db_type}")
+
+
+def process_row(
+    cur,
+    row,
+    section_cache,
+    stats,
+    db_type,
+    survey_entity_id,
+    sections_have_survey_entity,
+    questions_have_survey_entity,
+    question_hashes=None,
+    questions_have_text_hash=False,
+):
+    """Process a single CSV row and insert section/subsection/question.
+
+    question_hashes maps section_id to the normalized text hashes of its
+    questions. Each section is loaded once, so the duplicate check is a set
+    lookup instead of a query per row.
+    """
+    if question_hashes is None:
+        question_hashes = {}
+    values = parse_row(row, stats)
+    if values is None:
+        return  # Empty, header, or missing section name
+    section_name, subsection_name, question_text = values
+
+    # Get or create parent section
+    if section_name not in section_cache:
+        if sections_have_survey_entity:
+            cur.execute(
+                "SELECT Id FROM Sections WHERE Name = ? AND ParentSectionId IS NULL AND SurveyYear = ?",
+                (section_name, survey_entity_id),
+            )
+        else:
+            cur.execute(
+                "SELECT Id FROM Sections WHERE Name = ? AND ParentSectionId IS NULL",
+                (section_name,),
+            )
+        section = cur.fetchone()
+        if section:
+            section_id = section[0]
+        else:
+            section_id = insert_section_and_get_id(
+                cur,
+                db_type,
+                section_name,
+                None,
+                survey_entity_id,
+                sections_have_survey_entity,
+            )
+            stats["sections"] += 1
+        section_cache[section_name] = section_id
+    else:
+        section_id = section_cache[section_name]
+
+    # Handle subsection if present
+    target_section_id = section_id
+    if subsection_name:
+        subsection_key = f"{section_name}::{subsection_name}::{survey_entity_id}"
+        if subsection_key not in section_cache:
+            if sections_have_survey_entity:
+                cur.execute(
+                    "SELECT Id FROM Sections WHERE Name = ? AND ParentSectionId = ? AND SurveyYear = ?",
+                    (subsection_name, section_id, survey_entity_id),
+                )
+            else:
+                cur.execute(
+                    "SELECT Id FROM Sections WHERE Name = ? AND ParentSectionId = ?",
+                    (subsection_name, section_id),
+                )
+            subsection = cur.fetchone()
+            if subsection:
+                target_section_id = subsection[0]
+            else:
+                target_section_id = insert_section_and_get_id(
+                    cur,
+                    db_type,
+                    subsection_name,
+                    section_id,
+                    survey_entity_id,
+                    sections_have_survey_entity,
+                )
+                stats["subsections"] += 1
+            section_cache[subsection_key] = target_section_id
+        else:
+            target_section_id = section_cache[subsection_key]
+
+    # Insert question if provided (check for duplicates)
+    if question_text:
+        try:
+            # Check if question already exists for this section
+            if target_section_id not in question_hashes:
+                question_hashes[target_section_id] = load_section_question_hashes(
+                    cur, target_section_id, questions_have_text_hash
+                )
+            section_hashes = question_hashes[target_section_id]
+            text_hash = question_text_hash(question_text)
+
+            if text_hash in section_hashes:
+                stats["duplicate_questions"] += 1
+            else:
+                if questions_have_survey_entity:
+                    cur.execute(
+                        "INSERT INTO Questions (Text, SurveyYear, SectionId) VALUES (?, ?, ?)",
+                        (question_text, survey_entity_id, target_section_id),
+                    )
+                else:
+                    cur.execute(
+                        "INSERT INTO Questions (Text, SectionId) VALUES (?, ?)",
+                        (question_text, target_section_id),
+                    )
+                section_hashes.add(text_hash)
+                stats["questions"] += 1
+        except Exception as e:
+            print(f"Error inserting question '{question_text}': {e}")
+            stats["skipped"] += 1
+    else:
+        stats["skipped"] += 1
+
+
+def parse_row(row, stats):
+    """Return (section, subsection, question) for a CSV row, or None if the row is skipped."""
+    if len(row) < 1:
+        stats["skipped"] += 1
+        return None
+
+    header_values = ["section", "subsection", "question"]
+    normalized = [col.strip().lower() for col in row]
+    if normalized == header_values:
+        stats["skipped"] += 1
+        return None
+
+    section_name = row[0].strip()
+    subsection_name = row[1].strip() if len(row) > 1 else ""
+    question_text = row[2].strip() if len(row) > 2 else ""
+
+    if not section_name:
+        stats["skipped"] += 1
+        return None
+
+    return section_name, subsection_name, question_text
+
+
+_QUESTION_WHITESPACE = re.compile(r"[ \t\r\n]+")
+
+
+def normalize_question_text(text):
+    """Collapse whitespace runs, trim and lowercase question text.
+
+    Must stay in step with the NormalizedTextHash expression in
+    AddQuestionTextHash.sql.
+    """
+    return _QUESTION_WHITESPACE.sub(" ", text).strip(" ").lower()
+
+
+def question_text_hash(text):
+    """SHA-256 of the normalized text as UTF-16LE, matching HASHBYTES on NVARCHAR."""
+    return hashlib.sha256(normalize_question_text(text).encode("utf-16-le")).digest()
+
+
+def load_section_question_hashes(cur, section_id, questions_have_text_hash=False):
+    """Return the set of normalized text hashes for one section's questions."""
+    if questions_have_text_hash:
+        cur.execute(
+            "SELECT NormalizedTextHash FROM Questions WHERE SectionId = ?", (section_id,)
+        )
+        return {bytes(row[0]) for row in cur.fetchall()}
+
+    cur.execute("SELECT Text FROM Questions WHERE SectionId = ?", (section_id,))
+    return {question_text_hash(row[0]) for row in cur.fetchall()}
+
+
+def section_name_key(name, db_type=None):
+    """
+    Return the key bulk mode matches a section name on.
+
+    The row path looks sections up with SQL "Name = ?", which under SQL
+    Server's default CI collation ignores case and trailing spaces, so bulk
+    mode has to do the same there to reuse the same sections.
+    """
+    if db_type == "sqlserver":
+        return name.rstrip().casefold()
+    return name
+
+
+def load_section_index(cur, survey_entity_id, sections_have_survey_entity, db_type=None):
+    """Return {(parent_section_id, section_name_key(name)): section_id} for the active
+    year's sections. Without db_type names are matched exactly."""
+    if sections_have_survey_entity:
+        cur.execute(
+            "SELECT Id, Name, ParentSectionId FROM Sections WHERE SurveyYear = ? ORDER BY Id",
+            (survey_entity_id,),
+        )
+    else:
+        cur.execute("SELECT Id, Name, ParentSectionId FROM Sections ORDER BY Id")
+
+    index = {}
+    for section_id, name, parent_section_id in cur.fetchall():
+        # Keep the lowest Id when names repeat, like the row-by-row lookup does.
+        index.setdefault((parent_section_id, section_name_key(name, db_type)), section_id)
+    return index
+
+
+def load_question_index(
+    cur, survey_entity_id, sections_have_survey_entity, questions_have_text_hash=False
+):
+    """Return {(section_id, text_hash)} for every question under the active year's sections."""
+    column = "NormalizedTextHash" if questions_have_text_hash else "Text"
+    if sections_have_survey_entity:
+        cur.execute(
+            f"SELECT q.SectionId, q.{column} FROM Questions q"
+            " INNER JOIN Sections s ON s.Id = q.SectionId WHERE s.SurveyYear = ?",
+            (survey_entity_id,),
+        )
+    else:
+        cur.execute(f"SELECT SectionId, {column} FROM Questions")
+
+    if questions_have_text_hash:
+        return {(section_id, bytes(value)) for section_id, value in cur.fetchall()}
+    return {(section_id, question_text_hash(value)) for section_id, value in cur.fetchall()}
+
+
+def insert_sections_bulk(
+    cur,
+    section_rows,
+    survey_entity_id,
+    sections_have_survey_entity,
+):
+    """Insert (name, parent_section_id) pairs with a single executemany call."""
+    if not section_rows:
+        return
+    if sections_have_survey_entity:
+        cur.executemany(
+            "INSERT INTO Sections (Name, ParentSectionId, SurveyYear) VALUES (?, ?, ?)",
+            [(name, parent_id, survey_entity_id) for name, parent_id in section_rows],
+        )
+    else:
+        cur.executemany(
+            "INSERT INTO Sections (Name, ParentSectionId) VALUES (?, ?)",
+            section_rows,
+        )
+
+
+def bulk_import_rows(
+    cur,
+    rows,
+    stats,
+    db_type,
+    survey_entity_id,
+    sections_have_survey_entity,
+    questions_have_survey_entity,
+    questions_have_text_hash=False,
+):
+    """Set-based version of process_row for a whole CSV."""
+    parsed = []
+    for row in rows:
+        values = parse_row(row, stats)
+        if values is not None:
+            parsed.append(values)
+
+    bulk_import_entries(
+        cur,
+        parsed,
+        stats,
+        db_type,
+        survey_entity_id,
+        sections_have_survey_entity,
+        questions_have_survey_entity,
+        questions_have_text_hash,
+    )
+
+
+def bulk_import_entries(
+    cur,
+    parsed,
+    stats,
+    db_type,
+    survey_entity_id,
+    sections_have_survey_entity,
+    questions_have_survey_entity,
+    questions_have_text_hash=False,
+):
+    """Import already-parsed (section, subsection, question) entries in bulk.
+
+    Round trips: one read per index, then one executemany plus one ID fetch
+    for top-level sections, the same for subsections, and one executemany
+    for questions.
+    """
+    if db_type == "sqlserver":
+        cur.fast_executemany = True
+    elif db_type != "sqlite":
+        raise ValueError(f"Unsupported database type: {db_type}")
+
+    def load_sections():
+        return load_section_index(cur, survey_entity_id, sections_have_survey_entity, db_type)
+
+    def name_key(name):
+        return section_name_key(name, db_type)
+
+    section_index = load_sections()
+    existing_questions = load_question_index(
+        cur, survey_entity_id, sections_have_survey_entity, questions_have_text_hash
+    )
+
+    # Level 1: top-level sections.
+    new_sections = []
+    seen_sections = set()
+    for section_name, _, _ in parsed:
+        key = (None, name_key(section_name))
+        if key not in section_index and key not in seen_sections:
+            seen_sections.add(key)
+            new_sections.append((section_name, None))
+    if new_sections:
+        insert_sections_bulk(
+            cur, new_sections, survey_entity_id, sections_have_survey_entity
+        )
+        stats["sections"] += len(new_sections)
+        section_index = load_sections()
+
+    # Level 2: subsections, now that every parent has an Id.
+    new_subsections = []
+    seen_subsections = set()
+    for section_name, subsection_name, _ in parsed:
+        if not subsection_name:
+            continue
+        parent_id = section_index[(None, name_key(section_name))]
+        key = (parent_id, name_key(subsection_name))
+        if key not in section_index and key not in seen_subsections:
+            seen_subsections.add(key)
+            new_subsections.append((subsection_name, parent_id))
+    if new_subsections:
+        insert_sections_bulk(
+            cur, new_subsections, survey_entity_id, sections_have_survey_entity
+        )
+        stats["subsections"] += len(new_subsections)
+        section_index = load_sections()
+
+    # Level 3: questions.
+    new_questions = []
+    for section_name, subsection_name, question_text in parsed:
+        if not question_text:
+            stats["skipped"] += 1
+            continue
+
+        target_section_id = section_index[(None, name_key(section_name))]
+        if subsection_name:
+            target_section_id = section_index[(target_section_id, name_key(subsection_name))]
+
+        key = (target_section_id, question_text_hash(question_text))
+        if key in existing_questions:
+            stats["duplicate_questions"] += 1
+            continue
+        existing_questions.add(key)
+        new_questions.append((question_text, target_section_id))
+
+    if new_questions:
+        if questions_have_survey_entity:
+            cur.executemany(
+                "INSERT INTO Questions (Text, SurveyYear, SectionId) VALUES (?, ?, ?)",
+                [
+                    (text, survey_entity_id, section_id)
+                    for text, section_id in new_questions
+                ],
+            )
+        else:
+            cur.executemany(
+                "INSERT INTO Questions (Text, SectionId) VALUES (?, ?)",
+                new_questions,
+            )
+        stats["questions"] += len(new_questions)
@@ -0,0 +1,512 @@
+"""Suggest indexes for the app's query shapes and measure them before keeping any.
+
+schema.sql only has single-column indexes (IX_Responses_UserId,
+IX_Responses_SurveyEntityId, ...), but SurveyService filters responses by
+user, year and community together. QUERY_CATALOG holds the SQL the app's hot
+paths run, written the way EF Core emits it. The advisor:
+
+  1. samples real parameters (user/year/community triples, years, question
+     ids) from the target and times every shape as the baseline,
+  2. captures each plan (EXPLAIN QUERY PLAN on SQLite, the actual showplan
+     XML on SQL Server) and flags shapes that scan, sort, or look up rows,
+  3. proposes a composite index per flagged shape plus a covering variant
+     (INCLUDE on SQL Server, extra key columns on SQLite), and adds SQL
+     Server's own missing-index hints from the showplan,
+  4. builds each candidate through flourish_tools.migrate, retimes the shapes
+     on that table, checks the plan actually uses it, times a batch insert
+     to show the write cost, and drops it again.
+
+A candidate is recommended when a shape that uses it gets at least
+min_speedup times faster at p50. Recommendations are returned as migrate
+changes, so they can be written to a file and applied with the migrate
+command. The target is changed while the advisor runs, so point it at a
+seeded copy (see the generate command), not production.
+
+    python -m flourish_tools advise-indexes --db-type sqlite --target big.db --changes-out idx.json
+    python -m flourish_tools migrate idx.json --db-type sqlite --target big.db --apply
+"""
+import random
+import time
+import xml.etree.ElementTree as ET
+from contextlib import closing
+from datetime import datetime, timezone
+
+from .db import get_connection, quote_ident
+from .loadsim import percentile
+from .migrate import apply_migration_plan, build_migration_plan
+
+DEFAULT_RUNS = 25
+DEFAULT_MIN_SPEEDUP = 1.2
+WRITE_PROBE_ROWS = 500
+
+SHOWPLAN_NS = {"sp": "http://schemas.microsoft.com/sqlserver/2004/07/showplan"}
+# Plan operators that suggest a better index would help.
+SQLSERVER_FLAGS = ("Table Scan", "Clustered Index Scan", "Index Scan", "Key Lookup", "RID Lookup", "Sort")
+
+
+class QueryShape:
+    """One query the app runs, and the columns an index for it would need."""
+
+    def __init__(self, name, source, table, sql, params, equality, order=(), covered=()):
+        self.name = name
+        self.source = source  # the SurveyService method that runs it
+        self.table = table
+        self.sql = sql
+        self.params = params  # "triple", "year" or "question"
+        self.equality = list(equality)
+        self.order = list(order)  # GROUP BY / ORDER BY columns, after the equality ones
+        self.covered = list(covered)  # other columns read, for a covering index
+
+
+NONBLANK_ANSWER = "LTRIM(RTRIM(Answer)) <> ''"  # string.IsNullOrWhiteSpace
+
+QUERY_CATALOG = [
+    QueryShape(
+        "user_responses",
+        "GetUserResponsesAsync, SaveUserResponsesAsync",
+        "Responses",
+        "SELECT QuestionId, Answer FROM Responses"
+        " WHERE UserId = ? AND SurveyYear = ? AND CommunityKey = ?",
+        "triple",
+        equality=["UserId", "SurveyYear", "CommunityKey"],
+        covered=["QuestionId", "Answer"],
+    ),
+    QueryShape(
+        "answered_count",
+        "CompleteSurveyAsync",
+        "Responses",
+        "SELECT COUNT(DISTINCT QuestionId) FROM Responses"
+        f" WHERE UserId = ? AND SurveyYear = ? AND CommunityKey = ? AND {NONBLANK_ANSWER}",
+        "triple",
+        equality=["UserId", "SurveyYear", "CommunityKey"],
+        covered=["QuestionId", "Answer"],
+    ),
+    QueryShape(
+        "user_status",
+        "IsSurveyCompletedAsync, GetSurveyCompletedAtAsync",
+        "UserSurveyStatuses",
+        "SELECT Id, IsCompleted, UpdatedAt FROM UserSurveyStatuses"
+        " WHERE UserId = ? AND SurveyYear = ? AND CommunityKey = ?",
+        "triple",
+        equality=["UserId", "SurveyYear", "CommunityKey"],
+        covered=["IsCompleted", "UpdatedAt"],
+    ),
+    QueryShape(
+        "year_response_counts",
+        "GetSurveyLockRowsAsync",
+        "Responses",
+        "SELECT UserId, CommunityKey, COUNT(*) FROM Responses"
+        " WHERE SurveyYear = ? GROUP BY UserId, CommunityKey",
+        "year",
+        equality=["SurveyYear"],
+        order=["UserId", "CommunityKey"],
+    ),
+    QueryShape(
+        "year_answered_counts",
+        "GetSurveyLockRowsAsync",
+        "Responses",
+        "SELECT UserId, CommunityKey, COUNT(DISTINCT QuestionId) FROM Responses"
+        f" WHERE SurveyYear = ? AND {NONBLANK_ANSWER} GROUP BY UserId, CommunityKey",
+        "year",
+        equality=["SurveyYear"],
+        order=["UserId", "CommunityKey"],
+        covered=["QuestionId", "Answer"],
+    ),
+    QueryShape(
+        "completed_entries",
+        "GetCompletedSurveyEntriesAsync",
+        "UserSurveyStatuses",
+        "SELECT UserId, CommunityKey, UpdatedAt FROM UserSurveyStatuses"
+        " WHERE SurveyYear = ? AND IsCompleted = 1 ORDER BY UpdatedAt DESC",
+        "year",
+        equality=["SurveyYear", "IsCompleted"],
+        order=["UpdatedAt"],
+        covered=["UserId", "CommunityKey"],
+    ),
+    QueryShape(
+        "question_responses",
+        "GetSectionsWithResponsesAsync (Include Responses)",
+        "Responses",
+        "SELECT Id, Answer, UserId, CommunityKey FROM Responses WHERE QuestionId = ?",
+        "question",
+        equality=["QuestionId"],
+        covered=["Answer", "UserId", "CommunityKey"],
+    ),
+]
+
+PARAM_SQL = {
+    "triple": (
+        "SELECT DISTINCT UserId, SurveyYear, CommunityKey FROM UserSurveyStatuses",
+        "SELECT DISTINCT UserId, SurveyYear, CommunityKey FROM Responses",
+    ),
+    "year": ("SELECT DISTINCT SurveyYear FROM Responses",),
+    "question": ("SELECT DISTINCT QuestionId FROM Responses",),
+}
+
+# Copies a window of existing rows, to time what an extra index costs a save.
+WRITE_PROBES = {
+    "Responses": (
+        "INSERT INTO Responses"
+        " (Answer, QuestionId, UserId, SurveyYear, SAMaccountName, CreateDate, Modified, CommunityKey)"
+        " SELECT Answer, QuestionId, UserId, SurveyYear, SAMaccountName, CreateDate, Modified, CommunityKey"
+        " FROM Responses WHERE Id BETWEEN ? AND ?"
+    ),
+}
+
+
+def sample_parameters(cur, shapes, runs, seed=0):
+    """Return {param kind: [parameter tuples]} with runs entries per kind."""
+    rng = random.Random(seed)
+    samples = {}
+    for kind in sorted({shape.params for shape in shapes}):
+        rows = []
+        for sql in PARAM_SQL[kind]:
+            cur.execute(sql)
+            rows = [tuple(row) for row in cur.fetchall() if None not in tuple(row)]
+            if rows:
+                break
+        if not rows:
+            raise ValueError(f"No rows to sample {kind} parameters from; seed the target first.")
+        rows.sort()
+        samples[kind] = [rng.choice(rows) for _ in range(runs)]
+    return samples
+
+
+def time_shape(cur, shape, params):
+    """Run shape once per parameter tuple (after one warm-up) and return latency stats."""
+    cur.execute(shape.sql, params[0])
+    cur.fetchall()
+    latencies = []
+    rows = 0
+    for values in params:
+        started = time.perf_counter()
+        cur.execute(shape.sql, values)
+        rows += len(cur.fetchall())
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        "runs": len(latencies),
+        "rows": rows,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+
+def explain_sqlite(cur, shape, params):
+    cur.execute("EXPLAIN QUERY PLAN " + shape.sql, params)
+    details = [row[3] for row in cur.fetchall()]
+    flags = []
+    for detail in details:
+        if detail.startswith("SCAN") and "COVERING INDEX" not in detail:
+            flags.append("scan")
+        if "TEMP B-TREE" in detail:
+            flags.append("sort")
+        if detail.startswith("SEARCH") and " USING INDEX " in detail:
+            flags.append("lookup")  # not covering: each match reads the table row too
+        if detail.startswith("SEARCH") and detail.count("=?") < len(shape.equality):
+            flags.append("residual")  # some filters are checked row by row
+    return {"plan": "; ".join(details), "flags": sorted(set(flags)), "missing": []}
+
+
+def _showplan_xml(cur, shape, params):
+    cur.execute("SET STATISTICS XML ON")
+    try:
+        cur.execute(shape.sql, params)
+        cur.fetchall()
+        xml_text = None
+        while cur.nextset():
+            row = cur.fetchone()
+            if row and isinstance(row[0], str) and row[0].lstrip().startswith("<ShowPlanXML"):
+                xml_text = row[0]
+    finally:
+        cur.execute("SET STATISTICS XML OFF")
+    return xml_text
+
+
+def explain_sqlserver(cur, shape, params):
+    xml_text = _showplan_xml(cur, shape, params)
+    if not xml_text:
+        return {"plan": "", "flags": [], "missing": []}
+    root = ET.fromstring(xml_text)
+
+    operators = []
+    flags = []
+    for relop in root.iter(f"{{{SHOWPLAN_NS['sp']}}}RelOp"):
+        physical = relop.get("PhysicalOp")
+        obj = relop.find("./*/sp:Object", SHOWPLAN_NS)
+        index = obj.get("Index", obj.get("Table", "")).strip("[]") if obj is not None else ""
+        # A clustered index seek that is a lookup shows up as Lookup="1".
+        lookup = relop.find("./sp:IndexScan[@Lookup='1']", SHOWPLAN_NS) is not None
+        if lookup:
+            physical = "Key Lookup"
+        operators.append(f"{physical}({index})" if index else physical)
+        if physical in SQLSERVER_FLAGS:
+            flags.append("lookup" if "Lookup" in physical else physical.split()[-1].lower())
+        if relop.find("./sp:IndexScan/sp:Predicate", SHOWPLAN_NS) is not None:
+            flags.append("residual")  # some filters are checked row by row
+
+    missing = []
+    for group in root.iter(f"{{{SHOWPLAN_NS['sp']}}}MissingIndex"):
+        columns = {"EQUALITY": [], "INEQUALITY": [], "INCLUDE": []}
+        for column_group in group.findall("sp:ColumnGroup", SHOWPLAN_NS):
+            columns[column_group.get("Usage")] = [
+                column.get("Name").strip("[]")
+                for column in column_group.findall("sp:Column", SHOWPLAN_NS)
+            ]
+        missing.append(
+            {
+                "table": group.get("Table").strip("[]"),
+                "columns": columns["EQUALITY"] + columns["INEQUALITY"],
+                "include": columns["INCLUDE"],
+            }
+        )
+    return {"plan": "; ".join(operators), "flags": sorted(set(flags)), "missing": missing}
+
+
+def explain(cur, db_type, shape, params):
+    if db_type == "sqlite":
+        return explain_sqlite(cur, shape, params)
+    return explain_sqlserver(cur, shape, params)
+
+
+def existing_index_keys(cur, db_type):
+    """Return {(table casefold): [(index name, [key columns], [included columns])]}."""
+    indexes = {}
+    if db_type == "sqlite":
+        cur.execute("SELECT tbl_name, name FROM sqlite_master WHERE type = 'index'")
+        for table_name, index_name in cur.fetchall():
+            cur.execute(f"PRAGMA index_info({quote_ident(index_name)})")
+            keys = [row[2] for row in sorted(cur.fetchall())]
+            indexes.setdefault(table_name.casefold(), []).append((index_name, keys, []))
+        return indexes
+
+    cur.execute(
+        "SELECT t.name, i.name, c.name, ic.is_included_column FROM sys.indexes i"
+        " INNER JOIN sys.tables t ON t.object_id = i.object_id"
+        " INNER JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id"
+        " INNER JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id"
+        " WHERE SCHEMA_NAME(t.schema_id) = 'dbo' AND i.name IS NOT NULL"
+        " ORDER BY t.name, i.name, ic.key_ordinal, ic.index_column_id"
+    )
+    by_index = {}
+    for table_name, index_name, column_name, included in cur.fetchall():
+        entry = by_index.setdefault((table_name, index_name), ([], []))
+        entry[1 if included else 0].append(column_name)
+    for (table_name, index_name), (keys, included) in by_index.items():
+        indexes.setdefault(table_name.casefold(), []).append((index_name, keys, included))
+    return indexes
+
+
+def _covers(existing, columns, include):
+    """True when an existing index already has this key prefix and these columns."""
+    wanted_keys = [c.casefold() for c in columns]
+    for _, keys, included in existing:
+        keys = [c.casefold() for c in keys]
+        available = set(keys) | {c.casefold() for c in included}
+        if keys[: len(wanted_keys)] == wanted_keys and {c.casefold() for c in include} <= available:
+            return True
+    return False
+
+
+def index_change(db_type, table, columns, include=()):
+    """Return a migrate create_index change for the candidate."""
+    columns = list(columns)
+    include = [c for c in include if c not in columns]
+    if db_type == "sqlite" and include:
+        # No INCLUDE in SQLite; trailing key columns cover the query instead.
+        columns, include = columns + include, []
+    name = f"IX_{table}_{'_'.join(columns)}"
+    if include:
+        name += "_Covering"
+    change = {"op": "create_index", "table": table, "name": name, "columns": columns}
+    if include:
+        change["include"] = include
+    return change
+
+
+def propose_candidates(db_type, shapes, baseline, existing):
+    """Return candidate create_index changes, each with the shapes that asked for it."""
+    candidates = {}
+
+    def add(change, shape_name, origin):
+        existing_for_table = existing.get(change["table"].casefold(), [])
+        if _covers(existing_for_table, change["columns"], change.get("include", ())):
+            return
+        entry = candidates.setdefault(change["name"], {"change": change, "shapes": [], "origin": origin})
+        if shape_name not in entry["shapes"]:
+            entry["shapes"].append(shape_name)
+
+    for shape in shapes:
+        found = baseline[shape.name]
+        if not found["flags"] and not found["missing"]:
+            continue
+        key = shape.equality + [c for c in shape.order if c not in shape.equality]
+        add(index_change(db_type, shape.table, key), shape.name, "catalog")
+        if shape.covered:
+            add(index_change(db_type, shape.table, key, shape.covered), shape.name, "catalog")
+        for hint in found["missing"]:
+            add(
+                index_change(db_type, hint["table"], hint["columns"], hint["include"]),
+                shape.name,
+                "showplan",
+            )
+    return list(candidates.values())
+
+
+def time_write_probe(conn, cur, table, rows=WRITE_PROBE_ROWS):
+    """Time inserting a batch of copied rows into table, then roll it back."""
+    sql = WRITE_PROBES.get(table)
+    if sql is None:
+        return None
+    cur.execute(f"SELECT MIN(Id) FROM {quote_ident(table)}")
+    first = cur.fetchone()[0]
+    if first is None:
+        return None
+    started = time.perf_counter()
+    cur.execute(sql, (first, first + rows - 1))
+    elapsed = (time.perf_counter() - started) * 1000
+    conn.rollback()
+    return round(elapsed, 3)
+
+
+def _run_changes(db_type, db_target, changes):
+    plan = build_migration_plan(changes, db_type, db_target)
+    results = apply_migration_plan(plan, db_type, db_target)
+    failed = [result for result in results if result["error"]]
+    if failed:
+        raise RuntimeError(f"{failed[0]['step']} failed: {failed[0]['error']}")
+    return sum(result["seconds"] or 0 for result in results)
+
+
+def _measure(conn, cur, db_type, shapes, samples):
+    if db_type == "sqlite":
+        # Without statistics SQLite guesses between competing indexes.
+        for table in sorted({shape.table for shape in shapes}):
+            cur.execute(f"ANALYZE {quote_ident(table)}")
+    measured = {}
+    for shape in shapes:
+        params = samples[shape.params]
+        measured[shape.name] = {
+            **time_shape(cur, shape, params),
+            **explain(cur, db_type, shape, params[0]),
+        }
+    # End the read transaction so the migrate connection can take Sch-M.
+    conn.commit()
+    return measured
+
+
+def advise_indexes(
+    db_type,
+    db_target,
+    shapes=None,
+    runs=DEFAULT_RUNS,
+    min_speedup=DEFAULT_MIN_SPEEDUP,
+    seed=0,
+    progress=None,
+):
+    """
+    Time the catalog, try each candidate index, and return a report dict:
+    {"params", "baseline", "candidates", "recommended"}. Every candidate is
+    dropped again; "recommended" holds migrate changes for the ones worth
+    keeping.
+    """
+    shapes = list(shapes or QUERY_CATALOG)
+    report_progress = progress or (lambda message: None)
+
+    with closing(get_connection(db_type, db_target)) as conn:
+        cur = conn.cursor()
+        samples = sample_parameters(cur, shapes, runs, seed=seed)
+        report_progress("timing baseline")
+        baseline = _measure(conn, cur, db_type, shapes, samples)
+        existing = existing_index_keys(cur, db_type)
+        candidates = propose_candidates(db_type, shapes, baseline, existing)
+        writes_before = {
+            table: time_write_probe(conn, cur, table)
+            for table in {candidate["change"]["table"] for candidate in candidates}
+        }
+
+        results = []
+        for n, candidate in enumerate(candidates, 1):
+            change = candidate["change"]
+            report_progress(f"candidate {n}/{len(candidates)}: {change['name']}")
+            table_shapes = [
+                shape for shape in shapes if shape.table.casefold() == change["table"].casefold()
+            ]
+            build_seconds = _run_changes(db_type, db_target, [change])
+            try:
+                after = _measure(conn, cur, db_type, table_shapes, samples)
+                write_ms = time_write_probe(conn, cur, change["table"])
+            finally:
+                _run_changes(
+                    db_type,
+                    db_target,
+                    [{"op": "drop_index", "table": change["table"], "name": change["name"]}],
+                )
+
+            queries = {}
+            best = 0.0
+            for shape in table_shapes:
+                before_ms = baseline[shape.name]["p50_ms"]
+                after_ms = after[shape.name]["p50_ms"]
+                speedup = round(before_ms / after_ms, 2) if after_ms else None
+                uses_index = change["name"].casefold() in after[shape.name]["plan"].casefold()
+                if uses_index and speedup:
+                    best = max(best, speedup)
+                queries[shape.name] = {
+                    "before_p50_ms": before_ms,
+                    "after_p50_ms": after_ms,
+                    "after_p95_ms": after[shape.name]["p95_ms"],
+                    "speedup": speedup,
+                    "uses_index": uses_index,
+                    "plan": after[shape.name]["plan"],
+                }
+            results.append(
+                {
+                    "change": change,
+                    "origin": candidate["origin"],
+                    "for_shapes": candidate["shapes"],
+                    "build_seconds": round(build_seconds, 4),
+                    "write_probe_ms": {"before": writes_before[change["table"]], "after": write_ms},
+                    "best_speedup": best,
+                    "recommended": best >= min_speedup,
+                    "queries": queries,
+                }
+            )
+
+    return {
+        "params": {
+            "db_type": db_type,
+            "runs": runs,
+            "min_speedup": min_speedup,
+            "seed": seed,
+            "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "baseline": baseline,
+        "candidates": results,
+        "recommended": recommended_changes(results),
+    }
+
+
+def recommended_changes(results):
+    """
+    Pick recommended candidates, best first, skipping any that shares its
+    leading key with an already picked one on the same table (one is a
+    prefix of the other, so a single index serves both).
+    """
+    picked = []
+    for result in sorted(results, key=lambda r: -r["best_speedup"]):
+        if not result["recommended"]:
+            continue
+        change = result["change"]
+        if any(
+            other["table"] == change["table"]
+            and (
+                other["columns"][: len(change["columns"])] == change["columns"]
+                or change["columns"][: len(other["columns"])] == other["columns"]
+            )
+            for other in picked
+        ):
+            continue
+        picked.append(change)
+    return picked
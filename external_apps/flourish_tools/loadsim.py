@@ -0,0 +1,440 @@
+"""Simulate many facility staff saving and submitting surveys at the same time.
+
+Each virtual user replays what the Survey page does against the database: a
+few progress saves, a few autosaves, and usually a final submit. The SQL
+mirrors SurveyService, including its per-question existence check:
+
+    save / autosave   SaveUserResponsesAsync: read the active year, the user's
+                      UserSurveyStatuses row and existing Responses, check each
+                      question, then UPDATE changed answers (with a
+                      ResponseAuditLogs row when that table exists) and INSERT
+                      new ones in one commit.
+    complete          a full save followed by CompleteSurveyAsync: count the
+                      questions and the user's distinct answers, then create
+                      or update the (UserId, SurveyYear, CommunityKey) status.
+
+Every save sends the user's whole answer set, like the page does. An autosave
+differs from a save only in adding fewer new answers per step.
+
+Virtual users run on a thread pool, and each thread holds its own connection.
+Users come from the target (Users joined to Community), limited to those who
+have not completed the active year, so a dataset from `generate` works out of
+the box. For every operation the simulator records:
+
+    latency           p50/p95/p99/max in milliseconds;
+    deadlocks         SQL Server deadlock victims (SQLSTATE 40001);
+    lock waits        SQL Server LCK_M_* wait time of the operation's own
+                      session, from sys.dm_exec_session_wait_stats. On SQLite,
+                      the time spent retrying after "database is locked".
+
+    python -m flourish_tools loadsim --db-type sqlite --target big.db \
+        --users 2000 --concurrency 32 --output deadline.json
+"""
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+
+from .db import get_connection, table_exists
+
+OPERATIONS = ("save", "autosave", "complete")
+ANSWER_CHOICES = ["Fully Implemented", "Partially Implemented", "Not a Current Practice"]
+
+# SQLite is opened with busy_timeout = 0 and locked operations are retried
+# here instead, so the time spent waiting can be measured.
+SQLITE_LOCK_TIMEOUT = 30.0
+SQLITE_RETRY_DELAY = 0.005
+
+LOCK_WAIT_SQL = (
+    "SELECT COALESCE(SUM(wait_time_ms), 0) FROM sys.dm_exec_session_wait_stats"
+    " WHERE session_id = @@SPID AND wait_type LIKE 'LCK[_]M[_]%'"
+)
+ACTIVE_YEAR_SQL = {
+    "sqlserver": "SELECT TOP 1 Year, Status FROM SurveyYear WHERE Status = 2 ORDER BY Year DESC",
+    "sqlite": "SELECT Year, Status FROM SurveyYear WHERE Status = 2 ORDER BY Year DESC LIMIT 1",
+}
+STATUS_SQL = (
+    "SELECT Id, IsCompleted FROM UserSurveyStatuses"
+    " WHERE UserId = ? AND SurveyYear = ? AND CommunityKey = ?"
+)
+
+
+class SurveyLocked(Exception):
+    """The user's survey was already submitted; the app refuses the save."""
+
+
+def _now(db_type):
+    now = datetime.now()
+    return now.isoformat(sep=" ") if db_type == "sqlite" else now
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def load_virtual_users(cur, db_type, year, limit):
+    """Return up to limit (user_id, sam, community_key) rows that have not completed year."""
+    top, tail = ("TOP (?) ", "") if db_type == "sqlserver" else ("", " LIMIT ?")
+    sql = (
+        f"SELECT {top}u.Id, u.SAMAccountName, c.CommunityKey"
+        " FROM Users u INNER JOIN Community c ON c.UserId = u.Id"
+        " LEFT JOIN UserSurveyStatuses s ON s.UserId = u.Id AND s.SurveyYear = ?"
+        " AND s.CommunityKey = c.CommunityKey"
+        " WHERE s.IsCompleted IS NULL OR s.IsCompleted = 0"
+        f" ORDER BY u.Id{tail}"
+    )
+    params = (limit, year) if db_type == "sqlserver" else (year, limit)
+    cur.execute(sql, params)
+    return [tuple(row) for row in cur.fetchall()]
+
+
+def _is_sqlite_busy(error):
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+class SurveyClient:
+    """One thread's connection, running SurveyService's statements.
+
+    SQLite allows one writer at a time, so on SQLite every operation runs in a
+    BEGIN IMMEDIATE transaction. Taking the write lock up front, rather than
+    upgrading a read lock halfway through, keeps concurrent clients from
+    rolling each other back forever. The time spent waiting for BEGIN
+    IMMEDIATE and COMMIT is the operation's lock wait. Reads use fetchall so
+    no half-read statement keeps a shared lock open after the commit.
+    """
+
+    def __init__(self, db_type, db_target, has_audit_log):
+        self.db_type = db_type
+        self.has_audit_log = has_audit_log
+        # shared=True only so the main thread can close it when the run ends.
+        self.conn = get_connection(db_type, db_target, shared=True)
+        self.cur = self.conn.cursor()
+        if db_type == "sqlite":
+            self.cur.execute("PRAGMA busy_timeout = 0")
+        self.measure_lock_waits = db_type == "sqlserver"
+        self._started = 0.0
+        self._waited = 0.0
+
+    def lock_wait_ms(self):
+        if not self.measure_lock_waits:
+            return 0
+        try:
+            self.cur.execute(LOCK_WAIT_SQL)
+            value = self.cur.fetchall()[0][0]
+            self.conn.commit()
+            return value
+        except Exception:
+            # Older servers lack the DMV; report zeros rather than failing.
+            self.conn.rollback()
+            self.measure_lock_waits = False
+            return 0
+
+    def _wait_for_lock(self, statement):
+        """Run statement, retrying while SQLite reports the database locked."""
+        while True:
+            try:
+                return statement()
+            except sqlite3.OperationalError as e:
+                if not _is_sqlite_busy(e):
+                    raise
+                if time.perf_counter() - self._started > SQLITE_LOCK_TIMEOUT:
+                    raise
+                delay = SQLITE_RETRY_DELAY * random.uniform(0.5, 1.5)
+                time.sleep(delay)
+                self._waited += delay
+
+    def _begin(self):
+        if self.db_type == "sqlite":
+            self._wait_for_lock(lambda: self.cur.execute("BEGIN IMMEDIATE"))
+
+    def _commit(self):
+        self._wait_for_lock(self.conn.commit)
+
+    def _first(self, sql, params=()):
+        self.cur.execute(sql, params)
+        rows = self.cur.fetchall()
+        return rows[0] if rows else None
+
+    def _active_year(self):
+        row = self._first(ACTIVE_YEAR_SQL[self.db_type])
+        if not row:
+            raise RuntimeError("No active survey year (SurveyYear.Status = 2).")
+        return row[0]
+
+    def _save(self, user, answers):
+        user_id, sam, community_key = user
+        cur = self.cur
+        self._begin()
+        year = self._active_year()
+
+        status = self._first(STATUS_SQL, (user_id, year, community_key))
+        if status and status[1]:
+            raise SurveyLocked()
+
+        cur.execute(
+            "SELECT Id, QuestionId, Answer FROM Responses"
+            " WHERE UserId = ? AND SurveyYear = ? AND CommunityKey = ?",
+            (user_id, year, community_key),
+        )
+        existing = {
+            question_id: (response_id, answer)
+            for response_id, question_id, answer in cur.fetchall()
+        }
+
+        now = _now(self.db_type)
+        updates, inserts, audits = [], [], []
+        for question_id, answer in answers.items():
+            # SurveyService looks every question up on its own.
+            if not self._first(
+                "SELECT Id FROM Questions WHERE Id = ? AND SurveyYear = ?", (question_id, year)
+            ):
+                continue
+            if question_id in existing:
+                response_id, old_answer = existing[question_id]
+                if old_answer != answer:
+                    audits.append((response_id, question_id, user_id, sam, old_answer, answer, now))
+                updates.append((answer, now, sam, community_key, response_id))
+            else:
+                inserts.append((user_id, year, question_id, answer, sam, community_key, now))
+
+        if audits and self.has_audit_log:
+            cur.executemany(
+                "INSERT INTO ResponseAuditLogs"
+                " (ResponseId, QuestionId, UserId, SAMAccountName, OldAnswer, NewAnswer, ChangedAt)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                audits,
+            )
+        if updates:
+            cur.executemany(
+                "UPDATE Responses SET Answer = ?, Modified = ?, SAMaccountName = ?, CommunityKey = ?"
+                " WHERE Id = ?",
+                updates,
+            )
+        if inserts:
+            cur.executemany(
+                "INSERT INTO Responses"
+                " (UserId, SurveyYear, QuestionId, Answer, SAMaccountName, CommunityKey, CreateDate)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                inserts,
+            )
+        self._commit()
+
+    def _complete(self, user):
+        user_id, _, community_key = user
+        self._begin()
+        year = self._active_year()
+        total = self._first("SELECT COUNT(*) FROM Questions WHERE SurveyYear = ?", (year,))[0]
+        answered = self._first(
+            "SELECT COUNT(DISTINCT QuestionId) FROM Responses"
+            " WHERE UserId = ? AND SurveyYear = ? AND CommunityKey = ?"
+            " AND LTRIM(RTRIM(Answer)) <> ''",
+            (user_id, year, community_key),
+        )[0]
+        if not total or answered < total:
+            self._commit()
+            return False
+
+        # GetOrCreateUserSurveyStatusAsync saves a new row before updating it.
+        status = self._first(STATUS_SQL, (user_id, year, community_key))
+        if status is None:
+            self.cur.execute(
+                "INSERT INTO UserSurveyStatuses"
+                " (UserId, SurveyYear, CommunityKey, IsCompleted, UpdatedAt)"
+                " VALUES (?, ?, ?, 0, ?)",
+                (user_id, year, community_key, _now(self.db_type)),
+            )
+            self._commit()
+            self._begin()
+            status = self._first(STATUS_SQL, (user_id, year, community_key))
+        self.cur.execute(
+            "UPDATE UserSurveyStatuses SET IsCompleted = 1, UpdatedAt = ? WHERE Id = ?",
+            (_now(self.db_type), status[0]),
+        )
+        self._commit()
+        return True
+
+    def run(self, operation, user, answers):
+        """Run one operation; return (seconds, lock_wait_ms, outcome)."""
+        self._started = time.perf_counter()
+        self._waited = 0.0
+        outcome = "ok"
+        try:
+            self._save(user, answers)
+            if operation == "complete":
+                self._complete(user)
+        except SurveyLocked:
+            self.conn.rollback()
+            outcome = "locked"
+        except Exception as e:
+            self.conn.rollback()
+            if _is_sqlite_busy(e):
+                outcome = "lock_timeout"
+            elif e.args and e.args[0] == "40001":
+                outcome = "deadlock"
+            else:
+                raise
+        return time.perf_counter() - self._started, self._waited * 1000, outcome
+
+    def close(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+def plan_user_session(rng, question_ids, saves_per_user, autosave_ratio, complete_rate):
+    """Return [(operation, {question_id: answer}), ...] for one virtual user."""
+    remaining = list(question_ids)
+    rng.shuffle(remaining)
+    answers = {}
+    steps = []
+    for _ in range(rng.randint(1, max(1, 2 * saves_per_user))):
+        operation = "autosave" if rng.random() < autosave_ratio else "save"
+        if operation == "autosave":
+            count = rng.randint(1, 3)
+        else:
+            count = max(1, len(question_ids) // (saves_per_user + 1))
+        for question_id in remaining[:count]:
+            answers[question_id] = rng.choice(ANSWER_CHOICES)
+        del remaining[:count]
+        for question_id in rng.sample(sorted(answers), min(len(answers), rng.randint(0, 2))):
+            answers[question_id] = rng.choice(ANSWER_CHOICES)
+        steps.append((operation, dict(answers)))
+
+    if rng.random() < complete_rate:
+        for question_id in remaining:
+            answers[question_id] = rng.choice(ANSWER_CHOICES)
+        steps.append(("complete", dict(answers)))
+    return steps
+
+
+def summarize(samples, elapsed):
+    """Turn {operation: [(seconds, lock_wait_ms, outcome)]} into the report rows."""
+    report = {}
+    for operation in OPERATIONS:
+        runs = samples.get(operation, [])
+        if not runs:
+            continue
+        latencies = sorted(seconds * 1000 for seconds, _, _ in runs)
+        waits = sorted(wait for _, wait, _ in runs)
+        outcomes = [outcome for _, _, outcome in runs]
+        report[operation] = {
+            "count": len(runs),
+            "per_sec": round(len(runs) / elapsed, 1) if elapsed else None,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2),
+            "deadlocks": outcomes.count("deadlock"),
+            "lock_timeouts": outcomes.count("lock_timeout"),
+            "locked_surveys": outcomes.count("locked"),
+            "lock_waits": sum(1 for wait in waits if wait > 0),
+            "lock_wait_ms": round(sum(waits), 1),
+            "lock_wait_p95_ms": round(percentile(waits, 95), 2),
+        }
+    return report
+
+
+def run_load_simulation(
+    db_type,
+    db_target,
+    users=1000,
+    concurrency=16,
+    saves_per_user=3,
+    autosave_ratio=0.5,
+    complete_rate=0.8,
+    think_time=0.0,
+    seed=0,
+    progress=None,
+):
+    """
+    Replay survey sessions for up to `users` virtual users, `concurrency` at a time.
+
+    think_time is the mean pause in seconds between a user's operations (0
+    hammers the database as hard as possible). Returns a JSON-serializable
+    dict with the parameters, the elapsed time and a per-operation report.
+    """
+    with closing(get_connection(db_type, db_target)) as conn:
+        cur = conn.cursor()
+        cur.execute(ACTIVE_YEAR_SQL[db_type])
+        row = cur.fetchone()
+        if not row:
+            raise RuntimeError("No active survey year (SurveyYear.Status = 2).")
+        year = row[0]
+        cur.execute("SELECT Id FROM Questions WHERE SurveyYear = ? ORDER BY Id", (year,))
+        question_ids = [r[0] for r in cur.fetchall()]
+        virtual_users = load_virtual_users(cur, db_type, year, users)
+        has_audit_log = table_exists(cur, db_type, "ResponseAuditLogs")
+    if not question_ids:
+        raise RuntimeError(f"No questions found for survey year {year}.")
+    if not virtual_users:
+        raise RuntimeError(
+            "No users with a Community row that still have an open survey;"
+            " load a dataset first (python -m flourish_tools generate)."
+        )
+
+    local = threading.local()
+    clients = []
+    lock = threading.Lock()
+    samples = {operation: [] for operation in OPERATIONS}
+    finished = [0]
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = SurveyClient(db_type, db_target, has_audit_log)
+            with lock:
+                clients.append(local.client)
+        return local.client
+
+    def session(user):
+        rng = random.Random(f"{seed}:{user[0]}")
+        steps = plan_user_session(rng, question_ids, saves_per_user, autosave_ratio, complete_rate)
+        survey = client()
+        for operation, answers in steps:
+            if think_time:
+                time.sleep(rng.expovariate(1 / think_time))
+            before = survey.lock_wait_ms()
+            seconds, waited, outcome = survey.run(operation, user, answers)
+            if db_type == "sqlserver":
+                waited = survey.lock_wait_ms() - before
+            with lock:
+                samples[operation].append((seconds, waited, outcome))
+        with lock:
+            finished[0] += 1
+            if progress and finished[0] % 100 == 0:
+                progress(finished[0], len(virtual_users))
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(session, virtual_users))
+    finally:
+        for c in clients:
+            c.close()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "created_at": datetime.now().isoformat(),
+        "db_type": db_type,
+        "survey_year": year,
+        "questions": len(question_ids),
+        "params": {
+            "users": len(virtual_users),
+            "concurrency": concurrency,
+            "saves_per_user": saves_per_user,
+            "autosave_ratio": autosave_ratio,
+            "complete_rate": complete_rate,
+            "think_time": think_time,
+            "seed": seed,
+        },
+        "seconds": round(elapsed, 3),
+        "operations": summarize(samples, elapsed),
+    }
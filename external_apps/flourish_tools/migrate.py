@@ -0,0 +1,619 @@
+"""Plan and run a batch of column, default and index changes as one migration.
+
+modcolumns.py ran one hand-typed ALTER TABLE per click on its own connection
+and only worked on SQLite. This module reads a JSON list of changes and plans
+them for the target dialect:
+
+    [
+        {"op": "add_column", "table": "Users", "column": "Nickname",
+         "type": "NVARCHAR(100)", "nullable": true},
+        {"op": "set_default", "table": "Responses", "column": "Answer", "default": "''"},
+        {"op": "alter_column", "table": "Users", "column": "FullName",
+         "type": "NVARCHAR(512)", "nullable": false},
+        {"op": "drop_default", "table": "Users", "column": "SAMAccountName"},
+        {"op": "drop_column", "table": "Users", "column": "Nickname"},
+        {"op": "create_index", "table": "Responses", "name": "IX_Responses_UserId_SurveyYear",
+         "columns": ["UserId", "SurveyYear"], "include": ["Answer"], "unique": false},
+        {"op": "drop_index", "table": "Responses", "name": "IX_Responses_UserId"}
+    ]
+
+"include" becomes an INCLUDE clause on SQL Server. SQLite has no INCLUDE, so
+there the included columns are appended to the index key instead, which
+covers the same queries.
+
+Changes that only touch metadata are grouped into one short transaction, so
+the schema-modification lock on each table is taken once. Heavier work gets a
+step of its own:
+
+    SQL Server  create_index and alter_column run on their own, WITH (ONLINE = ON)
+                when the edition supports it (Enterprise, Developer, Azure), so
+                readers and writers keep going while the index builds. A
+                session LOCK_TIMEOUT bounds how long any step waits for a lock.
+    SQLite      drop_column, alter_column and the default changes rebuild the
+                table (create a copy, copy rows, drop, rename, recreate
+                indexes). All of a table's rebuild changes share one rebuild.
+
+Changes that are already applied (the column exists, the index is gone, ...)
+are skipped, so a migration file can be rerun. Every step records its elapsed
+time, how long it held its locks, and how long it waited for them.
+
+    python -m flourish_tools migrate changes.json            # print the plan
+    python -m flourish_tools migrate changes.json --apply    # run it
+"""
+import json
+import time
+from contextlib import closing
+
+from .db import get_connection, qualified_name, quote_ident
+from .schema import get_schema_snapshot
+
+CHANGE_OPS = (
+    "add_column",
+    "drop_column",
+    "alter_column",
+    "set_default",
+    "drop_default",
+    "create_index",
+    "drop_index",
+)
+REBUILD_OPS = ("drop_column", "alter_column", "set_default", "drop_default")
+LOCK_TIMEOUT_MS = 10_000
+
+# SERVERPROPERTY('EngineEdition'): 3 = Enterprise/Developer, 5 = Azure SQL
+# Database, 8 = Azure SQL Managed Instance. Only these build indexes online.
+ONLINE_EDITIONS = (3, 5, 8)
+
+# Drops a column's default constraint, whatever it was named.
+DROP_DEFAULT_SQL = """
+DECLARE @name sysname = (
+    SELECT dc.name FROM sys.default_constraints dc
+    INNER JOIN sys.columns c
+        ON c.object_id = dc.parent_object_id AND c.column_id = dc.parent_column_id
+    WHERE dc.parent_object_id = OBJECT_ID(N'{table}') AND c.name = N'{column}'
+);
+IF @name IS NOT NULL EXEC (N'ALTER TABLE {table} DROP CONSTRAINT ' + QUOTENAME(@name));
+"""
+
+
+def _require(change, *keys):
+    missing = [key for key in keys if not change.get(key)]
+    if missing:
+        raise ValueError(f"{change.get('op')} change is missing {', '.join(missing)}: {change}")
+
+
+def validate_change(change):
+    op = change.get("op")
+    if op not in CHANGE_OPS:
+        raise ValueError(f"Unknown migration op {op!r}; expected one of {', '.join(CHANGE_OPS)}.")
+    _require(change, "table")
+    if op == "add_column":
+        _require(change, "column", "type")
+    elif op == "alter_column":
+        _require(change, "column", "type")
+    elif op == "set_default":
+        _require(change, "column", "default")
+    elif op in ("drop_column", "drop_default"):
+        _require(change, "column")
+    elif op == "create_index":
+        _require(change, "name", "columns")
+    elif op == "drop_index":
+        _require(change, "name")
+    return change
+
+
+def load_changes(path):
+    """Read a JSON list of changes (or {"changes": [...]}) and validate it."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("changes", [])
+    return [validate_change(change) for change in data]
+
+
+def describe_change(change):
+    op, table = change["op"], change["table"]
+    if op == "add_column":
+        null = "NULL" if change.get("nullable", True) else "NOT NULL"
+        default = f" DEFAULT {change['default']}" if change.get("default") else ""
+        return f"add column {table}.{change['column']} {change['type']} {null}{default}"
+    if op == "alter_column":
+        null = "NULL" if change.get("nullable", True) else "NOT NULL"
+        return f"alter column {table}.{change['column']} to {change['type']} {null}"
+    if op == "set_default":
+        return f"set default {table}.{change['column']} = {change['default']}"
+    if op in ("drop_column", "drop_default"):
+        return f"{op.replace('_', ' ')} {table}.{change['column']}"
+    if op == "create_index":
+        unique = "unique " if change.get("unique") else ""
+        include = f" include ({', '.join(change['include'])})" if change.get("include") else ""
+        return (
+            f"create {unique}index {change['name']} on {table}"
+            f" ({', '.join(change['columns'])}){include}"
+        )
+    return f"drop index {change['name']} on {table}"
+
+
+class MigrationStep:
+    """One unit of work: a transaction, or a single online statement."""
+
+    def __init__(self, title, changes, statements, transactional=True, online=False):
+        self.title = title
+        self.changes = changes  # descriptions, for the plan
+        self.statements = statements
+        self.transactional = transactional
+        # Online steps only hold Sch-M briefly at the start and end, which a
+        # client cannot time, so their lock_seconds is reported as None.
+        self.online = online
+
+
+class MigrationPlan:
+    def __init__(self, db_type):
+        self.db_type = db_type
+        self.steps = []
+        self.skipped = []  # [(description, reason)]
+        self.notes = []
+
+    def has_writes(self):
+        return bool(self.steps)
+
+    def format(self):
+        lines = [f"Dialect: {self.db_type}"]
+        lines.extend(f"Note: {note}" for note in self.notes)
+        for n, step in enumerate(self.steps, 1):
+            mode = "online" if step.online else ("transaction" if step.transactional else "single")
+            lines.append(f"Step {n}: {step.title} ({mode}, {len(step.statements)} statement(s))")
+            lines.extend(f"  + {change}" for change in step.changes)
+        lines.append(f"Skipped (already applied): {len(self.skipped)}")
+        lines.extend(f"  = {change}: {reason}" for change, reason in self.skipped)
+        return "\n".join(lines)
+
+
+def load_indexes(cur, db_type):
+    """Return {table name casefold: {index name casefold}}."""
+    if db_type == "sqlite":
+        cur.execute("SELECT tbl_name, name FROM sqlite_master WHERE type = 'index'")
+    else:
+        cur.execute(
+            "SELECT t.name, i.name FROM sys.indexes i"
+            " INNER JOIN sys.tables t ON t.object_id = i.object_id"
+            " WHERE i.name IS NOT NULL AND SCHEMA_NAME(t.schema_id) = 'dbo'"
+        )
+    indexes = {}
+    for table_name, index_name in cur.fetchall():
+        indexes.setdefault(table_name.casefold(), set()).add(index_name.casefold())
+    return indexes
+
+
+def skip_reason(change, columns, indexes):
+    """
+    Return why change is already applied, or None.
+
+    columns and indexes map casefolded table names to sets of casefolded
+    names. They are updated as changes are accepted, so a later change can
+    refer to a column or index an earlier one in the same file creates.
+    """
+    op, table = change["op"], change["table"].casefold()
+    if table not in columns:
+        raise ValueError(f"Table {change['table']} does not exist ({describe_change(change)}).")
+    table_columns = columns[table]
+    table_indexes = indexes.setdefault(table, set())
+    column = (change.get("column") or "").casefold()
+    name = (change.get("name") or "").casefold()
+
+    if op == "add_column":
+        if column in table_columns:
+            return "column exists"
+        table_columns.add(column)
+    elif op == "drop_column":
+        if column not in table_columns:
+            return "column does not exist"
+        table_columns.discard(column)
+    elif op in ("alter_column", "set_default", "drop_default"):
+        if column not in table_columns:
+            raise ValueError(f"Column {change['table']}.{change['column']} does not exist.")
+    elif op == "create_index":
+        if name in table_indexes:
+            return "index exists"
+        table_indexes.add(name)
+    elif op == "drop_index":
+        if name not in table_indexes:
+            return "index does not exist"
+        table_indexes.discard(name)
+    return None
+
+
+def _column_sql(change):
+    null = "NULL" if change.get("nullable", True) else "NOT NULL"
+    return f"{quote_ident(change['column'])} {change['type']} {null}"
+
+
+def _index_sql(change, table_sql, with_options=""):
+    unique = "UNIQUE " if change.get("unique") else ""
+    sql = (
+        f"CREATE {unique}INDEX {quote_ident(change['name'])} ON {table_sql}"
+        f" ({', '.join(quote_ident(c) for c in change['columns'])})"
+    )
+    if change.get("include"):
+        sql += f" INCLUDE ({', '.join(quote_ident(c) for c in change['include'])})"
+    if change.get("where"):
+        sql += f" WHERE {change['where']}"
+    return sql + with_options
+
+
+def _fold_include(change):
+    """Return a SQLite create_index change with its include columns as trailing keys."""
+    if change["op"] != "create_index" or not change.get("include"):
+        return change
+    change = dict(change)
+    include = change.pop("include")
+    change["columns"] = list(change["columns"]) + [c for c in include if c not in change["columns"]]
+    return change
+
+
+def plan_sqlserver(plan, changes, online):
+    metadata, metadata_sql = [], []
+    for change in changes:
+        op = change["op"]
+        table = qualified_name("dbo", change["table"])
+        # Dynamic SQL below embeds the names as N'' literals.
+        literal_table = table.replace("'", "''")
+        literal_column = (change.get("column") or "").replace("'", "''")
+        description = describe_change(change)
+
+        if op == "create_index":
+            options = " WITH (ONLINE = ON, SORT_IN_TEMPDB = ON)" if online else " WITH (SORT_IN_TEMPDB = ON)"
+            plan.steps.append(
+                MigrationStep(
+                    f"build index {change['name']}",
+                    [description],
+                    [_index_sql(change, table, options)],
+                    transactional=False,
+                    online=online,
+                )
+            )
+        elif op == "alter_column":
+            sql = f"ALTER TABLE {table} ALTER COLUMN {_column_sql(change)}"
+            plan.steps.append(
+                MigrationStep(
+                    f"alter column {change['table']}.{change['column']}",
+                    [description],
+                    [sql + (" WITH (ONLINE = ON)" if online else "")],
+                    transactional=False,
+                    online=online,
+                )
+            )
+        else:
+            metadata.append(description)
+            if op == "add_column":
+                sql = f"ALTER TABLE {table} ADD {_column_sql(change)}"
+                if change.get("default"):
+                    sql += f" DEFAULT ({change['default']})"
+                metadata_sql.append(sql)
+            elif op == "drop_column":
+                metadata_sql.append(
+                    DROP_DEFAULT_SQL.format(table=literal_table, column=literal_column)
+                )
+                metadata_sql.append(
+                    f"ALTER TABLE {table} DROP COLUMN {quote_ident(change['column'])}"
+                )
+            elif op == "set_default":
+                metadata_sql.append(
+                    DROP_DEFAULT_SQL.format(table=literal_table, column=literal_column)
+                )
+                metadata_sql.append(
+                    f"ALTER TABLE {table} ADD DEFAULT ({change['default']})"
+                    f" FOR {quote_ident(change['column'])}"
+                )
+            elif op == "drop_default":
+                metadata_sql.append(
+                    DROP_DEFAULT_SQL.format(table=literal_table, column=literal_column)
+                )
+            elif op == "drop_index":
+                metadata_sql.append(f"DROP INDEX {quote_ident(change['name'])} ON {table}")
+
+    if metadata:
+        plan.steps.insert(0, MigrationStep("metadata changes", metadata, metadata_sql))
+
+
+def _sqlite_table_columns(cur, table):
+    """Return (name, columns, primary key, foreign keys, indexes) for a SQLite table."""
+    cur.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name = ? COLLATE NOCASE",
+        (table,),
+    )
+    table, create_sql = cur.fetchone()
+    for keyword in ("CHECK", "AUTOINCREMENT", "COLLATE"):
+        if keyword in create_sql.upper():
+            raise ValueError(f"{table} uses {keyword}, which a rebuild would drop.")
+
+    cur.execute(f"PRAGMA table_info({quote_ident(table)})")
+    columns = []
+    primary_key = []
+    for _, name, col_type, notnull, default, pk in cur.fetchall():
+        columns.append(
+            {"column": name, "type": col_type, "nullable": not notnull, "default": default}
+        )
+        if pk:
+            primary_key.append((pk, name))
+    primary_key = [name for _, name in sorted(primary_key)]
+
+    cur.execute(f"PRAGMA foreign_key_list({quote_ident(table)})")
+    foreign_keys = {}
+    for fk_id, _, ref_table, from_col, to_col, on_update, on_delete, _ in cur.fetchall():
+        fk = foreign_keys.setdefault(
+            fk_id, {"table": ref_table, "from": [], "to": [], "update": on_update, "delete": on_delete}
+        )
+        fk["from"].append(from_col)
+        fk["to"].append(to_col)
+
+    cur.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,),
+    )
+    indexes = []
+    for index_name, index_sql in cur.fetchall():
+        cur.execute(f"PRAGMA index_info({quote_ident(index_name)})")
+        indexes.append((index_name, index_sql, {row[2] for row in cur.fetchall()}))
+    return table, columns, primary_key, list(foreign_keys.values()), indexes
+
+
+def plan_sqlite_rebuild(cur, table, changes):
+    """Return the statements that rebuild table with changes applied, and notes."""
+    table, columns, primary_key, foreign_keys, indexes = _sqlite_table_columns(cur, table)
+    by_name = {column["column"].casefold(): column for column in columns}
+    notes = []
+    dropped = set()
+
+    for change in changes:
+        op = change["op"]
+        if op == "add_column":
+            column = {key: change.get(key) for key in ("column", "type", "default")}
+            column["nullable"] = change.get("nullable", True)
+            column["new"] = True  # no data to copy
+            columns.append(column)
+            by_name[column["column"].casefold()] = column
+            continue
+        if op == "create_index":
+            indexes.append(
+                (change["name"], _index_sql(change, quote_ident(table)), set(change["columns"]))
+            )
+            continue
+        if op == "drop_index":
+            indexes = [index for index in indexes if index[0].casefold() != change["name"].casefold()]
+            continue
+
+        column = by_name[change["column"].casefold()]
+        if op == "drop_column":
+            if column["column"] in primary_key or any(
+                column["column"] in fk["from"] for fk in foreign_keys
+            ):
+                raise ValueError(f"Cannot drop {table}.{column['column']}: it is part of a key.")
+            dropped.add(column["column"])
+        elif op == "alter_column":
+            column["type"] = change["type"]
+            column["nullable"] = change.get("nullable", True)
+        elif op == "set_default":
+            column["default"] = change["default"]
+        elif op == "drop_default":
+            column["default"] = None
+
+    kept = [column for column in columns if column["column"] not in dropped]
+    definitions = []
+    for column in kept:
+        sql = _column_sql(column)
+        if column["default"] is not None:
+            sql += f" DEFAULT ({column['default']})"
+        definitions.append(sql)
+    if primary_key:
+        definitions.append(f"PRIMARY KEY ({', '.join(quote_ident(c) for c in primary_key)})")
+    for fk in foreign_keys:
+        sql = (
+            f"FOREIGN KEY ({', '.join(quote_ident(c) for c in fk['from'])})"
+            f" REFERENCES {quote_ident(fk['table'])} ({', '.join(quote_ident(c) for c in fk['to'])})"
+        )
+        for action, value in (("UPDATE", fk["update"]), ("DELETE", fk["delete"])):
+            if value and value.upper() != "NO ACTION":
+                sql += f" ON {action} {value}"
+        definitions.append(sql)
+
+    new_table = f"_migrate_new_{table}"
+    names = ", ".join(quote_ident(column["column"]) for column in kept if not column.get("new"))
+    statements = [
+        f"CREATE TABLE {quote_ident(new_table)} (\n    " + ",\n    ".join(definitions) + "\n)",
+        f"INSERT INTO {quote_ident(new_table)} ({names}) SELECT {names} FROM {quote_ident(table)}",
+        f"DROP TABLE {quote_ident(table)}",
+        f"ALTER TABLE {quote_ident(new_table)} RENAME TO {quote_ident(table)}",
+    ]
+    for index_name, index_sql, index_columns in indexes:
+        if index_columns & dropped:
+            notes.append(f"index {index_name} is dropped with column(s) {', '.join(sorted(index_columns & dropped))}")
+        else:
+            statements.append(index_sql)
+    return statements, notes
+
+
+def plan_sqlite(plan, cur, changes):
+    metadata, metadata_sql = [], []
+    # A table that needs a rebuild takes all of its changes into that rebuild,
+    # which recreates its indexes from what it read at plan time.
+    rebuilt = {change["table"].casefold() for change in changes if change["op"] in REBUILD_OPS}
+    rebuilds = {}  # {table: [changes]}, in first-seen order
+    for change in changes:
+        op = change["op"]
+        table = quote_ident(change["table"])
+        if op == "add_column" and not change.get("nullable", True) and not change.get("default"):
+            raise ValueError(
+                f"SQLite cannot add NOT NULL column {change['table']}.{change['column']}"
+                " without a default."
+            )
+        if change["table"].casefold() in rebuilt:
+            rebuilds.setdefault(change["table"], []).append(change)
+            continue
+
+        metadata.append(describe_change(change))
+        if op == "add_column":
+            sql = f"ALTER TABLE {table} ADD COLUMN {_column_sql(change)}"
+            if change.get("default"):
+                sql += f" DEFAULT ({change['default']})"
+            metadata_sql.append(sql)
+        elif op == "create_index":
+            metadata_sql.append(_index_sql(change, table))
+        elif op == "drop_index":
+            metadata_sql.append(f"DROP INDEX {quote_ident(change['name'])}")
+
+    if metadata:
+        plan.steps.append(MigrationStep("metadata changes", metadata, metadata_sql))
+    for table, table_changes in rebuilds.items():
+        statements, notes = plan_sqlite_rebuild(cur, table, table_changes)
+        plan.notes.extend(notes)
+        plan.steps.append(
+            MigrationStep(
+                f"rebuild {table}", [describe_change(c) for c in table_changes], statements
+            )
+        )
+
+
+def supports_online_index(cur):
+    cur.execute("SELECT CAST(SERVERPROPERTY('EngineEdition') AS INT)")
+    row = cur.fetchone()
+    return bool(row) and row[0] in ONLINE_EDITIONS
+
+
+def build_migration_plan(changes, db_type, db_target, online=None):
+    """
+    Plan changes for the target. online=None uses ONLINE = ON on SQL Server
+    when the edition supports it; SQLite has no online operations.
+    """
+    changes = [validate_change(dict(change)) for change in changes]
+    if db_type == "sqlite":
+        changes = [_fold_include(change) for change in changes]
+    plan = MigrationPlan(db_type)
+    with closing(get_connection(db_type, db_target)) as conn:
+        cur = conn.cursor()
+        # The schema is about to change, so skip the on-disk snapshot cache.
+        schema = get_schema_snapshot(cur, db_type, cache_path=False)
+        columns = {
+            table.casefold(): {column.casefold() for column in table_columns}
+            for table, table_columns in schema.tables.items()
+        }
+        indexes = load_indexes(cur, db_type)
+
+        pending = []
+        for change in changes:
+            reason = skip_reason(change, columns, indexes)
+            if reason:
+                plan.skipped.append((describe_change(change), reason))
+            else:
+                pending.append(change)
+
+        if db_type == "sqlserver":
+            if online is None:
+                online = supports_online_index(cur)
+                if not online:
+                    plan.notes.append(
+                        "this edition cannot build indexes online; index builds block writes"
+                    )
+            plan_sqlserver(plan, pending, online)
+        elif db_type == "sqlite":
+            plan_sqlite(plan, cur, pending)
+        else:
+            raise ValueError(f"Unsupported database type: {db_type}")
+    return plan
+
+
+def _run_step_sqlserver(conn, step):
+    from .loadsim import LOCK_WAIT_SQL
+
+    cur = conn.cursor()
+
+    def lock_wait_ms():
+        try:
+            cur.execute(LOCK_WAIT_SQL)
+            return cur.fetchone()[0]
+        except Exception:
+            return None
+
+    conn.autocommit = True
+    waited_before = lock_wait_ms()
+    conn.autocommit = not step.transactional
+    started = time.perf_counter()
+    try:
+        for sql in step.statements:
+            cur.execute(sql)
+        if step.transactional:
+            conn.commit()
+    except Exception:
+        if step.transactional:
+            conn.rollback()
+        raise
+    finally:
+        conn.autocommit = True
+    seconds = time.perf_counter() - started
+    waited_after = lock_wait_ms()
+    waited = (
+        waited_after - waited_before
+        if waited_before is not None and waited_after is not None
+        else None
+    )
+    return seconds, waited
+
+
+def _run_step_sqlite(conn, step):
+    cur = conn.cursor()
+    started = time.perf_counter()
+    cur.execute("BEGIN IMMEDIATE")  # waits up to the connection's busy timeout
+    locked = time.perf_counter()
+    try:
+        for sql in step.statements:
+            cur.execute(sql)
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    return time.perf_counter() - started, (locked - started) * 1000
+
+
+def apply_migration_plan(plan, db_type, db_target, lock_timeout_ms=LOCK_TIMEOUT_MS, progress=None):
+    """
+    Run every step in order, stopping at the first failure.
+
+    Returns one dict per step that ran: {"step", "changes", "seconds",
+    "lock_seconds", "lock_wait_ms", "error"}. A failed transactional step is
+    rolled back; earlier steps stay applied.
+    """
+    results = []
+    with closing(get_connection(db_type, db_target)) as conn:
+        if db_type == "sqlserver":
+            conn.autocommit = True
+            conn.cursor().execute(f"SET LOCK_TIMEOUT {int(lock_timeout_ms)}")
+            run_step = _run_step_sqlserver
+        else:
+            conn.isolation_level = None  # BEGIN/COMMIT are issued explicitly
+            conn.execute(f"PRAGMA busy_timeout = {int(lock_timeout_ms)}")
+            run_step = _run_step_sqlite
+
+        for step in plan.steps:
+            result = {
+                "step": step.title,
+                "changes": step.changes,
+                "seconds": None,
+                "lock_seconds": None,
+                "lock_wait_ms": None,
+                "error": None,
+            }
+            results.append(result)
+            started = time.perf_counter()
+            try:
+                seconds, waited = run_step(conn, step)
+            except Exception as e:
+                result["seconds"] = round(time.perf_counter() - started, 4)
+                result["error"] = str(e)
+                break
+            result["seconds"] = round(seconds, 4)
+            result["lock_wait_ms"] = None if waited is None else round(waited, 1)
+            if not step.online:
+                held = seconds - (waited or 0) / 1000
+                result["lock_seconds"] = round(max(held, 0.0), 4)
+            if progress:
+                progress(result)
+    return results
@@ -0,0 +1,128 @@
+"""Memory-bounded LRU cache of browser pages, with optional change detection.
+
+Clicking back and forth between Sections, Questions and Users reloads the
+same first pages over and over. PageCache keeps recent TablePage results
+keyed by target, table, filters, sort, page size and keyset bound, and drops
+the least recently used ones once their ColumnBuffers, string and bytes
+values included, exceed max_bytes.
+
+The browser invalidates a table's pages whenever it writes to that table.
+Writes made by anyone else are only noticed with a change check. A change
+check is a small query whose result changes when the table does, and it runs
+before a cached page is reused:
+
+    "checksum"      SQL Server: CHECKSUM_AGG(BINARY_CHECKSUM(*)) and COUNT_BIG(*).
+                    This still scans the table, but only two numbers cross
+                    the network instead of a page of rows.
+                    SQLite: PRAGMA data_version, which changes whenever
+                    another connection commits to the database file.
+    "max:<column>"  MAX(column) and COUNT(*), for tables with an indexed
+                    Modified/Id column that every write bumps.
+"""
+import threading
+from collections import OrderedDict
+
+from .db import qualified_name, quote_ident
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def page_cache_key(
+    db_type, db_target, schema_name, table_name, sort, filters, page_size, after, before
+):
+    """Build a hashable cache key from everything that determines a page's rows."""
+    return (
+        db_type,
+        db_target,
+        schema_name,
+        table_name,
+        tuple(sort or ()),
+        tuple(sorted((filters or {}).items())),
+        page_size,
+        tuple(after.items()) if after is not None else None,
+        tuple(before.items()) if before is not None else None,
+    )
+
+
+def table_version(cursor, db_type, schema_name, table_name, change_check):
+    """Run a change check and return a value that differs once the table changed."""
+    table_sql = qualified_name(schema_name, table_name)
+    if change_check == "checksum":
+        if db_type == "sqlite":
+            cursor.execute("PRAGMA data_version")
+        else:
+            cursor.execute(
+                f"SELECT CHECKSUM_AGG(BINARY_CHECKSUM(*)), COUNT_BIG(*) FROM {table_sql}"
+            )
+    elif change_check.startswith("max:"):
+        column = change_check[len("max:"):]
+        cursor.execute(f"SELECT MAX({quote_ident(column)}), COUNT(*) FROM {table_sql}")
+    else:
+        raise ValueError(f"Unknown change check: {change_check}")
+    # fetchall, not fetchone: this is the shared statement-cache cursor, and an
+    # open result set would make the next statement on a non-MARS connection
+    # fail with "Connection is busy with results for another command".
+    rows = cursor.fetchall()
+    return tuple(rows[0])
+
+
+class PageCache:
+    """Thread-safe LRU of TablePage results, bounded by the bytes their buffers hold."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "invalidations": 0}
+        self._entries = OrderedDict()  # {key: (page, version, nbytes)}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version=None):
+        """Return the cached page for key, or None if missing or its version differs."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            page, cached_version, _ = entry
+            if version is not None and version != cached_version:
+                self.stats["stale"] += 1
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return page
+
+    def put(self, key, page, version=None):
+        # Counted once here, with the string payloads, and kept with the entry.
+        nbytes = page.rows.nbytes()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                return  # Would evict everything else and still not fit.
+            self._entries[key] = (page, version, nbytes)
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def _remove(self, key):
+        _, _, nbytes = self._entries.pop(key)
+        self.size -= nbytes
+
+    def invalidate(self, db_type, db_target, schema_name, table_name):
+        """Drop every cached page of one table, e.g. after writing to it."""
+        with self._lock:
+            table = (db_type, db_target, schema_name, table_name)
+            stale = [key for key in self._entries if key[:4] == table]
+            for key in stale:
+                self._remove(key)
+            self.stats["invalidations"] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
@@ -0,0 +1,343 @@
+"""Diff a questions CSV against the active survey year and apply only the delta.
+
+build_import_plan reads the CSV and the active year's Sections/Questions tree
+(one query per table) and fingerprints every question by (section path,
+normalized question text). The resulting ImportPlan lists exactly what is new, missing or
+possibly renamed. apply_import_plan then writes only that delta, so re-importing an
+unchanged CSV costs one read pass and no writes.
+
+A possible rename is only a text-similarity guess ("...for residents?" vs
+"...for staff?" pair up just as well as a reworded question), and applying
+one moves the old question's Responses to the new text. So renames are
+applied only with apply_renames=True (--apply-renames); otherwise the new text
+is inserted as a new question and the old one is left as missing.
+
+Missing sections and questions are reported but never deleted: deleting a
+question cascades to its Responses.
+"""
+import difflib
+import hashlib
+from contextlib import closing
+
+from .db import get_connection
+from .importer import (
+    get_import_context,
+    insert_sections_bulk,
+    load_section_index,
+    new_import_stats,
+    normalize_question_text,
+    read_csv_entries,
+    section_name_key,
+)
+
+# Minimum difflib ratio for a missing/new question pair in the same section
+# to be reported as a rename instead of a delete plus an insert.
+RENAME_SIMILARITY = 0.6
+
+
+def section_path(section_name, subsection_name=""):
+    return (section_name, subsection_name) if subsection_name else (section_name,)
+
+
+def path_key(path, db_type=None):
+    """Return the key a section path is matched on (see importer.section_name_key)."""
+    return tuple(section_name_key(name, db_type) for name in path)
+
+
+def format_path(path):
+    return " > ".join(path)
+
+
+def question_fingerprint(path, text, db_type=None):
+    """Hash of (section path key, normalized text), so case/whitespace edits are not changes."""
+    key = "\x1f".join(path_key(path, db_type) + (normalize_question_text(text),))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def load_survey_tree(cur, survey_entity_id, sections_have_survey_entity, db_type=None):
+    """Return ({path key: (section_id, path)}, {fingerprint: (question_id, path, text)})."""
+    if sections_have_survey_entity:
+        cur.execute(
+            "SELECT Id, Name, ParentSectionId FROM Sections WHERE SurveyYear = ? ORDER BY Id",
+            (survey_entity_id,),
+        )
+    else:
+        cur.execute("SELECT Id, Name, ParentSectionId FROM Sections ORDER BY Id")
+    section_rows = cur.fetchall()
+
+    names = {section_id: name for section_id, name, _ in section_rows}
+    id_paths = {}
+    for section_id, name, parent_section_id in section_rows:
+        if parent_section_id is None:
+            id_paths[section_id] = (name,)
+        elif parent_section_id in names:
+            id_paths[section_id] = (names[parent_section_id], name)
+
+    sections = {}
+    for section_id, path in id_paths.items():
+        sections.setdefault(path_key(path, db_type), (section_id, path))
+
+    if sections_have_survey_entity:
+        cur.execute(
+            "SELECT q.Id, q.SectionId, q.Text FROM Questions q"
+            " INNER JOIN Sections s ON s.Id = q.SectionId WHERE s.SurveyYear = ?"
+            " ORDER BY q.Id",
+            (survey_entity_id,),
+        )
+    else:
+        cur.execute("SELECT Id, SectionId, Text FROM Questions ORDER BY Id")
+
+    questions = {}
+    for question_id, section_id, text in cur.fetchall():
+        path = id_paths.get(section_id)
+        if path is None:
+            continue
+        questions.setdefault(
+            question_fingerprint(path, text, db_type), (question_id, path, text)
+        )
+
+    return sections, questions
+
+
+class ImportPlan:
+    """The delta between a CSV and the active survey year."""
+
+    def __init__(self, survey_entity_id, stats):
+        self.survey_entity_id = survey_entity_id
+        self.stats = stats  # CSV parse stats (skipped rows)
+        self.new_sections = []  # [path]
+        self.missing_sections = []  # [(section_id, path)]
+        self.new_questions = []  # [(path, text)]
+        self.missing_questions = []  # [(question_id, path, text)]
+        self.renamed_questions = []  # possible renames: [(question_id, path, old_text, new_text)]
+        self.unchanged_questions = 0
+
+    def has_writes(self):
+        return bool(self.new_sections or self.new_questions or self.renamed_questions)
+
+    def format(self):
+        lines = [f"Survey year: {self.survey_entity_id}"]
+
+        def section(title, items):
+            lines.append(f"{title}: {len(items)}")
+            lines.extend(f"  {item}" for item in items)
+
+        section("New sections", [f"+ {format_path(p)}" for p in self.new_sections])
+        section(
+            "Missing sections (not deleted)",
+            [f"- {format_path(p)}" for _, p in self.missing_sections],
+        )
+        section(
+            "New questions",
+            [f"+ [{format_path(p)}] {text}" for p, text in self.new_questions],
+        )
+        section(
+            "Missing questions (not deleted)",
+            [f"- [{format_path(p)}] {text}" for _, p, text in self.missing_questions],
+        )
+        section(
+            "Possible renames (applied only with --apply-renames)",
+            [
+                f"~ [{format_path(p)}] {old} -> {new}"
+                for _, p, old, new in self.renamed_questions
+            ],
+        )
+        lines.append(f"Unchanged questions: {self.unchanged_questions}")
+        lines.append(f"Duplicate questions in CSV: {self.stats['duplicate_questions']}")
+        lines.append(f"Rows skipped: {self.stats['skipped']}")
+        return "\n".join(lines)
+
+
+def _pair_renames(missing, new):
+    """Greedily pair missing/new texts in one section by similarity.
+
+    Returns (pairs, unpaired_missing, unpaired_new).
+    """
+    candidates = []
+    for i, (_, _, old_text) in enumerate(missing):
+        for j, (_, new_text) in enumerate(new):
+            ratio = difflib.SequenceMatcher(None, old_text, new_text).ratio()
+            if ratio >= RENAME_SIMILARITY:
+                candidates.append((ratio, i, j))
+
+    pairs = []
+    used_missing, used_new = set(), set()
+    for _, i, j in sorted(candidates, reverse=True):
+        if i in used_missing or j in used_new:
+            continue
+        used_missing.add(i)
+        used_new.add(j)
+        pairs.append((missing[i], new[j]))
+
+    return (
+        pairs,
+        [m for i, m in enumerate(missing) if i not in used_missing],
+        [n for j, n in enumerate(new) if j not in used_new],
+    )
+
+
+def diff_entries(entries, sections, questions, plan, db_type=None):
+    """Fill plan with the delta between parsed CSV entries and the db tree.
+
+    Section paths are matched on path_key, so on SQL Server a CSV section that
+    differs from an existing one only in case or trailing spaces reuses it,
+    as the row-by-row and bulk imports do.
+    """
+    csv_paths = {}  # {path key: path as first spelled in the CSV}
+    csv_questions = {}
+    for section_name, subsection_name, question_text in entries:
+        for path in (
+            section_path(section_name),
+            section_path(section_name, subsection_name),
+        ):
+            csv_paths.setdefault(path_key(path, db_type), path)
+        if question_text:
+            path = csv_paths[path_key(section_path(section_name, subsection_name), db_type)]
+            fingerprint = question_fingerprint(path, question_text, db_type)
+            if fingerprint in csv_questions:
+                plan.stats["duplicate_questions"] += 1
+            else:
+                csv_questions[fingerprint] = (path, question_text)
+        else:
+            plan.stats["skipped"] += 1
+
+    plan.new_sections = [path for key, path in csv_paths.items() if key not in sections]
+    plan.missing_sections = [
+        (section_id, path)
+        for key, (section_id, path) in sections.items()
+        if key not in csv_paths
+    ]
+
+    new_by_path = {}
+    for fingerprint, (path, text) in csv_questions.items():
+        if fingerprint in questions:
+            plan.unchanged_questions += 1
+        else:
+            new_by_path.setdefault(path_key(path, db_type), []).append((path, text))
+
+    missing_by_path = {}
+    for fingerprint, question in questions.items():
+        if fingerprint not in csv_questions:
+            missing_by_path.setdefault(path_key(question[1], db_type), []).append(question)
+
+    for key, path in csv_paths.items():
+        new = new_by_path.pop(key, [])
+        missing = missing_by_path.pop(key, [])
+        pairs, missing, new = _pair_renames(missing, new)
+        plan.renamed_questions.extend(
+            (question_id, path, old_text, new_text)
+            for (question_id, _, old_text), (_, new_text) in pairs
+        )
+        plan.new_questions.extend(new)
+        plan.missing_questions.extend(missing)
+
+    for missing in missing_by_path.values():
+        plan.missing_questions.extend(missing)
+
+    return plan
+
+
+def build_import_plan(csv_path, db_type, db_target, entries=None):
+    """Read the CSV and the active year's tree and return an ImportPlan."""
+    stats = new_import_stats()
+    if entries is None:
+        entries = read_csv_entries(csv_path, stats)
+
+    with closing(get_connection(db_type, db_target)) as conn:
+        cur = conn.cursor()
+        survey_entity_id, sections_have_survey_entity, _, _ = get_import_context(
+            cur, db_type, db_target
+        )
+        sections, questions = load_survey_tree(
+            cur, survey_entity_id, sections_have_survey_entity, db_type
+        )
+
+    return diff_entries(
+        entries, sections, questions, ImportPlan(survey_entity_id, stats), db_type
+    )
+
+
+def apply_import_plan(plan, db_type, db_target, apply_renames=False):
+    """Write only the plan's new sections, new questions and (with
+    apply_renames) renames. Without apply_renames each possible rename's new
+    text is inserted as a new question and the old question is kept.
+
+    Returns import stats plus a "renamed_questions" count. An empty plan does
+    not open a connection.
+    """
+    stats = dict(plan.stats)
+    stats["duplicate_questions"] += plan.unchanged_questions
+    stats["renamed_questions"] = 0
+    if not plan.has_writes():
+        return stats
+
+    with closing(get_connection(db_type, db_target)) as conn:
+        cur = conn.cursor()
+        if db_type == "sqlserver":
+            cur.fast_executemany = True
+        (
+            survey_entity_id,
+            sections_have_survey_entity,
+            questions_have_survey_entity,
+            _,
+        ) = get_import_context(cur, db_type, db_target)
+        if survey_entity_id != plan.survey_entity_id:
+            raise RuntimeError(
+                "The active survey year changed since the plan was built. Re-run the plan."
+            )
+
+        section_index = load_section_index(
+            cur, survey_entity_id, sections_have_survey_entity, db_type
+        )
+
+        def path_to_id(path):
+            section_id = section_index[(None, section_name_key(path[0], db_type))]
+            if len(path) == 2:
+                section_id = section_index[(section_id, section_name_key(path[1], db_type))]
+            return section_id
+
+        for depth in (1, 2):
+            level = [path for path in plan.new_sections if len(path) == depth]
+            if not level:
+                continue
+            rows = [
+                (path[-1], None if depth == 1 else path_to_id(path[:1]))
+                for path in level
+            ]
+            insert_sections_bulk(cur, rows, survey_entity_id, sections_have_survey_entity)
+            stats["sections" if depth == 1 else "subsections"] += len(rows)
+            section_index = load_section_index(
+                cur, survey_entity_id, sections_have_survey_entity, db_type
+            )
+
+        renamed = plan.renamed_questions if apply_renames else []
+        new_questions = list(plan.new_questions)
+        if not apply_renames:
+            new_questions += [(path, new_text) for _, path, _, new_text in plan.renamed_questions]
+
+        if new_questions:
+            if questions_have_survey_entity:
+                cur.executemany(
+                    "INSERT INTO Questions (Text, SurveyYear, SectionId) VALUES (?, ?, ?)",
+                    [
+                        (text, survey_entity_id, path_to_id(path))
+                        for path, text in new_questions
+                    ],
+                )
+            else:
+                cur.executemany(
+                    "INSERT INTO Questions (Text, SectionId) VALUES (?, ?)",
+                    [(text, path_to_id(path)) for path, text in new_questions],
+                )
+            stats["questions"] += len(new_questions)
+
+        if renamed:
+            cur.executemany(
+                "UPDATE Questions SET Text = ? WHERE Id = ?",
+                [(new_text, question_id) for question_id, _, _, new_text in renamed],
+            )
+            stats["renamed_questions"] += len(renamed)
+
+        conn.commit()
+
+    return stats
@@ -0,0 +1,208 @@
+"""Schema introspection and the SQLite stand-in for the production schema.
+
+SchemaSnapshot reads every table and column of the target in a single query
+and answers table_exists/column_exists from memory. get_schema_snapshot also
+keeps snapshots in an on-disk cache keyed by database and schema version, so
+later runs only pay for one cheap version query.
+
+create_sqlite_database builds a local SQLite copy of external_apps/schema.sql
+for benchmarks and load tests.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+SCHEMA_SQL_PATH = Path(__file__).resolve().parents[1] / "schema.sql"
+
+SNAPSHOT_QUERIES = {
+    "sqlite": (
+        "SELECT m.name, p.name FROM sqlite_master m"
+        " JOIN pragma_table_info(m.name) p"
+        " WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'"
+    ),
+    "sqlserver": (
+        "SELECT TABLE_NAME, COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS"
+        " WHERE TABLE_SCHEMA = 'dbo'"
+    ),
+}
+
+# schema_version is bumped by SQLite on every schema change; on SQL Server
+# sys.objects.modify_date moves whenever a table is created or altered.
+VERSION_QUERIES = {
+    "sqlite": "PRAGMA schema_version",
+    "sqlserver": (
+        "SELECT CONVERT(VARCHAR(33), MAX(modify_date), 126) + '/' + CAST(COUNT(*) AS VARCHAR(12))"
+        " FROM sys.objects WHERE is_ms_shipped = 0"
+    ),
+}
+
+# Oldest targets are dropped beyond this many, so benchmark/test databases
+# don't grow the cache file forever.
+MAX_CACHE_ENTRIES = 50
+
+_memory_cache = {}
+_cache_lock = threading.Lock()
+
+
+class SchemaSnapshot:
+    """Tables and columns of one database, compared case-insensitively."""
+
+    def __init__(self, db_type, tables):
+        self.db_type = db_type
+        # {table name: [column names]} as returned by the server
+        self.tables = tables
+        self._columns = {
+            table.casefold(): {column.casefold() for column in columns}
+            for table, columns in tables.items()
+        }
+
+    @classmethod
+    def load(cls, cur, db_type):
+        if db_type not in SNAPSHOT_QUERIES:
+            raise ValueError(f"Unsupported database type: {db_type}")
+        cur.execute(SNAPSHOT_QUERIES[db_type])
+        tables = {}
+        for table_name, column_name in cur.fetchall():
+            tables.setdefault(table_name, []).append(column_name)
+        return cls(db_type, tables)
+
+    def table_exists(self, table_name):
+        return table_name.casefold() in self._columns
+
+    def column_exists(self, table_name, column_name):
+        return column_name.casefold() in self._columns.get(table_name.casefold(), ())
+
+    def to_dict(self):
+        return {"db_type": self.db_type, "tables": self.tables}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["db_type"], data["tables"])
+
+
+def default_cache_path():
+    base = os.environ.get("FLOURISH_TOOLS_CACHE_DIR") or (
+        Path.home() / ".cache" / "flourish_tools"
+    )
+    return Path(base) / "schema_cache.json"
+
+
+def _sqlite_file_identity(db_target):
+    """Return (st_dev, st_ino, st_ctime_ns) of a SQLite file, or None if it is missing."""
+    try:
+        st = os.stat(db_target)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino, st.st_ctime_ns
+
+
+def _cache_key(db_type, db_target):
+    if db_type == "sqlite":
+        # The path alone is not enough: bench and generate recreate files at
+        # the same path, and PRAGMA schema_version is only a counter.
+        identity = _sqlite_file_identity(db_target)
+        db_target = f"{os.path.abspath(db_target)}|{identity and identity[:2]}"
+    return hashlib.sha256(f"{db_type}|{db_target}".encode("utf-8")).hexdigest()
+
+
+def get_schema_version(cur, db_type):
+    cur.execute(VERSION_QUERIES[db_type])
+    row = cur.fetchone()
+    return None if row is None else str(row[0])
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(cache_path, cache):
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(cache), encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # The cache is an optimization only.
+
+
+def get_schema_snapshot(cur, db_type, db_target=None, cache_path=None):
+    """
+    Return a SchemaSnapshot for the database behind cur.
+
+    When db_target is given the snapshot is reused from memory or from
+    cache_path (default: ~/.cache/flourish_tools/schema_cache.json) as long as
+    the schema version still matches. For SQLite files the version also
+    includes the file's inode and ctime, since PRAGMA schema_version is a
+    counter that a recreated file can repeat. Pass cache_path=False to always
+    reload.
+    """
+    if db_target is None or cache_path is False or db_target == ":memory:":
+        return SchemaSnapshot.load(cur, db_type)
+
+    cache_path = Path(cache_path) if cache_path else default_cache_path()
+    key = _cache_key(db_type, db_target)
+    version = get_schema_version(cur, db_type)
+    if db_type == "sqlite":
+        # A recreated file can reuse the inode; its ctime still differs. Any
+        # write also moves ctime, which only costs a (local, cheap) reload.
+        identity = _sqlite_file_identity(db_target)
+        version = f"{version}|{identity and identity[2]}"
+
+    cached = _memory_cache.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with _cache_lock:
+        disk_cache = _read_cache(cache_path)
+        entry = disk_cache.get(key)
+        if entry and entry.get("version") == version:
+            snapshot = SchemaSnapshot.from_dict(entry["snapshot"])
+        else:
+            snapshot = SchemaSnapshot.load(cur, db_type)
+            disk_cache.pop(key, None)
+            disk_cache[key] = {"version": version, "snapshot": snapshot.to_dict()}
+            for stale_key in list(disk_cache)[:-MAX_CACHE_ENTRIES]:
+                del disk_cache[stale_key]
+            _write_cache(cache_path, disk_cache)
+
+    _memory_cache[key] = (version, snapshot)
+    return snapshot
+
+
+def translate_schema_to_sqlite(sql_text):
+    """Translate the SQL Server DDL in schema.sql to SQLite.
+
+    IDENTITY(1,1) columns become plain INTEGER columns; together with their
+    PRIMARY KEY (Id) constraint that makes them rowid aliases, so they still
+    auto-number. NVARCHAR(MAX) loses its length and the dbo. prefix is dropped.
+    """
+    sql_text = re.sub(r"\bdbo\.", "", sql_text)
+    sql_text = re.sub(
+        r"\bINT(\s+NOT\s+NULL)?\s+IDENTITY\s*\(\s*\d+\s*,\s*\d+\s*\)",
+        "INTEGER NOT NULL",
+        sql_text,
+        flags=re.IGNORECASE,
+    )
+    sql_text = re.sub(r"\(\s*MAX\s*\)", "", sql_text, flags=re.IGNORECASE)
+    sql_text = re.sub(r"^\s*GO\s*$", "", sql_text, flags=re.IGNORECASE | re.MULTILINE)
+    return sql_text
+
+
+def create_sqlite_database(db_path, schema_path=SCHEMA_SQL_PATH):
+    """Create (or extend) a SQLite database from schema.sql and return the path."""
+    sql_text = Path(schema_path).read_text(encoding="utf-8")
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(translate_schema_to_sqlite(sql_text))
+        conn.commit()
+    finally:
+        conn.close()
+    return db_path
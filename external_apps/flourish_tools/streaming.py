@@ -0,0 +1,193 @@
+"""Chunk-committed, resumable CSV import.
+
+import_csv_streaming reads the CSV one row at a time, commits every
+chunk_size rows and then writes a checkpoint holding the byte offset of the
+next row, the section cache and the running stats. If the run fails, rerunning
+the same command resumes from the last checkpoint instead of starting over.
+Memory stays flat no matter how large the CSV is, and locks on
+Sections/Questions are only held for one chunk at a time.
+
+A crash between a commit and the checkpoint write replays at most one chunk.
+That is safe because process_row looks up sections and questions before
+inserting them, so replayed rows are counted as duplicates.
+"""
+import csv
+import hashlib
+import itertools
+import json
+import os
+
+from .db import get_connection
+from .importer import get_import_context, new_import_stats, process_row
+
+CHECKPOINT_VERSION = 1
+
+
+def default_checkpoint_path(csv_path):
+    return f"{csv_path}.checkpoint.json"
+
+
+def _target_fingerprint(db_type, db_target):
+    # Connection strings can carry credentials, so only a hash is stored.
+    return hashlib.sha256(f"{db_type}|{db_target}".encode("utf-8")).hexdigest()
+
+
+def _csv_fingerprint(csv_path):
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def load_checkpoint(checkpoint_path, csv_path, db_type, db_target):
+    """Return the saved checkpoint if it belongs to this CSV and target, otherwise None."""
+    if not os.path.exists(checkpoint_path):
+        return None
+
+    with open(checkpoint_path, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise RuntimeError(f"Unsupported checkpoint version in {checkpoint_path}")
+    if checkpoint.get("target") != _target_fingerprint(db_type, db_target):
+        raise RuntimeError(
+            f"Checkpoint {checkpoint_path} was written for a different database target."
+        )
+    if checkpoint.get("csv") != _csv_fingerprint(csv_path):
+        raise RuntimeError(
+            f"{csv_path} changed since checkpoint {checkpoint_path} was written."
+            " Delete the checkpoint to start over."
+        )
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path, checkpoint):
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def iter_rows_with_offsets(csvfile):
+    """Yield (row, offset_after_row) pairs.
+
+    Lines are pulled with readline() so tell() stays usable; csv.reader only
+    asks for more lines while a quoted field is still open, so the offset
+    after each row is exactly where the next row starts.
+    """
+    reader = csv.reader(iter(csvfile.readline, ""))
+    for row in reader:
+        yield row, csvfile.tell()
+
+
+def import_csv_streaming(
+    csv_path,
+    db_type,
+    db_target,
+    chunk_size=500,
+    checkpoint_path=None,
+    progress=None,
+):
+    """
+    Import a CSV like import_csv_to_db, committing every chunk_size rows.
+
+    Resumes automatically from checkpoint_path (default: <csv>.checkpoint.json)
+    and deletes it once the whole file has been imported. progress, if given,
+    is called with the stats dict after each commit.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    checkpoint_path = checkpoint_path or default_checkpoint_path(csv_path)
+    checkpoint = load_checkpoint(checkpoint_path, csv_path, db_type, db_target)
+
+    conn = get_connection(db_type, db_target)
+    try:
+        cur = conn.cursor()
+        (
+            survey_entity_id,
+            sections_have_survey_entity,
+            questions_have_survey_entity,
+            questions_have_text_hash,
+        ) = get_import_context(cur, db_type, db_target)
+
+        # Loaded lazily per section and dropped at every commit, so memory
+        # stays at one chunk's sections however long the file is; not
+        # checkpointed.
+        question_hashes = {}
+
+        if checkpoint:
+            if checkpoint["survey_entity_id"] != survey_entity_id:
+                raise RuntimeError(
+                    "The active survey year changed since the checkpoint was written."
+                )
+            offset = checkpoint["offset"]
+            section_cache = checkpoint["section_cache"]
+            stats = checkpoint["stats"]
+            rows_done = checkpoint["rows_done"]
+        else:
+            offset = 0
+            section_cache = {}
+            stats = new_import_stats()
+            rows_done = 0
+
+        def commit_chunk(next_offset):
+            conn.commit()
+            question_hashes.clear()
+            save_checkpoint(
+                checkpoint_path,
+                {
+                    "version": CHECKPOINT_VERSION,
+                    "csv": _csv_fingerprint(csv_path),
+                    "target": _target_fingerprint(db_type, db_target),
+                    "survey_entity_id": survey_entity_id,
+                    "offset": next_offset,
+                    "rows_done": rows_done,
+                    "section_cache": section_cache,
+                    "stats": stats,
+                },
+            )
+            if progress:
+                progress(stats)
+
+        with open(csv_path, newline="", encoding="utf-8-sig") as csvfile:
+            csvfile.seek(offset)
+            rows = iter_rows_with_offsets(csvfile)
+
+            if offset == 0:
+                # Skip the header row like import_csv_to_db does.
+                first = next(rows, None)
+                if first is not None:
+                    row, next_offset = first
+                    normalized = [col.strip().lower() for col in row]
+                    if normalized != ["section", "subsection", "question"]:
+                        rows = itertools.chain([first], rows)
+                    else:
+                        offset = next_offset
+
+            pending = 0
+            for row, next_offset in rows:
+                process_row(
+                    cur,
+                    row,
+                    section_cache,
+                    stats,
+                    db_type,
+                    survey_entity_id,
+                    sections_have_survey_entity,
+                    questions_have_survey_entity,
+                    question_hashes,
+                    questions_have_text_hash,
+                )
+                rows_done += 1
+                pending += 1
+                offset = next_offset
+                if pending >= chunk_size:
+                    commit_chunk(offset)
+                    pending = 0
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return stats
@@ -0,0 +1,440 @@
+"""Generate a large, reproducible survey dataset without Active Directory.
+
+populate_surveys.py can only seed as many users as the ALF OU returns, and only
+from a domain-joined Windows machine. generate_dataset makes up its own
+facilities and users instead, so a SQLite file or a SQL Server test database
+can be loaded at many times production size for load-testing the results and
+lock-management queries:
+
+    python -m flourish_tools generate --db-type sqlite --target big.db \
+        --facilities 500 --users-per-facility 40 --years 2024,2025,2026
+
+The same seed and parameters always produce the same rows. Every year draws
+from its own random stream, so adding a year does not change the others.
+
+What gets written:
+  - one SurveyYear row per year; the last one is Active, the rest Archived;
+  - Sections (with subsections) and Questions for every year, each year a
+    clone of the same structure, the way the app starts a new year;
+  - Users, plus one Community row per user for their facility;
+  - per year, Responses and UserSurveyStatuses: completion_rate of the users
+    answer every question and are completed, partial_rate answer some of them
+    and are in progress, and the rest have not started.
+
+Synthetic users are named synthetic.test\\synFFFFUUUU, so they never collide
+with real AD accounts and are easy to delete again.
+"""
+import random
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from .db import get_connection, table_exists
+from .schema import create_sqlite_database
+
+SYNTHETIC_DOMAIN = "synthetic.test"
+ANSWER_CHOICES = ["Fully Implemented", "Partially Implemented", "Not a Current Practice"]
+FIRST_COMMUNITY_KEY = 10_000
+WRITE_BATCH_SIZE = 10_000
+
+FACILITY_TOWNS = [
+    "Bolivar", "Branson", "Carthage", "Clinton", "Joplin", "Lebanon", "Monett",
+    "Neosho", "Nevada", "Ozark", "Republic", "Rolla", "Sedalia", "Sikeston",
+    "Springfield", "Warsaw", "Webb City", "West Plains",
+]
+FIRST_NAMES = [
+    "Alex", "Bailey", "Casey", "Dana", "Emery", "Finley", "Gray", "Harper",
+    "Jamie", "Jordan", "Kendall", "Logan", "Morgan", "Parker", "Quinn", "Reese",
+    "Riley", "Rowan", "Sawyer", "Taylor",
+]
+LAST_NAMES = [
+    "Adams", "Baker", "Carter", "Davis", "Evans", "Foster", "Garcia", "Hughes",
+    "Jenkins", "Kelly", "Lewis", "Miller", "Nelson", "Owens", "Parker", "Reed",
+    "Scott", "Turner", "Walker", "Young",
+]
+
+
+def new_generate_stats():
+    return {
+        "facilities": 0,
+        "users": 0,
+        "years": 0,
+        "sections": 0,
+        "questions": 0,
+        "responses": 0,
+        "statuses": 0,
+        "completed": 0,
+        "seconds": 0.0,
+    }
+
+
+def synthetic_username(facility_index, user_index):
+    return f"syn{facility_index:04d}{user_index:04d}"
+
+
+def build_facilities(facilities, users_per_facility, seed=0):
+    """Return [(community_key, facility_name, [(sam, full_name), ...]), ...]."""
+    rng = random.Random(f"{seed}:facilities")
+    result = []
+    for f in range(facilities):
+        town = FACILITY_TOWNS[f % len(FACILITY_TOWNS)]
+        name = f"{town} Assisted Living {f // len(FACILITY_TOWNS) + 1}"
+        users = [
+            (
+                synthetic_username(f, u),
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            )
+            for u in range(users_per_facility)
+        ]
+        result.append((FIRST_COMMUNITY_KEY + f, name, users))
+    return result
+
+
+def build_structure(sections, subsections_per_section, questions_per_section):
+    """Return [(section name, [subsection name, ...], [[question text, ...] per owner])].
+
+    Questions are spread over the section itself and each of its subsections;
+    the question list has one entry for the section followed by one per
+    subsection.
+    """
+    structure = []
+    for s in range(sections):
+        name = f"Synthetic Section {s + 1}"
+        subsections = [f"{name} / Part {p + 1}" for p in range(subsections_per_section)]
+        questions = [
+            [
+                f"Synthetic question {s + 1}.{owner}.{q + 1}: is this practice in place?"
+                for q in range(questions_per_section)
+            ]
+            for owner in range(1 + subsections_per_section)
+        ]
+        structure.append((name, subsections, questions))
+    return structure
+
+
+def _timestamp(db_type, value):
+    # sqlite3's default datetime adapter is deprecated; store ISO text like EF does.
+    return value.isoformat(sep=" ") if db_type == "sqlite" else value
+
+
+def _check_target(cur, db_type, years):
+    placeholders = ", ".join("?" for _ in years)
+    cur.execute(f"SELECT Year FROM SurveyYear WHERE Year IN ({placeholders})", list(years))
+    existing = sorted(row[0] for row in cur.fetchall())
+    if existing:
+        raise RuntimeError(
+            f"SurveyYear already has {', '.join(map(str, existing))}; use a fresh database."
+        )
+    cur.execute("SELECT COUNT(*) FROM Users WHERE Email LIKE ?", (f"{SYNTHETIC_DOMAIN}\\%",))
+    if cur.fetchone()[0]:
+        raise RuntimeError(
+            f"Target already contains {SYNTHETIC_DOMAIN} users; use a fresh database."
+        )
+
+
+def insert_users(cur, db_type, facilities, created_at):
+    """Insert the synthetic users and their Community rows; return {sam: (user_id, community_key)}."""
+    cur.executemany(
+        "INSERT INTO Users (Email, FullName, SAMAccountName, Role, CreatedAt)"
+        " VALUES (?, ?, ?, 1, ?)",
+        [
+            (f"{SYNTHETIC_DOMAIN}\\{sam}", full_name, sam, _timestamp(db_type, created_at))
+            for _, _, users in facilities
+            for sam, full_name in users
+        ],
+    )
+    cur.execute(
+        "SELECT Id, SAMAccountName FROM Users WHERE Email LIKE ?", (f"{SYNTHETIC_DOMAIN}\\%",)
+    )
+    user_ids = {sam: user_id for user_id, sam in cur.fetchall()}
+
+    users = {}
+    community_rows = []
+    for community_key, facility_name, facility_users in facilities:
+        for sam, _ in facility_users:
+            users[sam] = (user_ids[sam], community_key)
+            community_rows.append((user_ids[sam], sam, facility_name, community_key))
+    cur.executemany(
+        "INSERT INTO Community (UserId, SAMAccountName, Facility, CommunityKey) VALUES (?, ?, ?, ?)",
+        community_rows,
+    )
+    return users
+
+
+def insert_year_structure(cur, year, structure):
+    """Insert one year's sections and questions.
+
+    Returns (question ids in structure order, number of sections inserted).
+    """
+    cur.executemany(
+        "INSERT INTO Sections (Name, SurveyYear, ParentSectionId) VALUES (?, ?, NULL)",
+        [(name, year) for name, _, _ in structure],
+    )
+    cur.execute("SELECT Id, Name FROM Sections WHERE SurveyYear = ?", (year,))
+    section_ids = {name: section_id for section_id, name in cur.fetchall()}
+
+    subsection_rows = [
+        (subsection, year, section_ids[name])
+        for name, subsections, _ in structure
+        for subsection in subsections
+    ]
+    if subsection_rows:
+        cur.executemany(
+            "INSERT INTO Sections (Name, SurveyYear, ParentSectionId) VALUES (?, ?, ?)",
+            subsection_rows,
+        )
+    cur.execute("SELECT Id, Name FROM Sections WHERE SurveyYear = ?", (year,))
+    section_ids = {name: section_id for section_id, name in cur.fetchall()}
+
+    question_rows = []
+    for name, subsections, questions in structure:
+        for owner, texts in zip([name] + subsections, questions):
+            question_rows.extend((text, section_ids[owner], year) for text in texts)
+    cur.executemany(
+        "INSERT INTO Questions (Text, SectionId, SurveyYear) VALUES (?, ?, ?)", question_rows
+    )
+    cur.execute("SELECT Id, Text FROM Questions WHERE SurveyYear = ?", (year,))
+    question_ids = {text: question_id for question_id, text in cur.fetchall()}
+    return [question_ids[text] for text, _, _ in question_rows], len(section_ids)
+
+
+def generate_year_rows(
+    db_type, year, users, question_ids, completion_rate, partial_rate, seed=0
+):
+    """
+    Yield (status_row, response_rows) for every user who started one survey year.
+
+    users is {sam: (user_id, community_key)}; it is walked in sorted order so
+    the output depends only on the seed and parameters.
+    """
+    rng = random.Random(f"{seed}:{year}")
+    year_start = datetime(year, 1, 1)
+    for sam in sorted(users):
+        user_id, community_key = users[sam]
+        draw = rng.random()
+        if draw < completion_rate:
+            answered = question_ids
+            is_completed = True
+        elif draw < completion_rate + partial_rate and len(question_ids) > 1:
+            answered = rng.sample(question_ids, rng.randint(1, len(question_ids) - 1))
+            is_completed = False
+        else:
+            continue
+
+        created = year_start + timedelta(days=rng.randint(14, 300), minutes=rng.randint(0, 1439))
+        modified = created + timedelta(minutes=rng.randint(1, 60 * 24 * 14))
+        created, modified = _timestamp(db_type, created), _timestamp(db_type, modified)
+        yield (
+            (user_id, year, community_key, is_completed, modified),
+            [
+                (
+                    rng.choice(ANSWER_CHOICES),
+                    question_id,
+                    user_id,
+                    year,
+                    sam,
+                    created,
+                    modified,
+                    community_key,
+                )
+                for question_id in answered
+            ],
+        )
+
+
+def generate_profile_year_rows(
+    db_type,
+    year,
+    users,
+    question_ids,
+    section_names,
+    completion_rate,
+    partial_rate,
+    profile,
+    seed=0,
+):
+    """
+    Like generate_year_rows, but draw every answer of the year from one
+    flourish_tools.answers matrix biased by community and section.
+
+    section_names holds the top-level section name of each question.
+    """
+    from .answers import ANSWER_CHOICES as CHOICES, answered_mask, generate_answer_matrix
+
+    rng = random.Random(f"{seed}:{year}:dates")
+    year_seed = seed * 10_000 + year
+    sams = sorted(users)
+    answered = answered_mask(
+        len(sams), len(question_ids), completion_rate, partial_rate, seed=year_seed
+    )
+    codes = generate_answer_matrix(
+        profile, [users[sam][1] for sam in sams], section_names, answered, seed=year_seed
+    )
+
+    year_start = datetime(year, 1, 1)
+    for sam, user_codes in zip(sams, codes.tolist()):
+        answers = [
+            (CHOICES[code], question_id)
+            for code, question_id in zip(user_codes, question_ids)
+            if code >= 0
+        ]
+        if not answers:
+            continue
+        user_id, community_key = users[sam]
+        created = year_start + timedelta(days=rng.randint(14, 300), minutes=rng.randint(0, 1439))
+        modified = created + timedelta(minutes=rng.randint(1, 60 * 24 * 14))
+        created, modified = _timestamp(db_type, created), _timestamp(db_type, modified)
+        yield (
+            (user_id, year, community_key, len(answers) == len(question_ids), modified),
+            [
+                (answer, question_id, user_id, year, sam, created, modified, community_key)
+                for answer, question_id in answers
+            ],
+        )
+
+
+INSERT_RESPONSE_SQL = (
+    "INSERT INTO Responses"
+    " (Answer, QuestionId, UserId, SurveyYear, SAMaccountName, CreateDate, Modified, CommunityKey)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_STATUS_SQL = (
+    "INSERT INTO UserSurveyStatuses (UserId, SurveyYear, CommunityKey, IsCompleted, UpdatedAt)"
+    " VALUES (?, ?, ?, ?, ?)"
+)
+
+
+def write_year_rows(cur, db_type, user_rows, stats, batch_size=WRITE_BATCH_SIZE):
+    """Write generate_year_rows output: responses in executemany batches of
+    batch_size, then every status row in one more executemany."""
+    statuses = []
+    pending = []
+
+    def flush():
+        cur.executemany(INSERT_RESPONSE_SQL, pending)
+        stats["responses"] += len(pending)
+        pending.clear()
+
+    if db_type == "sqlserver":
+        import pyodbc
+
+        # Without this, fast_executemany sizes its buffer for NVARCHAR(MAX).
+        cur.setinputsizes([(pyodbc.SQL_WVARCHAR, 255, 0)] + [None] * 7)
+    try:
+        for status_row, response_rows in user_rows:
+            statuses.append(status_row)
+            pending.extend(response_rows)
+            if len(pending) >= batch_size:
+                flush()
+        if pending:
+            flush()
+    finally:
+        cur.setinputsizes(None)
+
+    if statuses:
+        cur.executemany(INSERT_STATUS_SQL, statuses)
+    stats["statuses"] += len(statuses)
+    stats["completed"] += sum(1 for row in statuses if row[3])
+
+
+def generate_dataset(
+    db_type,
+    db_target,
+    facilities=50,
+    users_per_facility=40,
+    years=None,
+    sections=8,
+    subsections_per_section=2,
+    questions_per_section=6,
+    completion_rate=0.7,
+    partial_rate=0.2,
+    seed=0,
+    batch_size=WRITE_BATCH_SIZE,
+    progress=None,
+    answer_profile=None,
+):
+    """
+    Write a synthetic dataset into db_target and return a stats dict.
+
+    years defaults to the last three calendar years. A SQLite target without
+    a Users table is first created from schema.sql. Each year is committed on
+    its own; progress, if given, is called with the stats after every year.
+    With an answer_profile (flourish_tools.answers.AnswerProfile, needs numpy)
+    answers are skewed by community and section and correlated within a
+    section instead of uniform.
+    """
+    if years is None:
+        this_year = datetime.now().year
+        years = [this_year - 2, this_year - 1, this_year]
+    years = sorted(set(years))
+    if not years:
+        raise ValueError("At least one survey year is required.")
+    if min(facilities, users_per_facility, sections, questions_per_section) < 1:
+        raise ValueError("Facilities, users, sections and questions must each be at least 1.")
+    if not 0 <= completion_rate <= 1 or not 0 <= partial_rate <= 1 - completion_rate:
+        raise ValueError("completion_rate and partial_rate must be fractions summing to at most 1.")
+
+    stats = new_generate_stats()
+    started = time.perf_counter()
+    facility_rows = build_facilities(facilities, users_per_facility, seed)
+    structure = build_structure(sections, subsections_per_section, questions_per_section)
+    # Top-level section name of each question, in insert_year_structure order.
+    question_sections = [
+        name for name, _, questions in structure for texts in questions for _ in texts
+    ]
+
+    with closing(get_connection(db_type, db_target)) as conn:
+        cur = conn.cursor()
+        if db_type == "sqlite" and not table_exists(cur, db_type, "Users"):
+            cur.close()
+            create_sqlite_database(db_target)
+            cur = conn.cursor()
+        if db_type == "sqlserver":
+            cur.fast_executemany = True
+
+        _check_target(cur, db_type, years)
+
+        users = insert_users(cur, db_type, facility_rows, datetime(years[0], 1, 1))
+        conn.commit()
+        stats["facilities"] = len(facility_rows)
+        stats["users"] = len(users)
+
+        for year in years:
+            cur.execute(
+                "INSERT INTO SurveyYear (Year, Status, CreatedAt) VALUES (?, ?, ?)",
+                (year, 2 if year == years[-1] else 1, _timestamp(db_type, datetime(year, 1, 1))),
+            )
+            question_ids, section_count = insert_year_structure(cur, year, structure)
+            if answer_profile is None:
+                year_rows = generate_year_rows(
+                    db_type, year, users, question_ids, completion_rate, partial_rate, seed
+                )
+            else:
+                year_rows = generate_profile_year_rows(
+                    db_type,
+                    year,
+                    users,
+                    question_ids,
+                    question_sections,
+                    completion_rate,
+                    partial_rate,
+                    answer_profile,
+                    seed,
+                )
+            write_year_rows(
+                cur,
+                db_type,
+                year_rows,
+                stats,
+                batch_size,
+            )
+            conn.commit()
+            stats["years"] += 1
+            stats["sections"] += section_count
+            stats["questions"] += len(question_ids)
+            stats["seconds"] = time.perf_counter() - started
+            if progress:
+                progress(dict(stats))
+
+    stats["seconds"] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,130 @@
+"""Approximate row counts, sizes and index counts for every table, from the catalog.
+
+fetch_table_stats reads the numbers the database already keeps instead of
+counting rows, so it costs one catalog query however large the tables are.
+
+SQL Server: row counts from sys.partitions (heap or clustered index only),
+reserved space from sys.allocation_units, index counts from sys.indexes.
+These views only need metadata visibility, unlike sys.dm_db_partition_stats,
+which needs VIEW DATABASE STATE.
+
+SQLite: row estimates from sqlite_stat1 (only present after ANALYZE), sizes
+from the dbstat virtual table (when SQLite was built with it), index counts
+from sqlite_master. Missing numbers are None.
+
+Results are cached per target for STATS_TTL seconds.
+"""
+import threading
+import time
+
+from .browser import _connect
+
+STATS_TTL = 300.0
+
+SQLSERVER_STATS_SQL = """
+SELECT
+    s.name,
+    t.name,
+    (SELECT SUM(p.rows) FROM sys.partitions p
+        WHERE p.object_id = t.object_id AND p.index_id IN (0, 1)),
+    (SELECT SUM(a.total_pages) * 8 FROM sys.partitions p
+        INNER JOIN sys.allocation_units a ON a.container_id = p.partition_id
+        WHERE p.object_id = t.object_id),
+    (SELECT COUNT(*) FROM sys.indexes i
+        WHERE i.object_id = t.object_id AND i.index_id > 0)
+FROM sys.tables t
+INNER JOIN sys.schemas s ON s.schema_id = t.schema_id
+"""
+
+SQLITE_FEATURES_SQL = (
+    "SELECT"
+    " (SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'),"
+    " (SELECT COUNT(*) FROM pragma_module_list WHERE name = 'dbstat')"
+)
+
+_cache = {}  # {(db_type, db_target): (loaded_at, stats)}
+_cache_lock = threading.Lock()
+
+
+def _sqlite_stats_sql(has_stat1, has_dbstat):
+    # sqlite_stat1.stat starts with the estimated row count of the table.
+    rows_sql = (
+        "(SELECT CAST(substr(s.stat, 1, instr(s.stat || ' ', ' ') - 1) AS INTEGER)"
+        " FROM sqlite_stat1 s WHERE s.tbl = m.name LIMIT 1)"
+        if has_stat1
+        else "NULL"
+    )
+    size_sql = (
+        "(SELECT SUM(d.pgsize) / 1024 FROM dbstat d WHERE d.name IN"
+        " (SELECT o.name FROM sqlite_master o WHERE o.tbl_name = m.name))"
+        if has_dbstat
+        else "NULL"
+    )
+    return (
+        f"SELECT 'main', m.name, {rows_sql}, {size_sql},"
+        " (SELECT COUNT(*) FROM sqlite_master i WHERE i.type = 'index' AND i.tbl_name = m.name)"
+        " FROM sqlite_master m WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'"
+    )
+
+
+def fetch_table_stats(db_type="sqlserver", db_target=None, max_age=STATS_TTL):
+    """
+    Return {(schema, table): {"rows": n, "reserved_kb": kb, "indexes": k}}.
+
+    A cached result younger than max_age seconds is returned without a query;
+    pass max_age=0 to force a refresh.
+    """
+    key = (db_type, db_target)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached and time.monotonic() - cached[0] < max_age:
+        return cached[1]
+
+    with _connect(db_type, db_target) as (conn, cursor):
+        if db_type == "sqlite":
+            cursor.execute(SQLITE_FEATURES_SQL)
+            has_stat1, has_dbstat = cursor.fetchone()
+            cursor.execute(_sqlite_stats_sql(has_stat1, has_dbstat))
+        else:
+            cursor.execute(SQLSERVER_STATS_SQL)
+        stats = {
+            (schema_name, table_name): {
+                "rows": rows,
+                "reserved_kb": reserved_kb,
+                "indexes": indexes,
+            }
+            for schema_name, table_name, rows, reserved_kb, indexes in cursor.fetchall()
+        }
+
+    with _cache_lock:
+        _cache[key] = (time.monotonic(), stats)
+    return stats
+
+
+def format_count(n):
+    if n is None:
+        return "?"
+    for limit, suffix in ((1_000_000_000, "B"), (1_000_000, "M"), (1_000, "K")):
+        if n >= limit:
+            return f"{n / limit:.1f}{suffix}"
+    return str(n)
+
+
+def format_size(kb):
+    if kb is None:
+        return "?"
+    if kb >= 1024 * 1024:
+        return f"{kb / (1024 * 1024):.1f} GB"
+    if kb >= 1024:
+        return f"{kb / 1024:.1f} MB"
+    return f"{kb} KB"
+
+
+def describe_stats(stats):
+    """One-line summary like "1.2M rows, 45.0 MB, 3 idx"."""
+    if not stats:
+        return ""
+    return (
+        f"{format_count(stats['rows'])} rows, {format_size(stats['reserved_kb'])},"
+        f" {stats['indexes']} idx"
+    )
@@ -1,536 +1,193 @@
 # This is used to import the sections, subsections, and questions into the db.
+# The import itself lives in flourish_tools.importer; this file is only the GUI.
+# For scheduled/headless runs use: python -m flourish_tools import-csv --help
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import sqlite3
-import csv
 import os
-import importlib
-import json
-from pathlib import Path
 
+from flourish_tools.db import IMPORT_CONN_STR, find_appsettings_connection_string, get_connection
+from flourish_tools.importer import import_csv_to_db
 
-def table_exists(cur, db_type, table_name):
-    if db_type == "sqlite":
-        cur.execute(
-            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
-            (table_name,),
-        )
-    elif db_type == "sqlserver":
-        cur.execute(
-            "SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = 'dbo' AND TABLE_NAME = ?",
-            (table_name,),
-        )
-    else:
-        raise ValueError(f"Unsupported database type: {db_type}")
-
-    return cur.fetchone() is not None
 
+class ImporterApp:
+    def __init__(self, root: tk.Tk):
+        self.root = root
+        self.root.title("FlourishWellness CSV Importer")
+        self.root.geometry("500x330")
 
-def column_exists(cur, db_type, table_name, column_name):
-    if db_type == "sqlite":
-        cur.execute(f"PRAGMA table_info({table_name})")
-        return any(row[1] == column_name for row in cur.fetchall())
-
-    if db_type == "sqlserver":
-        cur.execute(
-            "SELECT 1 FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = 'dbo' AND TABLE_NAME = ? AND COLUMN_NAME = ?",
-            (table_name, column_name),
+        self.db_type_var = tk.StringVar(value="sqlserver")
+        self.db_path_var = tk.StringVar(value="")
+        self.sql_conn_var = tk.StringVar(
+            value=find_appsettings_connection_string() or IMPORT_CONN_STR
         )
-        return cur.fetchone() is not None
+        self.bulk_var = tk.BooleanVar(value=False)
 
-    raise ValueError(f"Unsupported database type: {db_type}")
+        self._build_ui()
 
+    def _build_ui(self):
+        root = self.root
 
-def get_active_survey_entity_id(cur, db_type):
-    if table_exists(cur, db_type, "SurveyYear"):
-        if column_exists(cur, db_type, "SurveyYear", "Status"):
-            cur.execute(
-                (
-                    "SELECT TOP 1 Id FROM SurveyYear WHERE Status = ? ORDER BY Id DESC"
-                    if db_type == "sqlserver"
-                    else "SELECT Id FROM SurveyYear WHERE Status = ? ORDER BY Id DESC LIMIT 1"
-                ),
-                (2,),
-            )
-            active = cur.fetchone()
-            if active:
-                return active[0]
-
-        cur.execute(
-            "SELECT TOP 1 Id FROM SurveyYear ORDER BY Id DESC"
-            if db_type == "sqlserver"
-            else "SELECT Id FROM SurveyEntities ORDER BY Id DESC LIMIT 1"
+        title_label = tk.Label(
+            root, text="Import Sections, Subsections & Questions", font=("Arial", 14, "bold")
         )
-        latest = cur.fetchone()
-        if latest:
-            return latest[0]
+        title_label.pack(pady=15)
 
-    return None
+        info_label = tk.Label(
+            root,
+            text="CSV Format:\nColumn A: Section | Column B: Subsection (optional) | Column C: Question",
+            font=("Arial", 10),
+            justify="left",
+        )
+        info_label.pack(pady=5)
 
+        # Database selection
+        db_frame = tk.Frame(root)
+        db_frame.pack(pady=10)
 
-def get_connection(db_type, db_target):
-    if db_type == "sqlite":
-        return sqlite3.connect(db_target)
+        db_type_frame = tk.Frame(root)
+        db_type_frame.pack(pady=5)
 
-    if db_type == "sqlserver":
-        try:
-            pyodbc = importlib.import_module("pyodbc")
-        except ImportError as exc:
-            raise RuntimeError("pyodbc is not installed. Run: pip install pyodbc")
-        return pyodbc.connect(db_target)
-
-    raise ValueError(f"Unsupported database type: {db_type}")
-
-
-def import_csv_to_db(csv_path, db_type, db_target):
-    """
-    Import sections, subsections, and questions from CSV to database.
-
-    CSV Format:
-    Column A: Section Name (parent section)
-    Column B: Subsection Name (leave empty if no subsection)
-    Column C: Question Text
-
-    Examples:
-    "Mental Health","","Does your org have a mental health policy?"
-    "Mental Health","Employee Support","Are EAP services available?"
-    "Physical Wellness","","Is there a gym on site?"
-    """
-    conn = get_connection(db_type, db_target)
-    cur = conn.cursor()
-
-    if not table_exists(cur, db_type, "Sections"):
-        raise RuntimeError("Target database is missing required table: Sections")
-    if not table_exists(cur, db_type, "Questions"):
-        raise RuntimeError("Target database is missing required table: Questions")
-
-    survey_entity_id = get_active_survey_entity_id(cur, db_type)
-    sections_have_survey_entity = column_exists(
-        cur, db_type, "Sections", "SurveyYear"
-    )
-    questions_have_survey_entity = column_exists(
-        cur, db_type, "Questions", "SurveyYear"
-    )
-
-    if sections_have_survey_entity and survey_entity_id is None:
-        raise RuntimeError(
-            "Sections requires SurveyYear, but no SurveyEntities row was found."
+        tk.Label(db_type_frame, text="Database Type:", font=("Arial", 10)).pack(
+            side=tk.LEFT, padx=(0, 8)
+        )
+        tk.Radiobutton(
+            db_type_frame, text="SQLite", variable=self.db_type_var, value="sqlite"
+        ).pack(side=tk.LEFT)
+        tk.Radiobutton(
+            db_type_frame, text="SQL Server", variable=self.db_type_var, value="sqlserver"
+        ).pack(side=tk.LEFT, padx=(10, 0))
+
+        self.db_label = tk.Label(db_frame, text="Database File:", font=("Arial", 10))
+        self.db_label.pack(side=tk.LEFT, padx=(0, 5))
+        self.db_entry = tk.Entry(db_frame, textvariable=self.db_path_var, width=40)
+        self.db_entry.pack(side=tk.LEFT, padx=(0, 5))
+        self.db_btn = tk.Button(db_frame, text="Browse", command=self.select_db_file)
+        self.db_btn.pack(side=tk.LEFT)
+
+        sql_frame = tk.Frame(root)
+        sql_frame.pack(pady=5)
+
+        self.sql_label = tk.Label(sql_frame, text="SQL Connection:", font=("Arial", 10))
+        self.sql_label.pack(side=tk.LEFT, padx=(0, 5))
+        self.sql_entry = tk.Entry(sql_frame, textvariable=self.sql_conn_var, width=52)
+        self.sql_entry.pack(side=tk.LEFT)
+
+        self.db_type_var.trace_add("write", self.update_db_input_state)
+        self.update_db_input_state()
+
+        tk.Checkbutton(
+            root,
+            text="Bulk mode (load once, batched inserts)",
+            variable=self.bulk_var,
+        ).pack(pady=(5, 0))
+
+        import_btn = tk.Button(
+            root,
+            text="Select CSV and Import",
+            command=self.select_and_import,
+            font=("Arial", 12),
+            width=25,
+            bg="#007bff",
+            fg="white",
+            relief="raised",
+            cursor="hand2",
         )
-    if questions_have_survey_entity and survey_entity_id is None:
-        raise RuntimeError(
-            "Questions requires SurveyYear, but no SurveyEntities row was found."
+        import_btn.pack(pady=20)
+
+        test_btn = tk.Button(
+            root,
+            text="Test Connection",
+            command=self.test_connection,
+            font=("Arial", 10),
+            width=20,
         )
+        test_btn.pack(pady=(0, 10))
 
-    section_cache = {}  # Cache section IDs to avoid duplicate lookups
-    stats = {
-        "sections": 0,
-        "subsections": 0,
-        "questions": 0,
-        "skipped": 0,
-        "duplicate_questions": 0,
-    }
-
-    import itertools
-
-    with open(csv_path, newline="", encoding="utf-8-sig") as csvfile:
-        reader = csv.reader(csvfile)
-        first_row = next(reader, None)
-        # Always skip the first row if it matches the known headers (case-insensitive, strip whitespace)
-        header_values = ["section", "subsection", "question"]
-        is_header = False
-        if first_row:
-            normalized = [col.strip().lower() for col in first_row]
-            if normalized == header_values:
-                is_header = True
-        if is_header:
-            rows = reader  # skip header, process rest
-        else:
-            rows = itertools.chain([first_row], reader)  # process first row, then rest
-        for row in rows:
-            process_row(
-                cur,
-                row,
-                section_cache,
-                stats,
-                db_type,
-                survey_entity_id,
-                sections_have_survey_entity,
-                questions_have_survey_entity,
-            )
+        note_label = tk.Label(
+            root,
+            text="Note: Choose SQLite file or SQL Server connection string.",
+            font=("Arial", 9),
+            fg="gray",
+        )
+        note_label.pack(pady=5)
 
-    conn.commit()
-    conn.close()
-
-    return stats
-
-
-def insert_section_and_get_id(
-    cur,
-    db_type,
-    section_name,
-    parent_section_id,
-    survey_entity_id,
-    sections_have_survey_entity,
-):
-    if db_type == "sqlserver":
-        if sections_have_survey_entity:
-            cur.execute(
-                "INSERT INTO Sections (Name, ParentSectionId, SurveyYear) OUTPUT INSERTED.Id VALUES (?, ?, ?)",
-                (section_name, parent_section_id, survey_entity_id),
-            )
-        else:
-            cur.execute(
-                "INSERT INTO Sections (Name, ParentSectionId) OUTPUT INSERTED.Id VALUES (?, ?)",
-                (section_name, parent_section_id),
-            )
+    def get_db_target(self):
+        """Return (db_type, db_target), or None after showing an error."""
+        db_type = self.db_type_var.get()
 
-        inserted = cur.fetchone()
-        if not inserted or inserted[0] is None:
-            raise RuntimeError(
-                "Failed to retrieve inserted section id from SQL Server."
-            )
-        return inserted[0]
+        if db_type == "sqlite":
+            db_path = self.db_path_var.get().strip()
+            if not db_path or not os.path.exists(db_path):
+                messagebox.showerror("Error", f"Database not found at {db_path}")
+                return None
+            return db_type, db_path
 
-    if db_type == "sqlite":
-        if sections_have_survey_entity:
-            cur.execute(
-                "INSERT INTO Sections (Name, ParentSectionId, SurveyYear) VALUES (?, ?, ?)",
-                (section_name, parent_section_id, survey_entity_id),
-            )
-        else:
-            cur.execute(
-                "INSERT INTO Sections (Name, ParentSectionId) VALUES (?, ?)",
-                (section_name, parent_section_id),
-            )
-        return cur.lastrowid
-
-    raise ValueError(f"Unsupported database type: {db_type}")
-
-
-def process_row(
-    cur,
-    row,
-    section_cache,
-    stats,
-    db_type,
-    survey_entity_id,
-    sections_have_survey_entity,
-    questions_have_survey_entity,
-):
-    """Process a single CSV row and insert section/subsection/question."""
-    if len(row) < 1:
-        stats["skipped"] += 1
-        return  # Skip completely empty rows
-
-    # Skip any row that matches the header (case-insensitive, ignores whitespace)
-    header_values = ["section", "subsection", "question"]
-    normalized = [col.strip().lower() for col in row]
-    if normalized == header_values:
-        stats["skipped"] += 1
-        return
-
-    section_name = row[0].strip()
-    subsection_name = row[1].strip() if len(row) > 1 else ""
-    question_text = row[2].strip() if len(row) > 2 else ""
-
-    if not section_name:
-        stats["skipped"] += 1
-        return  # Skip rows without section name
-
-    # Get or create parent section
-    if section_name not in section_cache:
-        if sections_have_survey_entity:
-            cur.execute(
-                "SELECT Id FROM Sections WHERE Name = ? AND ParentSectionId IS NULL AND SurveyYear = ?",
-                (section_name, survey_entity_id),
-            )
-        else:
-            cur.execute(
-                "SELECT Id FROM Sections WHERE Name = ? AND ParentSectionId IS NULL",
-                (section_name,),
-            )
-        section = cur.fetchone()
-        if section:
-            section_id = section[0]
-        else:
-            section_id = insert_section_and_get_id(
-                cur,
-                db_type,
-                section_name,
-                None,
-                survey_entity_id,
-                sections_have_survey_entity,
-            )
-            stats["sections"] += 1
-        section_cache[section_name] = section_id
-    else:
-        section_id = section_cache[section_name]
-
-    # Handle subsection if present
-    target_section_id = section_id
-    if subsection_name:
-        subsection_key = f"{section_name}::{subsection_name}::{survey_entity_id}"
-        if subsection_key not in section_cache:
-            if sections_have_survey_entity:
-                cur.execute(
-                    "SELECT Id FROM Sections WHERE Name = ? AND ParentSectionId = ? AND SurveyYear = ?",
-                    (subsection_name, section_id, survey_entity_id),
-                )
-            else:
-                cur.execute(
-                    "SELECT Id FROM Sections WHERE Name = ? AND ParentSectionId = ?",
-                    (subsection_name, section_id),
-                )
-            subsection = cur.fetchone()
-            if subsection:
-                target_section_id = subsection[0]
-            else:
-                target_section_id = insert_section_and_get_id(
-                    cur,
-                    db_type,
-                    subsection_name,
-                    section_id,
-                    survey_entity_id,
-                    sections_have_survey_entity,
-                )
-                stats["subsections"] += 1
-            section_cache[subsection_key] = target_section_id
-        else:
-            target_section_id = section_cache[subsection_key]
-
-    # Insert question if provided (check for duplicates)
-    if question_text:
-        try:
-            # Check if question already exists for this section
-            cur.execute(
-                "SELECT Id FROM Questions WHERE Text = ? AND SectionId = ?",
-                (question_text, target_section_id),
-            )
-            existing = cur.fetchone()
-
-            if existing:
-                stats["duplicate_questions"] += 1
-            else:
-                if questions_have_survey_entity:
-                    cur.execute(
-                        "INSERT INTO Questions (Text, SurveyYear, SectionId) VALUES (?, ?, ?)",
-                        (question_text, survey_entity_id, target_section_id),
-                    )
-                else:
-                    cur.execute(
-                        "INSERT INTO Questions (Text, SectionId) VALUES (?, ?)",
-                        (question_text, target_section_id),
-                    )
-                stats["questions"] += 1
-        except Exception as e:
-            print(f"Error inserting question '{question_text}': {e}")
-            stats["skipped"] += 1
-    else:
-        stats["skipped"] += 1
-
-
-def select_and_import():
-    csv_path = filedialog.askopenfilename(
-        title="Select CSV File",
-        filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")],
-    )
-    if not csv_path:
-        return
-
-    db_type = db_type_var.get()
-
-    if db_type == "sqlite":
-        db_path = db_path_var.get().strip()
-        if not db_path or not os.path.exists(db_path):
-            messagebox.showerror("Error", f"Database not found at {db_path}")
-            return
-        db_target = db_path
-    else:
-        db_target = sql_conn_var.get().strip()
+        db_target = self.sql_conn_var.get().strip()
         if not db_target:
             messagebox.showerror("Error", "Enter a SQL Server connection string.")
+            return None
+        return db_type, db_target
+
+    def select_and_import(self):
+        csv_path = filedialog.askopenfilename(
+            title="Select CSV File",
+            filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")],
+        )
+        if not csv_path:
             return
 
-    try:
-        stats = import_csv_to_db(csv_path, db_type, db_target)
-        message = f"""Import completed successfully!
+        target = self.get_db_target()
+        if target is None:
+            return
+        db_type, db_target = target
+
+        try:
+            stats = import_csv_to_db(
+                csv_path, db_type, db_target, bulk=self.bulk_var.get()
+            )
+            message = f"""Import completed successfully!
 
 Sections created: {stats['sections']}
 Subsections created: {stats['subsections']}
 Questions created: {stats['questions']}
 Duplicate questions skipped: {stats['duplicate_questions']}
 Rows skipped: {stats['skipped']}"""
-        messagebox.showinfo("Success", message)
-    except Exception as e:
-        messagebox.showerror("Error", f"Import failed:\n{e}")
+            messagebox.showinfo("Success", message)
+        except Exception as e:
+            messagebox.showerror("Error", f"Import failed:\n{e}")
+
+    def test_connection(self):
+        try:
+            target = self.get_db_target()
+            if target is None:
+                return
 
+            conn = get_connection(*target)
+            conn.close()
+            messagebox.showinfo("Success", "Connection successful.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Connection failed:\n{e}")
 
-def test_connection():
-    db_type = db_type_var.get()
+    def select_db_file(self):
+        path = filedialog.askopenfilename(
+            title="Select Database File",
+            filetypes=[("SQLite DB", "*.db"), ("All Files", "*.*")],
+        )
+        if path:
+            self.db_path_var.set(path)
+
+    def update_db_input_state(self, *_):
+        is_sqlite = self.db_type_var.get() == "sqlite"
+
+        self.db_label.config(state=("normal" if is_sqlite else "disabled"))
+        self.db_entry.config(state=("normal" if is_sqlite else "disabled"))
+        self.db_btn.config(state=("normal" if is_sqlite else "disabled"))
+
+        self.sql_label.config(state=("disabled" if is_sqlite else "normal"))
+        self.sql_entry.config(state=("disabled" if is_sqlite else "normal"))
 
-    try:
-        if db_type == "sqlite":
-            db_path = db_path_var.get().strip()
-            if not db_path or not os.path.exists(db_path):
-                messagebox.showerror("Error", f"Database not found at {db_path}")
-                return
-            db_target = db_path
-        else:
-            db_target = sql_conn_var.get().strip()
-            if not db_target:
-                messagebox.showerror("Error", "Enter a SQL Server connection string.")
-                return
 
-        conn = get_connection(db_type, db_target)
-        conn.close()
-        messagebox.showinfo("Success", "Connection successful.")
-    except Exception as e:
-        messagebox.showerror("Error", f"Connection failed:\n{e}")
-
-
-# Create GUI
-root = tk.Tk()
-root.title("FlourishWellness CSV Importer")
-root.geometry("500x300")
-
-title_label = tk.Label(
-    root, text="Import Sections, Subsections & Questions", font=("Arial", 14, "bold")
-)
-title_label.pack(pady=15)
-
-info_label = tk.Label(
-    root,
-    text="CSV Format:\nColumn A: Section | Column B: Subsection (optional) | Column C: Question",
-    font=("Arial", 10),
-    justify="left",
-)
-info_label.pack(pady=5)
-
-# Database selection
-db_frame = tk.Frame(root)
-db_frame.pack(pady=10)
-
-db_type_var = tk.StringVar(value="sqlserver")
-db_path_var = tk.StringVar()
-db_path_var.set("")
-
-
-def find_appsettings_connection_string():
-    """Search for appsettings.Development.json then appsettings.json under the FlourishWellness project folder
-    (one level up). Return ConnectionStrings.DefaultConnection if found, otherwise None."""
-    # Common locations relative to this script
-    candidates = [
-        Path(__file__).resolve().parents[1] / "FlourishWellness" / "appsettings.Development.json",
-        Path(__file__).resolve().parents[1] / "FlourishWellness" / "appsettings.json",
-        Path(__file__).resolve().parents[2] / "FlourishWellness" / "appsettings.Development.json",
-        Path(__file__).resolve().parents[2] / "FlourishWellness" / "appsettings.json",
-    ]
-
-    merged = {}
-    for p in candidates:
-        if p.exists():
-            try:
-                data = json.loads(p.read_text(encoding="utf-8"))
-                # Merge shallowly: later files overwrite earlier keys
-                merged.update(data)
-            except Exception:
-                continue
-
-    # ConnectionStrings may be present
-    cs = merged.get("ConnectionStrings") or {}
-    default = cs.get("DefaultConnection") if isinstance(cs, dict) else None
-    return default
-
-
-default_conn = find_appsettings_connection_string()
-if default_conn:
-    sql_conn_var = tk.StringVar(value=default_conn)
-else:
-    sql_conn_var = tk.StringVar(
-        value="Driver={ODBC Driver 17 for SQL Server};Server=ASISQLDBPROD;Database=FlourishWellness;Trusted_Connection=yes;TrustServerCertificate=yes;MultipleActiveResultSets=yes;"
-    )
-
-db_type_frame = tk.Frame(root)
-db_type_frame.pack(pady=5)
-
-tk.Label(db_type_frame, text="Database Type:", font=("Arial", 10)).pack(
-    side=tk.LEFT, padx=(0, 8)
-)
-tk.Radiobutton(db_type_frame, text="SQLite", variable=db_type_var, value="sqlite").pack(
-    side=tk.LEFT
-)
-tk.Radiobutton(
-    db_type_frame, text="SQL Server", variable=db_type_var, value="sqlserver"
-).pack(side=tk.LEFT, padx=(10, 0))
-
-
-def select_db_file():
-    path = filedialog.askopenfilename(
-        title="Select Database File",
-        filetypes=[("SQLite DB", "*.db"), ("All Files", "*.*")],
-    )
-    if path:
-        db_path_var.set(path)
-
-
-db_label = tk.Label(db_frame, text="Database File:", font=("Arial", 10))
-db_label.pack(side=tk.LEFT, padx=(0, 5))
-db_entry = tk.Entry(db_frame, textvariable=db_path_var, width=40)
-db_entry.pack(side=tk.LEFT, padx=(0, 5))
-db_btn = tk.Button(db_frame, text="Browse", command=select_db_file)
-db_btn.pack(side=tk.LEFT)
-
-sql_frame = tk.Frame(root)
-sql_frame.pack(pady=5)
-
-sql_label = tk.Label(sql_frame, text="SQL Connection:", font=("Arial", 10))
-sql_label.pack(side=tk.LEFT, padx=(0, 5))
-sql_entry = tk.Entry(sql_frame, textvariable=sql_conn_var, width=52)
-sql_entry.pack(side=tk.LEFT)
-
-
-def update_db_input_state(*_):
-    is_sqlite = db_type_var.get() == "sqlite"
-
-    db_label.config(state=("normal" if is_sqlite else "disabled"))
-    db_entry.config(state=("normal" if is_sqlite else "disabled"))
-    db_btn.config(state=("normal" if is_sqlite else "disabled"))
-
-    sql_label.config(state=("disabled" if is_sqlite else "normal"))
-    sql_entry.config(state=("disabled" if is_sqlite else "normal"))
-
-
-db_type_var.trace_add("write", update_db_input_state)
-update_db_input_state()
-
-import_btn = tk.Button(
-    root,
-    text="Select CSV and Import",
-    command=select_and_import,
-    font=("Arial", 12),
-    width=25,
-    bg="#007bff",
-    fg="white",
-    relief="raised",
-    cursor="hand2",
-)
-import_btn.pack(pady=20)
-
-test_btn = tk.Button(
-    root,
-    text="Test Connection",
-    command=test_connection,
-    font=("Arial", 10),
-    width=20,
-)
-test_btn.pack(pady=(0, 10))
-
-note_label = tk.Label(
-    root,
-    text="Note: Choose SQLite file or SQL Server connection string.",
-    font=("Arial", 9),
-    fg="gray",
-)
-note_label.pack(pady=5)
-
-root.mainloop()
+if __name__ == "__main__":
+    root = tk.Tk()
+    app = ImporterApp(root)
+    root.mainloop()
@@ -1,13 +1,23 @@
 # Use this to push some realistic test data into the database for development/testing purposes.
-# It uses the ALF sites and users from AD. 
+# It uses the ALF sites and users from AD (cached between runs), or from a
+# JSON/LDIF export given with --users-file.
 # THIS SHOULD ONLY BE RUN WHILE TESTING! THIS IS NOT MEANT FOR PRODUCTION USE AND MAY OVERWRITE REAL DATA IN THE DB.
 
-import json
+import argparse
 import random
-import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pyodbc
 
+from flourish_tools.adusers import CACHE_TTL, get_user_source
+from flourish_tools.answers import (
+    AnswerProfile,
+    answer_rows,
+    answered_mask,
+    generate_answer_matrix,
+)
+
 # Active Directory scope:
 # americare.org -> Americare Systems Inc. -> Facilities -> Users -> ALF
 AD_SEARCH_BASE = "OU=ALF,OU=Users,OU=Facilities,OU=Americare Systems Inc.,DC=americare,DC=org"
@@ -23,71 +33,120 @@ DB_CONN_STR = (
 
 COMPLETE_USER_COUNT = 25
 MAX_INCOMPLETE_USER_COUNT = 10
+DEADLOCK_RETRIES = 3
 ANSWER_CHOICES = ["Fully Implemented", "Partially Implemented", "Not a Current Practice"]
 
 
-def get_ad_users_via_powershell():
-    """Returns all enabled AD users from the ALF OU as (username, display_name)."""
-    ps_script = rf"""
-Import-Module ActiveDirectory
-$base = '{AD_SEARCH_BASE}'
-$users = Get-ADUser -SearchBase $base -Filter 'Enabled -eq $true' -Properties DisplayName |
-    Select-Object SamAccountName, DisplayName
-$users | ConvertTo-Json -Depth 3 -Compress
+def get_ad_users(source):
+    """Returns all enabled AD users from the source as (username, display_name)."""
+    return [(user["SamAccountName"], user["DisplayName"]) for user in source.fetch()]
+
+
+# Every generated user goes into this temp table first, so Users and
+# UserSurveyStatuses are each upserted with a single MERGE.
+CREATE_STAGE_SQL = """
+CREATE TABLE #StageUsers (
+    Email          NVARCHAR(255) NOT NULL PRIMARY KEY,
+    FullName       NVARCHAR(256) NOT NULL,
+    SAMAccountName NVARCHAR(256) NOT NULL,
+    IsCompleted    BIT           NOT NULL,
+    CommunityKey   INT           NOT NULL
+)
 """
-    result = subprocess.run(
-        [
-            "powershell",
-            "-NoProfile",
-            "-ExecutionPolicy",
-            "Bypass",
-            "-Command",
-            ps_script,
-        ],
-        capture_output=True,
-        text=True,
-        check=False,
-    )
 
-    if result.returncode != 0:
-        raise RuntimeError(
-            f"Failed to query AD.\nSTDOUT: {result.stdout.strip()}\nSTDERR: {result.stderr.strip()}"
-        )
+MERGE_USERS_SQL = """
+MERGE Users WITH (HOLDLOCK) AS t
+USING #StageUsers AS s ON t.Email = s.Email
+WHEN MATCHED THEN
+    UPDATE SET FullName = s.FullName
+WHEN NOT MATCHED THEN
+    INSERT (Email, FullName, SAMAccountName, Role, CreatedAt)
+    VALUES (s.Email, s.FullName, s.SAMAccountName, 1, GETUTCDATE())
+OUTPUT inserted.Email, inserted.Id;
+"""
 
-    raw = result.stdout.strip()
-    if not raw:
-        return []
+DELETE_RESPONSES_SQL = """
+DELETE r FROM Responses r
+INNER JOIN Users u ON u.Id = r.UserId
+INNER JOIN #StageUsers s ON s.Email = u.Email
+WHERE r.SurveyYear = ? AND (r.CommunityKey = s.CommunityKey OR r.CommunityKey IS NULL)
+"""
 
-    parsed = json.loads(raw)
-    if isinstance(parsed, dict):
-        parsed = [parsed]
+INSERT_RESPONSE_SQL = (
+    "INSERT INTO Responses (Answer, SurveyYear, QuestionId, UserId, CommunityKey)"
+    " VALUES (?, ?, ?, ?, ?)"
+)
 
-    users = []
-    for item in parsed:
-        username = item.get("SamAccountName")
-        display_name = item.get("DisplayName") or username
-        if username:
-            users.append((username, display_name))
+MERGE_STATUSES_SQL = """
+MERGE UserSurveyStatuses WITH (HOLDLOCK) AS t
+USING (
+    SELECT u.Id AS UserId, s.CommunityKey, s.IsCompleted
+    FROM #StageUsers s INNER JOIN Users u ON u.Email = s.Email
+) AS s ON t.UserId = s.UserId AND t.SurveyYear = ? AND t.CommunityKey = s.CommunityKey
+WHEN MATCHED THEN
+    UPDATE SET IsCompleted = s.IsCompleted, UpdatedAt = GETUTCDATE()
+WHEN NOT MATCHED THEN
+    INSERT (UserId, SurveyYear, CommunityKey, IsCompleted, UpdatedAt)
+    VALUES (s.UserId, ?, s.CommunityKey, s.IsCompleted, GETUTCDATE());
+"""
 
-    return users
 
+SECTION_NAMES_SQL = """
+SELECT q.Id, COALESCE(p.Name, s.Name)
+FROM Questions q
+INNER JOIN Sections s ON s.Id = q.SectionId
+LEFT JOIN Sections p ON p.Id = s.ParentSectionId
+WHERE q.SurveyYear = ?
+"""
 
-def get_or_create_user(cursor, username, full_name):
-    """Uses AD username (sAMAccountName) in Users.Email as unique identifier."""
-    cursor.execute("SELECT Id FROM Users WHERE Email = ?", username)
-    row = cursor.fetchone()
-    if row:
-        cursor.execute("UPDATE Users SET FullName = ? WHERE Id = ?", full_name, row.Id)
-        return row.Id
 
-    cursor.execute(
-        "INSERT INTO Users (Email, FullName, Role, CreatedAt)"
-        " OUTPUT INSERTED.Id VALUES (?, ?, '', ?, 0, GETUTCDATE())",
-        username,
-        full_name,
-        1,
+def stage_users(cursor, users):
+    """Load (email, full_name, sam_account_name, is_complete, community_key) rows into #StageUsers."""
+    cursor.execute(CREATE_STAGE_SQL)
+    # Explicit sizes keep fast_executemany from describing the temp table's
+    # parameters, which some ODBC driver versions cannot do.
+    cursor.setinputsizes(
+        [
+            (pyodbc.SQL_WVARCHAR, 255, 0),
+            (pyodbc.SQL_WVARCHAR, 256, 0),
+            (pyodbc.SQL_WVARCHAR, 256, 0),
+            (pyodbc.SQL_BIT, 0, 0),
+            (pyodbc.SQL_INTEGER, 0, 0),
+        ]
     )
-    return cursor.fetchone().Id
+    try:
+        cursor.executemany(
+            "INSERT INTO #StageUsers (Email, FullName, SAMAccountName, IsCompleted, CommunityKey)"
+            " VALUES (?, ?, ?, ?, ?)",
+            users,
+        )
+    finally:
+        cursor.setinputsizes(None)
+
+
+def merge_users(cursor):
+    """Upsert the staged users, matched on Email (the domain username); return {email: id}."""
+    cursor.execute(MERGE_USERS_SQL)
+    return {email: user_id for email, user_id in cursor.fetchall()}
+
+
+def write_responses(cursor, survey_id, responses):
+    """Replace the staged users' responses with (answer, question_id, user_id, community_key) rows."""
+    cursor.execute(DELETE_RESPONSES_SQL, survey_id)
+    if not responses:
+        return
+    # Without this, fast_executemany sizes its buffer for NVARCHAR(MAX).
+    cursor.setinputsizes([(pyodbc.SQL_WVARCHAR, 255, 0), None, None, None, None])
+    try:
+        cursor.executemany(
+            INSERT_RESPONSE_SQL,
+            [
+                (answer, survey_id, question_id, user_id, community_key)
+                for answer, question_id, user_id, community_key in responses
+            ],
+        )
+    finally:
+        cursor.setinputsizes(None)
 
 
 def format_domain_username(sam_account_name):
@@ -105,97 +164,289 @@ def choose_answer_set(question_ids, is_complete):
     return random.sample(question_ids, count)
 
 
-def populate_surveys():
-    ad_users = get_ad_users_via_powershell()
-    if len(ad_users) < COMPLETE_USER_COUNT:
+def write_user_batch(cursor, survey_id, batch):
+    """Write one batch of generated users in the connection's open transaction.
+
+    batch holds (username, full_name, sam_account_name, is_complete,
+    community_key, answers) tuples, where answers is a list of
+    (answer, question_id).
+    """
+    stage_users(cursor, [user[:5] for user in batch])
+    user_ids = merge_users(cursor)
+    write_responses(
+        cursor,
+        survey_id,
+        [
+            (answer, question_id, user_ids[username], community_key)
+            for username, _, _, _, community_key, answers in batch
+            for answer, question_id in answers
+        ],
+    )
+    cursor.execute(MERGE_STATUSES_SQL, survey_id, survey_id)
+    cursor.execute("DROP TABLE #StageUsers")
+
+
+def is_deadlock(error):
+    # SQL Server reports deadlock victims (error 1205) as SQLSTATE 40001.
+    return bool(error.args) and error.args[0] == "40001"
+
+
+def populate_partition(survey_id, users, batch_size=None):
+    """Write one partition of generated users on its own connection.
+
+    Every batch_size users (all of them when None) are one transaction. A batch
+    chosen as a deadlock victim is rolled back and retried.
+    """
+    started = time.perf_counter()
+    stats = {"users": len(users), "responses": 0, "batches": 0, "retries": 0}
+    batch_size = batch_size or len(users) or 1
+    with pyodbc.connect(DB_CONN_STR) as db_conn:
+        cursor = db_conn.cursor()
+        cursor.fast_executemany = True
+        for start in range(0, len(users), batch_size):
+            batch = users[start : start + batch_size]
+            for attempt in range(DEADLOCK_RETRIES + 1):
+                try:
+                    write_user_batch(cursor, survey_id, batch)
+                    db_conn.commit()
+                    break
+                except pyodbc.Error as e:
+                    db_conn.rollback()
+                    if not is_deadlock(e) or attempt == DEADLOCK_RETRIES:
+                        raise
+                    stats["retries"] += 1
+                    time.sleep(0.1 * (attempt + 1))
+            stats["batches"] += 1
+            stats["responses"] += sum(len(answers) for *_, answers in batch)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def load_community_keys(cursor, combined):
+    """Return each combined user's CommunityKey, 0 (the app's "no Community/AD
+    entry" key) for users without a Community row."""
+    cursor.execute(
+        "SELECT SAMAccountName, MIN(CommunityKey) FROM Community GROUP BY SAMAccountName"
+    )
+    community_keys = {sam.casefold(): key for sam, key in cursor.fetchall()}
+    return [community_keys.get(sam.casefold(), 0) for (sam, _), _ in combined]
+
+
+def generate_profile_answers(
+    cursor, survey_id, question_ids, combined, user_communities, profile, seed
+):
+    """Return one [(answer, question_id), ...] list per entry of combined, from
+    a single NumPy answer matrix biased by each user's community and each
+    question's top-level section."""
+    cursor.execute(SECTION_NAMES_SQL, survey_id)
+    section_names = dict(cursor.fetchall())
+
+    is_complete = [complete for _, complete in combined]
+    answered = answered_mask(len(combined), len(question_ids), 0.0, 1.0, seed=seed)
+    answered[is_complete] = True
+    codes = generate_answer_matrix(
+        profile,
+        user_communities,
+        [section_names[question_id] for question_id in question_ids],
+        answered,
+        seed=seed,
+    )
+
+    answer_sets = [[] for _ in combined]
+    for answer, question_id, user_index in answer_rows(
+        codes, range(len(combined)), question_ids
+    ):
+        answer_sets[user_index].append((answer, question_id))
+    return answer_sets
+
+
+def populate_surveys(
+    user_source,
+    workers=1,
+    batch_size=None,
+    complete_user_count=COMPLETE_USER_COUNT,
+    max_incomplete_user_count=MAX_INCOMPLETE_USER_COUNT,
+    answer_profile=None,
+    seed=None,
+):
+    """Generate and write the test year; return (survey_id, question count, processed, worker stats).
+
+    With workers > 1 the users are split into that many partitions, each
+    written by its own thread on its own connection, committing every
+    batch_size users. With an answer_profile (flourish_tools.answers) the
+    answers are skewed and correlated by community and section instead of
+    uniform. seed makes the user selection and answers repeatable.
+    """
+    if seed is not None:
+        random.seed(seed)
+    ad_users = get_ad_users(user_source)
+    if len(ad_users) < complete_user_count:
         raise RuntimeError(
-            f"Only found {len(ad_users)} eligible AD users in ALF OU; need at least {COMPLETE_USER_COUNT}."
+            f"Only found {len(ad_users)} eligible AD users in ALF OU; need at least {complete_user_count}."
         )
 
-    # Always insert 25 complete users, plus a random 0..10 incomplete users.
-    incomplete_user_count = random.randint(0, min(MAX_INCOMPLETE_USER_COUNT, len(ad_users) - COMPLETE_USER_COUNT))
-    total_user_count = COMPLETE_USER_COUNT + incomplete_user_count
+    # Always insert the complete users, plus a random 0..max incomplete users.
+    incomplete_user_count = random.randint(
+        0, min(max_incomplete_user_count, len(ad_users) - complete_user_count)
+    )
+    total_user_count = complete_user_count + incomplete_user_count
 
     selected_users = random.sample(ad_users, total_user_count)
-    statuses = ([True] * COMPLETE_USER_COUNT) + ([False] * incomplete_user_count)
+    statuses = ([True] * complete_user_count) + ([False] * incomplete_user_count)
     combined = list(zip(selected_users, statuses))
     random.shuffle(combined)
 
     with pyodbc.connect(DB_CONN_STR) as db_conn:
         cursor = db_conn.cursor()
-
-        cursor.execute("SELECT TOP 1 Id FROM SurveyEntities WHERE Status = 2 ORDER BY Year DESC")
+        # SurveyYear rows are keyed by Year, which Questions/Responses store.
+        cursor.execute("SELECT TOP 1 Year FROM SurveyYear WHERE Status = 2 ORDER BY Year DESC")
         survey_row = cursor.fetchone()
         if not survey_row:
-            raise RuntimeError("No active survey found (SurveyEntities.Status = 2).")
-        survey_id = survey_row.Id
+            raise RuntimeError("No active survey found (SurveyYear.Status = 2).")
+        survey_id = survey_row.Year
 
         cursor.execute("SELECT Id FROM Questions WHERE SurveyYear = ? ORDER BY Id", survey_id)
         question_ids = [r.Id for r in cursor.fetchall()]
         if not question_ids:
             raise RuntimeError(f"No questions found for active survey {survey_id}.")
 
-        processed = []
-        for (sam_account_name, full_name), is_complete in combined:
-            username = format_domain_username(sam_account_name)
-            user_id = get_or_create_user(cursor, username, full_name)
-
-            cursor.execute("DELETE FROM Responses WHERE UserId = ? AND SurveyYear = ?", user_id, survey_id)
-
-            answered_questions = choose_answer_set(question_ids, is_complete)
-            for question_id in answered_questions:
-                cursor.execute(
-                    "INSERT INTO Responses (Answer, SurveyYear, QuestionId, UserId) VALUES (?, ?, ?, ?)",
-                    random.choice(ANSWER_CHOICES),
-                    survey_id,
-                    question_id,
-                    user_id,
-                )
-
-            cursor.execute(
-                "SELECT 1 FROM UserSurveyStatuses WHERE UserId = ? AND SurveyYear = ?",
-                user_id,
+        user_communities = load_community_keys(cursor, combined)
+
+        if answer_profile is not None:
+            answer_sets = generate_profile_answers(
+                cursor,
                 survey_id,
+                question_ids,
+                combined,
+                user_communities,
+                answer_profile,
+                seed=random.randrange(2**32) if seed is None else seed,
             )
-            if cursor.fetchone():
-                cursor.execute(
-                    "UPDATE UserSurveyStatuses SET IsCompleted = ?, UpdatedAt = GETUTCDATE()"
-                    " WHERE UserId = ? AND SurveyYear = ?",
-                    is_complete,
-                    user_id,
-                    survey_id,
-                )
-            else:
-                cursor.execute(
-                    "INSERT INTO UserSurveyStatuses (UserId, SurveyYear, IsCompleted, UpdatedAt)"
-                    " VALUES (?, ?, ?, GETUTCDATE())",
-                    user_id,
-                    survey_id,
-                    is_complete,
-                )
-
-            cursor.commit()
-            processed.append(
-                {
-                    "username": username,
-                    "full_name": full_name,
-                    "is_complete": is_complete,
-                    "answers_written": len(answered_questions),
-                }
+
+    # Generate everything first, then write it in a handful of set-based
+    # statements per batch instead of several round trips per response and a
+    # commit per user.
+    processed = []
+    generated = []
+    for n, ((sam_account_name, full_name), is_complete) in enumerate(combined):
+        username = format_domain_username(sam_account_name)
+        if answer_profile is not None:
+            answers = answer_sets[n]
+        else:
+            answers = [
+                (random.choice(ANSWER_CHOICES), question_id)
+                for question_id in choose_answer_set(question_ids, is_complete)
+            ]
+        generated.append(
+            (username, full_name, sam_account_name, is_complete, user_communities[n], answers)
+        )
+        processed.append(
+            {
+                "username": username,
+                "full_name": full_name,
+                "is_complete": is_complete,
+                "answers_written": len(answers),
+            }
+        )
+
+    workers = max(1, min(workers, len(generated)))
+    if workers == 1:
+        worker_stats = [populate_partition(survey_id, generated, batch_size)]
+    else:
+        partitions = [generated[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            worker_stats = list(
+                pool.map(lambda users: populate_partition(survey_id, users, batch_size), partitions)
             )
 
-    return survey_id, len(question_ids), processed
+    return survey_id, len(question_ids), processed, worker_stats
 
 
-def main():
-    survey_id, question_count, processed = populate_surveys()
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Push test survey data into the database.")
+    parser.add_argument(
+        "--users-file",
+        help="Read users from a JSON export (Get-ADUser | ConvertTo-Json) or an LDIF file"
+        " instead of querying AD through PowerShell.",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=CACHE_TTL,
+        help="Reuse the cached user list for this many seconds; 0 disables the cache"
+        " (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--refresh", action="store_true", help="Ignore the cached user list and query again."
+    )
+    parser.add_argument(
+        "--complete-users",
+        type=int,
+        default=COMPLETE_USER_COUNT,
+        help="Users who complete the survey (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--max-incomplete-users",
+        type=int,
+        default=MAX_INCOMPLETE_USER_COUNT,
+        help="Up to this many extra users answer only some questions (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Split the users over this many connections written in parallel (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Commit every N users on each worker (default: one commit per worker).",
+    )
+    parser.add_argument(
+        "--answer-profile",
+        help="JSON answer profile with per-community and per-section bias (needs numpy);"
+        " without it answers are uniform.",
+    )
+    parser.add_argument("--seed", type=int, help="Seed for a repeatable run.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    user_source = get_user_source(
+        AD_SEARCH_BASE, args.users_file, cache_ttl=args.cache_ttl, refresh=args.refresh
+    )
+    started = time.perf_counter()
+    survey_id, question_count, processed, worker_stats = populate_surveys(
+        user_source,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        complete_user_count=args.complete_users,
+        max_incomplete_user_count=args.max_incomplete_users,
+        answer_profile=AnswerProfile.load(args.answer_profile) if args.answer_profile else None,
+        seed=args.seed,
+    )
+    elapsed = time.perf_counter() - started
     complete_count = sum(1 for p in processed if p["is_complete"])
     partial_count = len(processed) - complete_count
 
+    if getattr(user_source, "last_fetch", None):
+        print(f"AD users: {user_source.last_fetch}")
     print(f"Survey ID: {survey_id}")
     print(f"Questions in survey: {question_count}")
     print(f"Processed users: {len(processed)}")
     print(f"Complete: {complete_count} | Partial: {partial_count}")
+    print(
+        f"Responses written: {sum(p['answers_written'] for p in processed)}"
+        f" in {elapsed:.2f}s"
+    )
+    if len(worker_stats) > 1:
+        for n, stats in enumerate(worker_stats, 1):
+            print(
+                f"Worker {n}: {stats['users']} users, {stats['responses']} responses,"
+                f" {stats['batches']} batches, {stats['retries']} deadlock retries"
+                f" in {stats['seconds']:.2f}s"
+            )
     print("\nInserted usernames:")
     for p in processed:
         status = "Complete" if p["is_complete"] else "Partial"
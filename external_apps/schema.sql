@@ -47,6 +47,8 @@ CREATE TABLE dbo.Questions (
 
 CREATE INDEX IX_Questions_SectionId      ON dbo.Questions (SectionId);
 CREATE INDEX IX_Questions_SurveyEntityId ON dbo.Questions (SurveyYear);
+-- AddQuestionTextHash.sql adds the persisted NormalizedTextHash column and
+-- IX_Questions_SectionId_NormalizedTextHash used for duplicate detection.
 
 -- Application users (populated automatically on first Windows/AD login)
 -- Role: 1 = Employee, 2 = Manager, 3 = Admin